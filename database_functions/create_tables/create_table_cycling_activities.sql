@@ -24,11 +24,48 @@ create table if not exists public.cycling_activities (
   constraint ck_started_before_ended check (ended_at > started_at)
 );
 
-create index if not exists idx_cycling_activities_started_at
-  on public.cycling_activities (started_at desc);
+-- Natural key for idempotent ingest: user, start (whole seconds), duration and distance (to 10 m).
+-- epoch of a timestamptz does not depend on the session time zone, so the function is immutable.
+create or replace function public.cycling_activity_fingerprint(
+  p_user_id uuid,
+  p_started_at timestamptz,
+  p_duration_seconds integer,
+  p_distance_km numeric
+)
+returns text
+language sql
+immutable
+as $$
+  select md5(
+    p_user_id::text || '|' || floor(extract(epoch from p_started_at))::bigint::text
+    || '|' || p_duration_seconds::text || '|' || round(p_distance_km, 2)::text
+  );
+$$;
 
-create index if not exists idx_cycling_activities_user_started
-  on public.cycling_activities (user_id, started_at desc);
+alter table public.cycling_activities
+  add column if not exists fingerprint text
+  generated always as (public.cycling_activity_fingerprint(user_id, started_at, duration_seconds, distance_km)) stored;
+
+-- One-time cleanup before the unique index: keep the oldest copy of re-imported rides
+delete from public.cycling_activities a
+  using public.cycling_activities b
+  where a.user_id = b.user_id
+    and a.fingerprint = b.fingerprint
+    and (a.created_at, a.id) > (b.created_at, b.id);
+
+create unique index if not exists uq_cycling_activities_user_fingerprint
+  on public.cycling_activities (user_id, fingerprint);
+
+-- (started_at, id) keys serve both the newest-first window reads and keyset pages
+-- (load_cycling_activities_page); they supersede the older started_at-only indexes.
+create index if not exists idx_cycling_activities_started_id
+  on public.cycling_activities (started_at, id);
+
+create index if not exists idx_cycling_activities_user_started_id
+  on public.cycling_activities (user_id, started_at, id);
+
+drop index if exists public.idx_cycling_activities_started_at;
+drop index if exists public.idx_cycling_activities_user_started;
 
 alter table public.cycling_activities enable row level security;
 
@@ -25,4 +25,8 @@ CREATE TABLE schedule_intervals (
   CHECK (EXTRACT(second FROM (upper(period) AT TIME ZONE 'UTC')) = 0),
   CHECK (MOD(EXTRACT(minute FROM (lower(period) AT TIME ZONE 'UTC'))::int,15)=0),
   CHECK (MOD(EXTRACT(minute FROM (upper(period) AT TIME ZONE 'UTC'))::int,15)=0)
-);
\ No newline at end of file
+);
+
+-- Keyset paging per user (list_schedule_intervals_page)
+CREATE INDEX IF NOT EXISTS idx_schedule_intervals_user_start_id
+  ON schedule_intervals (user_id, start_at, id);
@@ -0,0 +1,28 @@
+-- Recurring schedule series (RRULE subset), stored once and expanded by the backend.
+-- Requires schedule_type from create_table_schedule_intervals.sql.
+CREATE EXTENSION IF NOT EXISTS pgcrypto;  -- gen_random_uuid()
+
+CREATE TABLE IF NOT EXISTS schedule_recurrences (
+  id               uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id          uuid NOT NULL,
+  type             schedule_type NOT NULL,
+  dtstart          timestamptz NOT NULL,           -- start of the first occurrence
+  duration_minutes integer NOT NULL,
+  rrule            text NOT NULL,                  -- e.g. FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10
+  exdates          timestamptz[] NOT NULL DEFAULT '{}',  -- skipped occurrence starts
+  series_end       timestamptz,                    -- end of last occurrence; NULL = open-ended
+  title            text,
+  description      text,
+  created_at       timestamptz NOT NULL DEFAULT now(),
+  updated_at       timestamptz NOT NULL DEFAULT now(),
+
+  -- Same 15-min grid as schedule_intervals
+  CHECK (duration_minutes > 0 AND MOD(duration_minutes, 15) = 0),
+  CHECK (EXTRACT(second FROM (dtstart AT TIME ZONE 'UTC')) = 0),
+  CHECK (MOD(EXTRACT(minute FROM (dtstart AT TIME ZONE 'UTC'))::int, 15) = 0),
+  CHECK (series_end IS NULL OR series_end > dtstart)
+);
+
+-- Window lookups filter by user and series bounds
+CREATE INDEX IF NOT EXISTS idx_schedule_recurrences_user_dtstart
+  ON schedule_recurrences (user_id, dtstart);
@@ -0,0 +1,104 @@
+-- Change tracking for delta sync (see sync/sync_changes.sql).
+-- Every synced table keeps updated_at current through a BEFORE UPDATE trigger,
+-- and deletes leave a tombstone so clients learn about rows that are gone.
+-- Tombstones older than the retention window may be pruned with
+-- prune_sync_tombstones(); clients whose cursor is older must resync in full.
+
+create table if not exists public.sync_tombstones (
+  entity     text not null check (entity in ('activities', 'intervals', 'recurrences', 'memories')),
+  id         uuid not null,
+  user_id    uuid not null,
+  deleted_at timestamptz not null default now(),
+  primary key (entity, id)
+);
+
+create index if not exists idx_sync_tombstones_user_deleted
+  on public.sync_tombstones (user_id, deleted_at, id);
+
+alter table public.sync_tombstones enable row level security;
+
+create policy if not exists "sync_tombstones_select_own"
+  on public.sync_tombstones for select
+  using (auth.uid() = user_id);
+
+create or replace function public.sync_touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+-- Trigger argument: the entity name recorded in the tombstone
+create or replace function public.sync_record_tombstone()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  insert into public.sync_tombstones (entity, id, user_id)
+  values (tg_argv[0], old.id, old.user_id)
+  on conflict (entity, id) do update set deleted_at = now(), user_id = excluded.user_id;
+  return old;
+end;
+$$;
+
+-- Memories had no updated_at; existing rows start from their creation time
+alter table public.user_memories add column if not exists updated_at timestamptz;
+update public.user_memories set updated_at = created_at where updated_at is null;
+alter table public.user_memories
+  alter column updated_at set default now(),
+  alter column updated_at set not null;
+
+drop trigger if exists trg_cycling_activities_touch on public.cycling_activities;
+create trigger trg_cycling_activities_touch before update on public.cycling_activities
+  for each row execute function public.sync_touch_updated_at();
+drop trigger if exists trg_cycling_activities_tombstone on public.cycling_activities;
+create trigger trg_cycling_activities_tombstone after delete on public.cycling_activities
+  for each row execute function public.sync_record_tombstone('activities');
+
+drop trigger if exists trg_schedule_intervals_touch on public.schedule_intervals;
+create trigger trg_schedule_intervals_touch before update on public.schedule_intervals
+  for each row execute function public.sync_touch_updated_at();
+drop trigger if exists trg_schedule_intervals_tombstone on public.schedule_intervals;
+create trigger trg_schedule_intervals_tombstone after delete on public.schedule_intervals
+  for each row execute function public.sync_record_tombstone('intervals');
+
+drop trigger if exists trg_schedule_recurrences_touch on public.schedule_recurrences;
+create trigger trg_schedule_recurrences_touch before update on public.schedule_recurrences
+  for each row execute function public.sync_touch_updated_at();
+drop trigger if exists trg_schedule_recurrences_tombstone on public.schedule_recurrences;
+create trigger trg_schedule_recurrences_tombstone after delete on public.schedule_recurrences
+  for each row execute function public.sync_record_tombstone('recurrences');
+
+drop trigger if exists trg_user_memories_touch on public.user_memories;
+create trigger trg_user_memories_touch before update on public.user_memories
+  for each row execute function public.sync_touch_updated_at();
+drop trigger if exists trg_user_memories_tombstone on public.user_memories;
+create trigger trg_user_memories_tombstone after delete on public.user_memories
+  for each row execute function public.sync_record_tombstone('memories');
+
+-- (user_id, updated_at, id) serves the keyset scan of sync_changes per table
+create index if not exists idx_cycling_activities_user_updated_id
+  on public.cycling_activities (user_id, updated_at, id);
+create index if not exists idx_schedule_intervals_user_updated_id
+  on public.schedule_intervals (user_id, updated_at, id);
+create index if not exists idx_schedule_recurrences_user_updated_id
+  on public.schedule_recurrences (user_id, updated_at, id);
+create index if not exists idx_user_memories_user_updated_id
+  on public.user_memories (user_id, updated_at, id);
+
+create or replace function public.prune_sync_tombstones(p_older_than interval default interval '90 days')
+returns integer
+language sql
+security definer
+set search_path = public
+as $$
+  with gone as (
+    delete from public.sync_tombstones where deleted_at < now() - p_older_than returning 1
+  )
+  select count(*)::int from gone;
+$$;
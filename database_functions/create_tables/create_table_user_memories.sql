@@ -10,7 +10,8 @@ CREATE TABLE IF NOT EXISTS public.user_memories (
 );
 
 -- Helpful indexes
-CREATE INDEX IF NOT EXISTS idx_user_memories_user_id_created_at
-  ON public.user_memories (user_id, created_at DESC);
-
-
+-- (user_id, created_at, id) serves both offset listing and keyset pagination
+-- (see list_user_memories_keyset); it supersedes the older (user_id, created_at) index.
+CREATE INDEX IF NOT EXISTS idx_user_memories_user_created_id
+  ON public.user_memories (user_id, created_at DESC, id DESC);
+DROP INDEX IF EXISTS public.idx_user_memories_user_id_created_at;
@@ -0,0 +1,107 @@
+-- Upserts many cycling activity rows for one user in a single statement.
+-- p_rows is a JSON array of objects keyed by column name:
+--   started_at, ended_at, duration_seconds, distance_km, avg_speed_kmh?,
+--   active_energy_kcal?, elevation_gain_m?, avg_hr_bpm?, max_hr_bpm?, vo2max?
+-- Rows are matched on (user_id, fingerprint) (see cycling_activity_fingerprint):
+-- new rides are inserted, known rides whose other values changed are updated,
+-- and identical re-imports are skipped. Within one call the last copy of a ride wins.
+-- Returns {"inserted", "updated", "skipped", "ids"} with ids in input order.
+-- The batch is atomic: any constraint violation rolls back every row of the call.
+
+create or replace function public.insert_cycling_activities_batch(
+  p_user_id uuid,
+  p_rows jsonb
+)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  v_result jsonb;
+begin
+  if p_rows is null or jsonb_typeof(p_rows) <> 'array' then
+    raise exception 'p_rows must be a JSON array' using errcode = '22023';
+  end if;
+
+  with raw as (
+    select r.*, t.ord
+    from jsonb_array_elements(p_rows) with ordinality as t(value, ord),
+         jsonb_to_record(t.value) as r(
+           started_at timestamptz,
+           ended_at timestamptz,
+           duration_seconds integer,
+           distance_km numeric,
+           avg_speed_kmh numeric,
+           active_energy_kcal numeric,
+           elevation_gain_m numeric,
+           avg_hr_bpm smallint,
+           max_hr_bpm smallint,
+           vo2max numeric
+         )
+  ), input as materialized (
+    -- Cast to the column types first so the fingerprint (and the change check below)
+    -- sees the same rounded values as the stored generated column
+    select
+      typed.*,
+      public.cycling_activity_fingerprint(p_user_id, typed.started_at, typed.duration_seconds, typed.distance_km) as fingerprint
+    from (
+      select
+        ord, started_at, ended_at, duration_seconds,
+        distance_km::numeric(8,3) as distance_km,
+        avg_speed_kmh::numeric(6,2) as avg_speed_kmh,
+        active_energy_kcal::numeric(8,1) as active_energy_kcal,
+        elevation_gain_m::numeric(8,1) as elevation_gain_m,
+        avg_hr_bpm, max_hr_bpm,
+        vo2max::numeric(5,1) as vo2max
+      from raw
+    ) typed
+  ), deduped as (
+    -- ON CONFLICT cannot touch the same row twice in one statement
+    select distinct on (fingerprint) *
+    from input
+    order by fingerprint, ord desc
+  ), upserted as (
+    insert into public.cycling_activities as c (
+      user_id, started_at, ended_at, duration_seconds, distance_km,
+      avg_speed_kmh, active_energy_kcal, elevation_gain_m, avg_hr_bpm, max_hr_bpm, vo2max
+    )
+    select
+      p_user_id, started_at, ended_at, duration_seconds, distance_km,
+      avg_speed_kmh, active_energy_kcal, elevation_gain_m, avg_hr_bpm, max_hr_bpm, vo2max
+    from deduped
+    on conflict (user_id, fingerprint) do update set
+      started_at = excluded.started_at,
+      ended_at = excluded.ended_at,
+      distance_km = excluded.distance_km,
+      avg_speed_kmh = excluded.avg_speed_kmh,
+      active_energy_kcal = excluded.active_energy_kcal,
+      elevation_gain_m = excluded.elevation_gain_m,
+      avg_hr_bpm = excluded.avg_hr_bpm,
+      max_hr_bpm = excluded.max_hr_bpm,
+      vo2max = excluded.vo2max,
+      updated_at = now()
+    where (c.started_at, c.ended_at, c.distance_km, c.avg_speed_kmh, c.active_energy_kcal,
+           c.elevation_gain_m, c.avg_hr_bpm, c.max_hr_bpm, c.vo2max)
+      is distinct from
+          (excluded.started_at, excluded.ended_at, excluded.distance_km, excluded.avg_speed_kmh, excluded.active_energy_kcal,
+           excluded.elevation_gain_m, excluded.avg_hr_bpm, excluded.max_hr_bpm, excluded.vo2max)
+    returning c.id, c.fingerprint, (c.xmax = 0) as was_inserted
+  ), ids as (
+    -- Skipped rides are not returned by the upsert; their existing row predates this statement
+    select input.ord, coalesce(u.id, existing.id) as id
+    from input
+    left join upserted u on u.fingerprint = input.fingerprint
+    left join public.cycling_activities existing
+      on existing.user_id = p_user_id and existing.fingerprint = input.fingerprint
+  )
+  select jsonb_build_object(
+    'inserted', (select count(*) from upserted where was_inserted),
+    'updated', (select count(*) from upserted where not was_inserted),
+    'skipped', (select count(*) from input) - (select count(*) from upserted),
+    'ids', (select coalesce(jsonb_agg(id order by ord), '[]'::jsonb) from ids)
+  ) into v_result;
+
+  return v_result;
+end;
+$$;
@@ -1,5 +1,11 @@
--- Inserts one cycling activity row and returns the new id
--- Designed for reusable, one-at-a-time ingestion from CSV
+-- Upserts one cycling activity row and returns {"id", "action"}
+-- action is inserted | updated | skipped; rides are matched on their fingerprint
+-- (user, start, duration, distance) so re-importing the same CSV is harmless.
+-- The return type changed from uuid, so the old signature is dropped first.
+
+drop function if exists public.insert_cycling_activity(
+  uuid, timestamptz, timestamptz, integer, numeric, numeric, numeric, numeric, smallint, smallint, numeric
+);
 
 create or replace function public.insert_cycling_activity(
   p_user_id uuid,
@@ -14,22 +20,37 @@ create or replace function public.insert_cycling_activity(
   p_max_hr_bpm smallint,
   p_vo2max numeric
 )
-returns uuid
+returns jsonb
 language plpgsql
 security definer
 set search_path = public
 as $$
 declare
-  v_id uuid;
+  v_result jsonb;
 begin
-  insert into public.cycling_activities (
-    user_id, started_at, ended_at, duration_seconds, distance_km,
-    avg_speed_kmh, active_energy_kcal, elevation_gain_m, avg_hr_bpm, max_hr_bpm, vo2max
-  ) values (
-    p_user_id, p_start_time, p_end_time, p_duration_seconds, p_distance_km,
-    p_avg_speed_kmh, p_active_energy_kcal, p_elevation_gain_m, p_avg_hr_bpm, p_max_hr_bpm, p_vo2max
-  ) returning id into v_id;
+  v_result := public.insert_cycling_activities_batch(
+    p_user_id,
+    jsonb_build_array(jsonb_build_object(
+      'started_at', p_start_time,
+      'ended_at', p_end_time,
+      'duration_seconds', p_duration_seconds,
+      'distance_km', p_distance_km,
+      'avg_speed_kmh', p_avg_speed_kmh,
+      'active_energy_kcal', p_active_energy_kcal,
+      'elevation_gain_m', p_elevation_gain_m,
+      'avg_hr_bpm', p_avg_hr_bpm,
+      'max_hr_bpm', p_max_hr_bpm,
+      'vo2max', p_vo2max
+    ))
+  );
 
-  return v_id;
+  return jsonb_build_object(
+    'id', v_result->'ids'->0,
+    'action', case
+      when (v_result->>'inserted')::int = 1 then 'inserted'
+      when (v_result->>'updated')::int = 1 then 'updated'
+      else 'skipped'
+    end
+  );
 end;
 $$;
@@ -0,0 +1,41 @@
+-- Keyset-paginated rides in a date window, oldest first, for exports.
+-- Pass the (started_at, id) of the last row of the previous page as
+-- p_after_started_at / p_after_id; each page is an index range scan, so
+-- deep pages cost the same as the first.
+
+create or replace function public.load_cycling_activities_page(
+  p_start_date_iso   text,
+  p_end_date_iso     text,
+  p_user_id          uuid default null,
+  p_after_started_at timestamptz default null,
+  p_after_id         uuid default null,
+  p_limit            int default 1000
+)
+returns jsonb
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  with bounds as (
+    select (p_start_date_iso)::timestamptz as start_ts,
+           (p_end_date_iso)::timestamptz   as end_ts
+  ), rows as (
+    select
+      id, user_id, started_at, ended_at, duration_seconds, distance_km,
+      avg_speed_kmh, active_energy_kcal, elevation_gain_m, avg_hr_bpm,
+      max_hr_bpm, vo2max, created_at, updated_at
+    from public.cycling_activities, bounds
+    where started_at >= bounds.start_ts
+      and started_at <  bounds.end_ts
+      and (p_user_id is null or user_id = p_user_id)
+      and (
+        p_after_started_at is null
+        or (started_at, id) > (p_after_started_at, coalesce(p_after_id, '00000000-0000-0000-0000-000000000000'::uuid))
+      )
+    order by started_at, id
+    limit p_limit
+  )
+  select coalesce(jsonb_agg(to_jsonb(rows) order by started_at, id), '[]'::jsonb)
+  from rows;
+$$;
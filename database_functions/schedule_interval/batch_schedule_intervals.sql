@@ -0,0 +1,80 @@
+-- Applies an array of create/update/delete operations in one round trip.
+-- Each element: {"op": "create"|"update"|"delete", ...fields}. Field names
+-- match the single-item functions without the p_ prefix:
+--   create: user_id, type, start, end, title?, description?
+--   update: id, new_start?, new_end?, type?, title?, description?, snap?
+--   delete: id
+-- With p_atomic = true (default) the first failing item aborts the whole batch
+-- (nothing is written). Otherwise every item runs in its own subtransaction
+-- and failures are reported per item.
+
+create or replace function public.batch_schedule_intervals(
+  p_ops    jsonb,
+  p_atomic boolean default true
+)
+returns jsonb
+language plpgsql
+security invoker
+as $$
+declare
+  v_op      jsonb;
+  v_kind    text;
+  v_idx     integer := 0;
+  v_id      uuid;
+  v_row     record;
+  v_results jsonb := '[]'::jsonb;
+begin
+  if p_ops is null or jsonb_typeof(p_ops) <> 'array' then
+    raise exception 'p_ops must be a JSON array' using errcode = '22023';
+  end if;
+
+  for v_op in select value from jsonb_array_elements(p_ops) loop
+    v_kind := v_op->>'op';
+    begin
+      if v_kind = 'create' then
+        v_id := public.create_schedule_interval(
+          (v_op->>'user_id')::uuid,
+          (v_op->>'type')::schedule_type,
+          (v_op->>'start')::timestamptz,
+          (v_op->>'end')::timestamptz,
+          v_op->>'title',
+          v_op->>'description'
+        );
+        v_results := v_results || jsonb_build_object('index', v_idx, 'op', v_kind, 'ok', true, 'id', v_id);
+
+      elsif v_kind = 'update' then
+        select * into v_row
+          from public.update_schedule_interval_by_id(
+            (v_op->>'id')::uuid,
+            (v_op->>'new_start')::timestamptz,
+            (v_op->>'new_end')::timestamptz,
+            (v_op->>'type')::schedule_type,
+            v_op->>'title',
+            v_op->>'description',
+            coalesce((v_op->>'snap')::boolean, true)
+          );
+        v_results := v_results || jsonb_build_object(
+          'index', v_idx, 'op', v_kind, 'ok', true, 'id', v_row.id, 'interval', to_jsonb(v_row)
+        );
+
+      elsif v_kind = 'delete' then
+        v_id := public.delete_schedule_interval_by_id((v_op->>'id')::uuid);
+        v_results := v_results || jsonb_build_object('index', v_idx, 'op', v_kind, 'ok', true, 'id', v_id);
+
+      else
+        raise exception 'Unknown op %', coalesce(v_kind, '<null>') using errcode = '22023';
+      end if;
+
+    exception when others then
+      if p_atomic then
+        raise exception 'batch item % (%) failed: %', v_idx, coalesce(v_kind, '<null>'), sqlerrm
+          using errcode = sqlstate;
+      end if;
+      v_results := v_results || jsonb_build_object('index', v_idx, 'op', v_kind, 'ok', false, 'error', sqlerrm);
+    end;
+    v_idx := v_idx + 1;
+  end loop;
+
+  return v_results;
+end;
+$$;
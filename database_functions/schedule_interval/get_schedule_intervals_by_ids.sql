@@ -0,0 +1,24 @@
+-- Returns the stored (unclipped) intervals for the given ids.
+-- Used by the backend to resolve full periods before conflict checks on updates.
+create or replace function public.get_schedule_intervals_by_ids(
+  p_ids uuid[]
+)
+returns table (
+  id          uuid,
+  user_id     uuid,
+  type        schedule_type,
+  start_at    timestamptz,
+  end_at      timestamptz,
+  title       text,
+  description text
+)
+language sql
+security invoker
+stable
+as $$
+  select si.id, si.user_id, si.type,
+         lower(si.period) as start_at, upper(si.period) as end_at,
+         si.title, si.description
+    from public.schedule_intervals as si
+   where si.id = any (p_ids);
+$$;
@@ -0,0 +1,45 @@
+-- Keyset-paginated variant of list_schedule_intervals for exports.
+-- Returns unclipped intervals overlapping [p_start, p_end) ordered by (start_at, id),
+-- strictly after the (p_after_start, p_after_id) cursor when given.
+create or replace function public.list_schedule_intervals_page(
+  p_start       timestamptz,
+  p_end         timestamptz,
+  p_user_id     uuid default null,
+  p_types       schedule_type[] default null,
+  p_after_start timestamptz default null,
+  p_after_id    uuid default null,
+  p_limit       integer default 500
+)
+returns table (
+  id          uuid,
+  user_id     uuid,
+  type        schedule_type,
+  start_at    timestamptz,
+  end_at      timestamptz,
+  title       text,
+  description text,
+  created_at  timestamptz,
+  updated_at  timestamptz
+)
+language plpgsql
+security invoker
+stable
+as $$
+begin
+  if p_start >= p_end then
+    raise exception 'p_start (%) must be before p_end (%)', p_start, p_end
+      using errcode = '22007';
+  end if;
+
+  return query
+  select si.id, si.user_id, si.type, si.start_at, si.end_at,
+         si.title, si.description, si.created_at, si.updated_at
+    from public.schedule_intervals si
+   where si.period && tstzrange(p_start, p_end, '[)')
+     and (p_user_id is null or si.user_id = p_user_id)
+     and (p_types  is null or si.type = any (p_types))
+     and (p_after_start is null or (si.start_at, si.id) > (p_after_start, p_after_id))
+   order by si.start_at, si.id
+   limit greatest(1, least(p_limit, 5000));
+end;
+$$;
@@ -0,0 +1,26 @@
+-- Skips one occurrence of a series (EXDATE). Idempotent for repeated dates.
+create or replace function public.add_schedule_recurrence_exception(
+  p_id               uuid,
+  p_occurrence_start timestamptz
+)
+returns uuid
+language plpgsql
+security invoker
+as $$
+declare
+  v_id uuid;
+begin
+  update public.schedule_recurrences as r
+     set exdates    = case when p_occurrence_start = any (r.exdates) then r.exdates
+                           else array_append(r.exdates, p_occurrence_start) end,
+         updated_at = now()
+   where r.id = p_id
+   returning r.id into v_id;
+
+  if v_id is null then
+    raise exception 'No recurrence with id %', p_id;
+  end if;
+
+  return v_id;
+end;
+$$;
@@ -0,0 +1,34 @@
+-- Stores a recurring series. The backend validates the RRULE, snaps the first
+-- occurrence to the 15-minute grid and precomputes p_series_end.
+create or replace function public.create_schedule_recurrence(
+  p_user_id          uuid,
+  p_type             schedule_type,
+  p_dtstart          timestamptz,
+  p_duration_minutes integer,
+  p_rrule            text,
+  p_exdates          timestamptz[] default '{}',
+  p_series_end       timestamptz default null,
+  p_title            text default null,
+  p_description      text default null
+)
+returns uuid
+language plpgsql
+security invoker
+as $$
+declare
+  v_id uuid;
+begin
+  if p_rrule is null or length(trim(p_rrule)) = 0 then
+    raise exception 'rrule cannot be empty' using errcode = '22023';
+  end if;
+
+  insert into public.schedule_recurrences
+    (user_id, type, dtstart, duration_minutes, rrule, exdates, series_end, title, description)
+  values
+    (p_user_id, p_type, p_dtstart, p_duration_minutes, p_rrule,
+     coalesce(p_exdates, '{}'), p_series_end, p_title, p_description)
+  returning id into v_id;
+
+  return v_id;
+end;
+$$;
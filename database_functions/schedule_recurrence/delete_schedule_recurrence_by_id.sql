@@ -0,0 +1,21 @@
+create or replace function public.delete_schedule_recurrence_by_id(
+  p_id uuid
+)
+returns uuid
+language plpgsql
+security invoker
+as $$
+declare
+  v_id uuid;
+begin
+  delete from public.schedule_recurrences as r
+   where r.id = p_id
+   returning r.id into v_id;
+
+  if v_id is null then
+    raise exception 'No recurrence with id %', p_id;
+  end if;
+
+  return v_id;
+end;
+$$;
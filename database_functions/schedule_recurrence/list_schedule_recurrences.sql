@@ -0,0 +1,33 @@
+-- Lists series that may have occurrences overlapping [p_start, p_end).
+-- NULL bounds disable the window filter (list all series).
+create or replace function public.list_schedule_recurrences(
+  p_start   timestamptz default null,
+  p_end     timestamptz default null,
+  p_user_id uuid default null,
+  p_types   schedule_type[] default null
+)
+returns table (
+  id               uuid,
+  user_id          uuid,
+  type             schedule_type,
+  dtstart          timestamptz,
+  duration_minutes integer,
+  rrule            text,
+  exdates          timestamptz[],
+  series_end       timestamptz,
+  title            text,
+  description      text
+)
+language sql
+security invoker
+stable
+as $$
+  select r.id, r.user_id, r.type, r.dtstart, r.duration_minutes, r.rrule,
+         r.exdates, r.series_end, r.title, r.description
+    from public.schedule_recurrences as r
+   where (p_end is null or r.dtstart < p_end)
+     and (p_start is null or r.series_end is null or r.series_end > p_start)
+     and (p_user_id is null or r.user_id = p_user_id)
+     and (p_types is null or r.type = any (p_types))
+   order by r.dtstart;
+$$;
@@ -0,0 +1,80 @@
+-- Changes to a user's synced rows after a (changed_at, id) cursor, oldest first.
+-- Each element: {"entity", "op": "upsert"|"delete", "id", "changed_at", "data"}
+-- where data is the full row for upserts and null for deletes (from sync_tombstones).
+-- p_entities limits the result to some of: activities, intervals, recurrences, memories.
+-- Rows changed within the last p_settle_seconds are held back: now() is the
+-- transaction start time, so a slow transaction can commit a change stamped
+-- slightly before a cursor that was already handed out.
+-- Every branch is a keyset scan on its (user_id, updated_at, id) index.
+
+create or replace function public.sync_changes(
+  p_user_id        uuid,
+  p_since_ts       timestamptz default null,
+  p_since_id       uuid default null,
+  p_limit          integer default 500,
+  p_entities       text[] default null,
+  p_settle_seconds integer default 2
+)
+returns jsonb
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  with bounds as (
+    select
+      coalesce(p_since_ts, '-infinity'::timestamptz) as since_ts,
+      coalesce(p_since_id, '00000000-0000-0000-0000-000000000000'::uuid) as since_id,
+      now() - make_interval(secs => p_settle_seconds) as until_ts
+  ), changes as (
+    (select 'activities' as entity, 'upsert' as op, a.id, a.updated_at as changed_at,
+            to_jsonb(a) - 'fingerprint' as data
+       from public.cycling_activities a, bounds b
+      where a.user_id = p_user_id
+        and (p_entities is null or 'activities' = any(p_entities))
+        and (a.updated_at, a.id) > (b.since_ts, b.since_id)
+        and a.updated_at <= b.until_ts
+      order by a.updated_at, a.id
+      limit p_limit)
+    union all
+    (select 'intervals', 'upsert', i.id, i.updated_at, to_jsonb(i) - 'period'
+       from public.schedule_intervals i, bounds b
+      where i.user_id = p_user_id
+        and (p_entities is null or 'intervals' = any(p_entities))
+        and (i.updated_at, i.id) > (b.since_ts, b.since_id)
+        and i.updated_at <= b.until_ts
+      order by i.updated_at, i.id
+      limit p_limit)
+    union all
+    (select 'recurrences', 'upsert', r.id, r.updated_at, to_jsonb(r)
+       from public.schedule_recurrences r, bounds b
+      where r.user_id = p_user_id
+        and (p_entities is null or 'recurrences' = any(p_entities))
+        and (r.updated_at, r.id) > (b.since_ts, b.since_id)
+        and r.updated_at <= b.until_ts
+      order by r.updated_at, r.id
+      limit p_limit)
+    union all
+    (select 'memories', 'upsert', m.id, m.updated_at, to_jsonb(m)
+       from public.user_memories m, bounds b
+      where m.user_id = p_user_id
+        and (p_entities is null or 'memories' = any(p_entities))
+        and (m.updated_at, m.id) > (b.since_ts, b.since_id)
+        and m.updated_at <= b.until_ts
+      order by m.updated_at, m.id
+      limit p_limit)
+    union all
+    (select t.entity, 'delete', t.id, t.deleted_at, null::jsonb
+       from public.sync_tombstones t, bounds b
+      where t.user_id = p_user_id
+        and (p_entities is null or t.entity = any(p_entities))
+        and (t.deleted_at, t.id) > (b.since_ts, b.since_id)
+        and t.deleted_at <= b.until_ts
+      order by t.deleted_at, t.id
+      limit p_limit)
+  ), page as (
+    select * from changes order by changed_at, id limit p_limit
+  )
+  select coalesce(jsonb_agg(to_jsonb(page) order by changed_at, id), '[]'::jsonb)
+  from page;
+$$;
@@ -0,0 +1,19 @@
+-- One memory by id for its owner, or null when it does not exist (or belongs to someone else).
+-- Used to confirm a near-duplicate found in a worker's cached index is still there.
+create or replace function public.get_user_memory(
+  p_id      uuid,
+  p_user_id uuid
+)
+returns jsonb
+language sql
+security invoker
+stable
+as $$
+  select to_jsonb(r)
+    from (
+      select m.id, m.user_id, m.title, m.content, m.created_at
+        from public.user_memories as m
+       where m.id = p_id
+         and m.user_id = p_user_id
+    ) r;
+$$;
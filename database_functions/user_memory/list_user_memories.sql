@@ -17,7 +17,7 @@ as $$
   select m.id, m.user_id, m.title, m.content, m.created_at
     from public.user_memories as m
    where m.user_id = p_user_id
-   order by m.created_at desc
+   order by m.created_at desc, m.id desc
    limit greatest(0, p_limit)
    offset greatest(0, p_offset);
 $$;
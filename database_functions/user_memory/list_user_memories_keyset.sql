@@ -0,0 +1,28 @@
+-- Keyset-paginated variant of list_user_memories (newest first).
+-- Returns rows strictly after the (p_before_created_at, p_before_id) cursor when given,
+-- so each page is an index range scan on (user_id, created_at desc, id desc).
+create or replace function public.list_user_memories_keyset(
+  p_user_id           uuid,
+  p_limit             integer default 50,
+  p_before_created_at timestamptz default null,
+  p_before_id         uuid default null
+)
+returns table (
+  id         uuid,
+  user_id    uuid,
+  title      text,
+  content    text,
+  created_at timestamptz
+)
+language sql
+security invoker
+stable
+as $$
+  select m.id, m.user_id, m.title, m.content, m.created_at
+    from public.user_memories as m
+   where m.user_id = p_user_id
+     and (p_before_created_at is null
+          or (m.created_at, m.id) < (p_before_created_at, p_before_id))
+   order by m.created_at desc, m.id desc
+   limit greatest(0, least(p_limit, 1000));
+$$;
@@ -0,0 +1,32 @@
+-- Replaces a memory's content (and title when given); used to merge near-duplicates.
+create or replace function public.update_user_memory(
+  p_id      uuid,
+  p_user_id uuid,
+  p_content text,
+  p_title   text default null
+)
+returns uuid
+language plpgsql
+security invoker
+as $$
+declare
+  v_id uuid;
+begin
+  if p_content is null or length(trim(p_content)) = 0 then
+    raise exception 'content cannot be empty' using errcode='22023';
+  end if;
+
+  update public.user_memories as m
+     set content = p_content,
+         title   = coalesce(nullif(p_title, ''), m.title)
+   where m.id = p_id
+     and m.user_id = p_user_id
+   returning m.id into v_id;
+
+  if v_id is null then
+    raise exception 'No memory with id % (or not owned by user)', p_id;
+  end if;
+
+  return v_id;
+end;
+$$;
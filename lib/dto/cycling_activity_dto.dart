@@ -44,8 +44,8 @@ class CyclingActivityDto {
 
   /// Insert a single activity row via `insert_cycling_activity`.
   ///
-  /// Returns the new activity id (uuid) as a string, or null if the RPC
-  /// returned no value.
+  /// Returns the activity id (uuid) as a string, or null if the RPC
+  /// returned no value. An already stored ride returns its existing id.
   static Future<String?> insertActivity({
     required String userId,
     required CyclingActivity activity,
@@ -68,8 +68,10 @@ class CyclingActivityDto {
 
     final result =
         await supabase.rpc<dynamic>('insert_cycling_activity', params: params);
-    // RPC returns the new id (uuid). It may already be a String.
+    // RPC returns {"id", "action"} (inserted/updated/skipped); re-inserting a
+    // known ride yields the existing id.
     if (result == null) return null;
+    if (result is Map) return result['id']?.toString();
     return result.toString();
   }
 }
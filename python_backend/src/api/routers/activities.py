@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import csv
+import io
+import itertools
+import json
+from xml.etree.ElementTree import ParseError
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from src.services.activity_export import (
+    EXPORT_FORMATS,
+    MEDIA_TYPES,
+    parse_columns,
+    pyarrow_available,
+    stream_export,
+)
+from src.services.activity_service import (
+    insert_activities,
+    insert_activity,
+    iter_activity_pages,
+    normalize_activity,
+    normalize_rows,
+    parse_user_id,
+)
+from src.services.supabase_service import get_client_anon
+from src.utils.apple_health import AppleHealthStreamParser
+from src.utils.intervals import parse_iso_utc
+
+
+router = APIRouter(prefix="/activities", tags=["Activities"])
+
+MAX_BATCH_ROWS = 5000
+MAX_CSV_BYTES = 10 * 1024 * 1024
+MAX_REPORTED_ERRORS = 50
+IMPORT_BATCH_SIZE = 500
+# Fallback for clients that send the owner as a header (ingest_utils with user_id_header)
+USER_ID_HEADER = "x-user-id"
+
+
+def _get_supabase_client():
+    return get_client_anon()
+
+
+async def _read_json_body(request: Request) -> Any:
+    """Decoded JSON body (unwrapping {"body": ...} sent by some tools), or None."""
+    try:
+        raw = await request.body()
+        if not raw:
+            return None
+        obj = json.loads(raw)
+    except Exception:
+        return None
+    if isinstance(obj, dict) and isinstance(obj.get("body"), (dict, list)):
+        return obj["body"]
+    return obj
+
+
+@router.post("", status_code=status.HTTP_200_OK)
+async def create_activity(
+    request: Request,
+    client = Depends(_get_supabase_client),
+) -> Dict[str, Any]:
+    """Insert (or update) one cycling activity.
+
+    Body fields: startTime, endTime, durationSeconds, distanceKm and optional averageSpeedKmh,
+    activeEnergyKcal, elevationGainMeters, averageHeartRateBpm, maxHeartRateBpm, vo2Max.
+    userId comes from the body, the query or an x-user-id header. A ride already stored
+    for the user (same start, duration and distance) is updated or skipped instead of
+    duplicated.
+    Returns {"id", "action": "inserted"|"updated"|"skipped"}.
+    """
+    body_obj = await _read_json_body(request)
+    body: Dict[str, Any] = body_obj if isinstance(body_obj, dict) else {}
+    p_user_id = parse_user_id(
+        body.get("userId") or body.get("user_id") or request.query_params.get("userId") or request.headers.get(USER_ID_HEADER)
+    )
+    try:
+        activity = normalize_activity(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_in_threadpool(insert_activity, client, p_user_id, activity)
+
+
+async def _read_csv_rows(request: Request) -> List[Dict[str, Any]]:
+    """CSV rows from a text/csv body or a multipart upload (field `file`)."""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="multipart upload must include a `file` field")
+        raw = await upload.read(MAX_CSV_BYTES + 1)
+    else:
+        raw = b""
+        async for chunk in request.stream():
+            raw += chunk
+            if len(raw) > MAX_CSV_BYTES:
+                break
+    if len(raw) > MAX_CSV_BYTES:
+        raise HTTPException(status_code=413, detail=f"CSV larger than {MAX_CSV_BYTES} bytes; split the upload")
+
+    reader = csv.DictReader(io.StringIO(raw.decode("utf-8-sig", errors="replace"), newline=""))
+    if not reader.fieldnames:
+        raise HTTPException(status_code=400, detail="CSV has no header row")
+    return list(reader)
+
+
+@router.post("/batch", status_code=status.HTTP_200_OK)
+async def create_activities_batch(
+    request: Request,
+    user_id: Optional[str] = Query(None, alias="userId", description="Owner of the activities"),
+    skip_invalid: bool = Query(False, alias="skipInvalid", description="Insert valid rows and report the rest"),
+    client = Depends(_get_supabase_client),
+) -> Dict[str, Any]:
+    """Insert many activities for one user with batched RPCs.
+
+    Accepts a JSON array (or {"activities": [...], "userId": ...}) using the single
+    endpoint's fields, or a CSV export (text/csv body or multipart `file`) with the
+    columns start_time, end_time, duration_seconds, distance_km, ... All rows are
+    validated before anything is written; by default any invalid row rejects the
+    batch (400 with per-index errors), with skipInvalid=true those rows are skipped.
+    Rows are upserted in chunks, each chunk atomically; known rides are updated or
+    skipped, so re-importing a file is safe. The owner may also come from an x-user-id
+    header. Returns inserted/updated/skipped counts.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(("text/csv", "application/csv", "multipart/form-data")):
+        rows: Any = await _read_csv_rows(request)
+    else:
+        rows = await _read_json_body(request)
+        if isinstance(rows, dict):
+            user_id = user_id or rows.get("userId") or rows.get("user_id")
+            rows = rows.get("activities")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="activities must be an array")
+    p_user_id = parse_user_id(user_id or request.headers.get(USER_ID_HEADER))
+    if not rows:
+        raise HTTPException(status_code=400, detail="No activities to insert")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ROWS} activities per batch")
+
+    activities, errors = normalize_rows(rows)
+    if errors and not skip_invalid:
+        raise HTTPException(status_code=400, detail={"errors": errors[:MAX_REPORTED_ERRORS], "invalid": len(errors)})
+
+    if activities:
+        result = await run_in_threadpool(insert_activities, client, p_user_id, activities)
+    else:
+        result = {"inserted": 0, "updated": 0, "skipped": 0, "ids": []}
+    return {**result, "invalid": len(errors), "errors": errors[:MAX_REPORTED_ERRORS]}
+
+
+@router.post("/import/apple-health", status_code=status.HTTP_200_OK)
+async def import_apple_health(
+    request: Request,
+    user_id: str = Query(..., alias="userId", description="Owner of the imported activities"),
+    client = Depends(_get_supabase_client),
+) -> Dict[str, Any]:
+    """Import cycling workouts from an Apple Health export.xml body.
+
+    The upload is parsed incrementally while it streams in (processed elements are
+    discarded, so memory does not grow with file size) and workouts are upserted in
+    batches of IMPORT_BATCH_SIZE. Returns inserted/updated/skipped counts, the number
+    of cycling workouts found and the ones rejected by validation.
+    """
+    p_user_id = parse_user_id(user_id)
+    summary: Dict[str, Any] = {"workouts": 0, "inserted": 0, "updated": 0, "skipped": 0, "invalid": 0, "errors": []}
+    pending: List[Dict[str, Any]] = []
+
+    async def flush() -> None:
+        if not pending:
+            return
+        batch = list(pending)
+        pending.clear()
+        result = await run_in_threadpool(insert_activities, client, p_user_id, batch)
+        for key in ("inserted", "updated", "skipped"):
+            summary[key] += result[key]
+
+    async def handle(workouts: List[Dict[str, Any]]) -> None:
+        for workout in workouts:
+            index = summary["workouts"]
+            summary["workouts"] += 1
+            try:
+                pending.append(normalize_activity(workout))
+            except ValueError as e:
+                summary["invalid"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append({"index": index, "startedAt": workout.get("started_at"), "error": str(e)})
+            if len(pending) >= IMPORT_BATCH_SIZE:
+                await flush()
+
+    parser = AppleHealthStreamParser()
+    try:
+        async for chunk in request.stream():
+            await handle(parser.feed(chunk))
+        await handle(parser.close())
+    except ParseError as e:
+        # Batches already written stay written; re-uploading is safe (upsert)
+        await flush()
+        raise HTTPException(status_code=400, detail={"message": f"Invalid export.xml: {e}", **summary})
+    await flush()
+    return summary
+
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+def export_activities(
+    user_id: Optional[str] = Query(None, alias="userId", description="Only this user's activities; omit for all users"),
+    start_date_iso: Optional[str] = Query(None, alias="startDateIso", description="Inclusive lower bound on started_at"),
+    end_date_iso: Optional[str] = Query(None, alias="endDateIso", description="Exclusive upper bound on started_at"),
+    format: str = Query("parquet", description="parquet or arrow (IPC stream)"),
+    columns: Optional[str] = Query(None, description="Comma-separated columns to include; default all"),
+    page_size: int = Query(5000, alias="pageSize", ge=100, le=20000, description="Rows per record batch / row group"),
+    client = Depends(_get_supabase_client),
+) -> StreamingResponse:
+    """Stream activities as Parquet or an Arrow IPC stream, oldest first.
+
+    Rows are read with keyset pagination on (started_at, id); every page is
+    encoded as one record batch (Parquet row group) and sent before the next
+    page is fetched, so large exports run in constant memory. Needs pyarrow
+    (the `export` extra); returns 501 without it.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(EXPORT_FORMATS)}")
+    if not pyarrow_available():
+        raise HTTPException(status_code=501, detail="Exports need pyarrow; install the `export` extra")
+    try:
+        projection = parse_columns(columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    p_user_id = parse_user_id(user_id) if user_id else None
+    start_iso = start_date_iso or "-infinity"
+    end_iso = end_date_iso or "infinity"
+    for label, value in (("startDateIso", start_date_iso), ("endDateIso", end_date_iso)):
+        if value:
+            try:
+                parse_iso_utc(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"{label} must be ISO-8601")
+
+    pages = iter_activity_pages(client, start_iso, end_iso, p_user_id, page_size)
+    # Fetch the first page before responding so database errors still become a proper status
+    first = next(pages, None)
+    body = stream_export(itertools.chain([first] if first else [], pages), projection, format)
+
+    extension = "parquet" if format == "parquet" else "arrows"
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="cycling_activities.{extension}"'},
+    )
@@ -1,9 +1,14 @@
 import os
 from typing import Any, Dict, Optional
+from uuid import UUID
 
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from mcp.server.fastmcp import FastMCP
 
+from src.services import memory_service
+from src.services.memory_index import memory_indexes
+
 try:
     from supabase import create_client
 except Exception:
@@ -21,6 +26,14 @@ def _get_supabase_client():
     return create_client(supabase_url, supabase_service_key)
 
 
+def _parse_uuid(value: str, name: str) -> str:
+    """Canonical UUID text, so index keys match the HTTP routes."""
+    try:
+        return str(UUID(str(value)))
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"{name} must be a UUID")
+
+
 def register_tools(mcp: FastMCP) -> None:
     @mcp.tool()
     async def agg_cycling_summary(start_date_iso: str, end_date_iso: str, user_id: Optional[str] = None) -> Dict[str, Any]:
@@ -87,26 +100,22 @@ def register_tools(mcp: FastMCP) -> None:
         return {"rides": data or []}
 
     @mcp.tool()
-    async def create_user_memory(user_id: str, content: str, title: Optional[str] = None) -> Dict[str, Any]:
-        """Create a memory row and return its id."""
+    async def create_user_memory(
+        user_id: str, content: str, title: Optional[str] = None, on_duplicate: str = "skip"
+    ) -> Dict[str, Any]:
+        """Create a memory row and return its id; near-duplicates are skipped, merged or flagged."""
         client = _get_supabase_client()
-        res = client.rpc(
-            "create_user_memory",
-            {"p_user_id": user_id, "p_title": title, "p_content": content},
-        ).execute()
-        data = getattr(res, "data", None)
-        err = getattr(res, "error", None)
-        if err:
-            raise HTTPException(status_code=500, detail=str(err))
-        return {"id": data}
+        p_user_id = _parse_uuid(user_id, "user_id")
+        return await run_in_threadpool(memory_service.create_memory, client, p_user_id, content, title, on_duplicate)
 
     @mcp.tool()
     async def delete_user_memory(id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Delete a memory row by id. Optionally enforce owner."""
         client = _get_supabase_client()
-        payload: Dict[str, Any] = {"p_id": id}
-        if user_id is not None:
-            payload["p_user_id"] = user_id
+        payload: Dict[str, Any] = {"p_id": _parse_uuid(id, "id")}
+        p_user_id = _parse_uuid(user_id, "user_id") if user_id is not None else None
+        if p_user_id is not None:
+            payload["p_user_id"] = p_user_id
         res = client.rpc(
             "delete_user_memory",
             payload,
@@ -115,5 +124,11 @@ def register_tools(mcp: FastMCP) -> None:
         err = getattr(res, "error", None)
         if err:
             raise HTTPException(status_code=500, detail=str(err))
+        # Keep the in-process search/dedup index in step, as the HTTP route does
+        if data:
+            if p_user_id is not None:
+                memory_indexes.on_delete(p_user_id, payload["p_id"])
+            else:
+                memory_indexes.invalidate()
         return {"id": data}
 
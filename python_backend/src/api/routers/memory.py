@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Literal
 from uuid import UUID
 import os
 
@@ -8,7 +8,12 @@ from fastapi import APIRouter, HTTPException, status, Depends, Request, Body, Qu
 from pydantic import BaseModel, Field, ConfigDict, constr, ValidationError
 import json
 
+from fastapi.concurrency import run_in_threadpool
+
+from src.services import memory_service
+from src.services.memory_index import memory_indexes
 from src.services.supabase_service import get_client_anon
+from src.utils.cursor import decode_cursor, next_cursor
 
 router = APIRouter(prefix="/memories", tags=["Memories"])
 FIXED_USER_ID = UUID("00000000-0000-0000-0000-000000000000")
@@ -27,7 +32,8 @@ async def create_memory(request: Request, client = Depends(_get_supabase_client)
     """Create a user memory using JSON body (userId, content, optional title).
 
     Accepts either a plain JSON object or a wrapped payload {"body": {...}} as sent by some tools.
-    Returns the UUID of the new memory.
+    Near-duplicates of an existing memory are handled per `onDuplicate` (body or query):
+    skip (default), merge or flag. Returns {id, action, duplicate_of?, similarity?}.
     """
     raw = await request.body()                               # <- await
     try:
@@ -47,23 +53,10 @@ async def create_memory(request: Request, client = Depends(_get_supabase_client)
         # Return and log exact validation errors (what 422 means in FastAPI)
         raise HTTPException(status_code=422, detail=e.errors())
 
-    res = client.rpc(
-        "create_user_memory",
-        {"p_user_id": str(req.user_id), "p_title": req.title, "p_content": req.content},
-    ).execute()
-
-    data = getattr(res, "data", None)
-    err = getattr(res, "error", None)
-    if err:
-        raise HTTPException(500, str(err))
-    if not data:
-        raise HTTPException(500, "Empty response from RPC")
-
-    try:
-        new_id = str(UUID(str(data)))
-    except Exception:
-        new_id = str(data)
-    return {"id": new_id}
+    on_duplicate = payload.get("onDuplicate") or request.query_params.get("onDuplicate") or "skip"
+    return await run_in_threadpool(
+        memory_service.create_memory, client, str(req.user_id), req.content, req.title, str(on_duplicate)
+    )
 
 
 
@@ -102,31 +95,86 @@ def delete_memory(
         deleted_id = str(UUID(str(data)))
     except Exception:
         deleted_id = str(data)
+    memory_indexes.on_delete(p_user_id, deleted_id)
     return {"id": deleted_id}
 
 @router.get("", status_code=status.HTTP_200_OK)
 def list_memories(
     user_id: str = Query(..., alias="userId", description="User UUID (Supabase user id)"),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
+    offset: int = Query(0, ge=0, description="Deprecated: prefer cursor"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
     client = Depends(_get_supabase_client),
 ) -> Dict[str, Any]:
-    """List memories for a user (newest first) with pagination via limit/offset."""
+    """List memories for a user (newest first).
+
+    Paginate with `cursor` (keyset on created_at, id; stable under concurrent inserts).
+    `offset` is still accepted for older clients. `next_cursor` is null on the last page.
+    """
     try:
         p_user_id = str(UUID(user_id))
     except Exception:
         raise HTTPException(status_code=400, detail="userId must be a UUID")
 
-    res = client.rpc(
-        "list_user_memories",
-        {"p_user_id": p_user_id, "p_limit": int(limit), "p_offset": int(offset)},
-    ).execute()
+    if offset and cursor:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+
+    if offset:
+        res = client.rpc(
+            "list_user_memories",
+            {"p_user_id": p_user_id, "p_limit": int(limit), "p_offset": int(offset)},
+        ).execute()
+
+        data = getattr(res, "data", None)
+        err = getattr(res, "error", None)
+        if err:
+            raise HTTPException(status_code=500, detail=str(err))
+        items: Any = data or []
+    else:
+        try:
+            before = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        items = memory_service.list_memories_page(client, p_user_id, limit, before)
+
+    return {"memories": items, "next_cursor": next_cursor(items, limit)}
 
-    data = getattr(res, "data", None)
-    err = getattr(res, "error", None)
-    if err:
-        raise HTTPException(status_code=500, detail=str(err))
 
-    items: Any = data or []
-    return {"memories": items}
+@router.get("/search", status_code=status.HTTP_200_OK)
+def search_memories(
+    user_id: str = Query(..., alias="userId", description="User UUID (Supabase user id)"),
+    q: constr(strip_whitespace=True, min_length=1) = Query(..., description="Free-text query"),
+    limit: int = Query(5, ge=1, le=50),
+    client = Depends(_get_supabase_client),
+) -> Dict[str, Any]:
+    """Full-text search over a user's memories, best BM25 matches first.
+
+    Uses an in-process index built on first use and updated on create/delete.
+    """
+    try:
+        p_user_id = str(UUID(user_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="userId must be a UUID")
+
+    hits = memory_indexes.search(p_user_id, lambda: memory_service.load_all_memories(client, p_user_id), q, limit)
+    return {"memories": [{**row, "score": round(score, 4)} for score, row in hits]}
+
+
+@router.get("/context", status_code=status.HTTP_200_OK)
+def memory_context(
+    user_id: str = Query(..., alias="userId", description="User UUID (Supabase user id)"),
+    q: str = Query("", description="What the conversation is about; empty favours recent memories"),
+    budget: int = Query(400, ge=16, le=8000, description="Size limit for the packed context"),
+    unit: Literal["tokens", "chars"] = Query("tokens"),
+    client = Depends(_get_supabase_client),
+) -> Dict[str, Any]:
+    """Relevant and recent memories packed into a token/character budget for prompts.
+
+    Returns {context, memories, used, budget, unit}; `context` is ready-to-insert text.
+    """
+    try:
+        p_user_id = str(UUID(user_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="userId must be a UUID")
 
+    return memory_service.build_context(client, p_user_id, q, budget, unit)
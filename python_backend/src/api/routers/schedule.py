@@ -1,16 +1,24 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import codecs
+import itertools
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import APIRouter, HTTPException, Query, status, Request, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 import json
 
+from src.services.schedule_service import load_intervals
 from src.services.supabase_service import get_client_anon
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
-from src.models.schedule_interval import ScheduleInterval, ScheduleType
+from src.models.schedule_interval import ScheduleInterval, ScheduleRecurrence, ScheduleType
+from src.utils.ical import IcsEventReader, calendar_footer, calendar_header, render_event
+from src.utils.intervals import find_conflicts, parse_iso_utc, snap_down, snap_period, snap_up, to_iso_z
+from src.utils.recurrence import RecurrenceRule, parse_rrule, series_end
 import os
 
 
@@ -30,6 +38,119 @@ def _parse_uuid(value: Optional[str]) -> Optional[str]:
         raise HTTPException(status_code=400, detail="Invalid UUID provided")
 
 
+async def _read_json_body(request: Request) -> Any:
+    """Return the decoded JSON body, unwrapping {"body": ...} sent by some tools.
+
+    Empty or invalid bodies yield None so callers can fall back to query params.
+    """
+    try:
+        raw = await request.body()
+        if not raw:
+            return None
+        obj = json.loads(raw)
+    except Exception:
+        return None
+    if isinstance(obj, dict) and isinstance(obj.get("body"), (dict, list)):
+        return obj["body"]
+    return obj
+
+
+def _check_iso(value: Any) -> bool:
+    try:
+        datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return True
+    except Exception:
+        return False
+
+
+def _parse_types_csv(types_csv: Optional[str]) -> Optional[List[str]]:
+    if not types_csv:
+        return None
+    seq = [t.strip() for t in types_csv.split(",") if t.strip()]
+    # Validate against enum values
+    valid = {e.value for e in ScheduleType}
+    for t in seq:
+        if t not in valid:
+            raise HTTPException(status_code=400, detail=f"Invalid type '{t}'. Must be one of {sorted(valid)}")
+    return seq if seq else None
+
+
+def _parse_window(start_date_iso: str, end_date_iso: str) -> Tuple[datetime, datetime]:
+    try:
+        start_dt = parse_iso_utc(start_date_iso)
+        end_dt = parse_iso_utc(end_date_iso)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="startDateIso/endDateIso must be ISO-8601")
+    if start_dt >= end_dt:
+        raise HTTPException(status_code=400, detail="startDateIso must be before endDateIso")
+    return start_dt, end_dt
+
+
+CONFLICT_MODES = ("reject", "report")
+
+
+def _parse_conflict_mode(value: Optional[str]) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    mode = str(value).strip().lower()
+    if mode not in CONFLICT_MODES:
+        raise HTTPException(status_code=400, detail=f"conflicts must be one of {list(CONFLICT_MODES)}")
+    return mode
+
+
+def _get_intervals_by_ids(client, ids: List[str]) -> Dict[str, ScheduleInterval]:
+    """Stored (unclipped) intervals keyed by id; unknown ids are absent."""
+    if not ids:
+        return {}
+    res = client.rpc("get_schedule_intervals_by_ids", {"p_ids": ids}).execute()
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    return {str(row["id"]): ScheduleInterval(**row) for row in data or []}
+
+
+def _detect_conflicts(
+    client,
+    candidates: List[Tuple[Any, str, datetime, datetime]],
+    ignore_ids: Iterable[str] = (),
+) -> Dict[Any, List[str]]:
+    """Find overlaps for (key, user_id, start, end) candidates with one list call per user.
+
+    Existing intervals (including recurring occurrences) are loaded only for the span the
+    candidates cover, then matched with a sweep-line. Ids in `ignore_ids` (rows being
+    updated or deleted) are excluded. Overlaps with other candidates are reported as `batch[<key>]`.
+    """
+    skip = set(ignore_ids)
+    by_user: Dict[str, List[Tuple[Any, datetime, datetime]]] = {}
+    for key, user, start, end in candidates:
+        by_user.setdefault(user, []).append((key, start, end))
+
+    result: Dict[Any, List[str]] = {}
+    for user, items in by_user.items():
+        lo = min(start for _, start, _ in items)
+        hi = max(end for _, _, end in items)
+        if lo >= hi:
+            continue
+        existing = [
+            (str(i.id), i.start_at, i.end_at)
+            for i in load_intervals(client, lo, hi, user)
+            if str(i.id) not in skip
+        ]
+        # Wrap candidate keys so they can never collide with existing interval ids
+        found = find_conflicts([(("c", k), s, e) for k, s, e in items], existing)
+        for (_, key), hits in found.items():
+            result[key] = [f"batch[{h[1]}]" if isinstance(h, tuple) else h for h in hits]
+    return result
+
+
+def _conflict_error(conflicts: Any) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={"message": "Interval overlaps existing schedule", "conflicts": conflicts},
+    )
+
+
 @router.get("/intervals", status_code=status.HTTP_200_OK)
 def list_intervals(
     start_date_iso: str = Query(..., alias="startDateIso", description="Inclusive ISO-8601 UTC start (e.g., 2025-06-01T00:00:00Z)"),
@@ -40,38 +161,16 @@ def list_intervals(
     """List schedule intervals overlapping a date window.
 
     Filters: [startDateIso, endDateIso] (half-open), optional userId and types (CSV of enum values).
-    Returns normalized intervals clipped to the requested window.
+    Returns normalized intervals clipped to the requested window. Occurrences of recurring
+    series are expanded for the window only and carry their `recurrence_id`.
     """
     client = _get_supabase_client()
 
     p_user_uuid = _parse_uuid(user_id)
+    p_types = _parse_types_csv(types_csv)
+    start_dt, end_dt = _parse_window(start_date_iso, end_date_iso)
 
-    p_types: Optional[List[str]] = None
-    if types_csv:
-        seq = [t.strip() for t in types_csv.split(",") if t.strip()]
-        # Validate against enum values
-        valid = {e.value for e in ScheduleType}
-        for t in seq:
-            if t not in valid:
-                raise HTTPException(status_code=400, detail=f"Invalid type '{t}'. Must be one of {sorted(valid)}")
-        p_types = seq if seq else None
-
-    res = client.rpc(
-        "list_schedule_intervals",
-        {
-            "p_start": start_date_iso,
-            "p_end": end_date_iso,
-            "p_user_id": p_user_uuid,
-            **({"p_types": p_types} if p_types is not None else {}),
-        },
-    ).execute()
-
-    data = getattr(res, "data", None)
-    err = getattr(res, "error", None)
-    if err:
-        raise HTTPException(status_code=500, detail=str(err))
-    rows: List[Dict[str, Any]] = data or []
-    items = [ScheduleInterval(**row) for row in rows]
+    items = load_intervals(client, start_dt, end_dt, p_user_uuid, p_types)
     return {"intervals": items}
 
 
@@ -83,19 +182,13 @@ async def create_interval(
     """Create a schedule interval accepting JSON body or query params.
 
     Required: userId, type, startIso/startDateIso, endIso/endDateIso. Optional title, description.
-    Returns the new interval id.
+    Optional conflicts=reject|report checks overlaps with the user's schedule first.
+    Returns the new interval id (and `conflicts` in report mode).
     """
 
     # Parse JSON body if present (tolerate empty/invalid by falling back to query)
-    body: Dict[str, Any] = {}
-    try:
-        raw = await request.body()
-        if raw:
-            body_obj = json.loads(raw)
-            if isinstance(body_obj, dict):
-                body = body_obj.get("body") if isinstance(body_obj.get("body"), dict) else body_obj
-    except Exception:
-        body = {}
+    body_obj = await _read_json_body(request)
+    body: Dict[str, Any] = body_obj if isinstance(body_obj, dict) else {}
 
     qp = request.query_params
 
@@ -105,6 +198,7 @@ async def create_interval(
     end_iso = body.get("endIso") or body.get("endDateIso") or qp.get("endDateIso") or qp.get("endIso")
     title = body.get("title") or qp.get("title")
     description = body.get("description") or qp.get("description")
+    conflict_mode = _parse_conflict_mode(body.get("conflicts") or qp.get("conflicts"))
 
     # Required fields
     if not user_id_raw:
@@ -124,6 +218,16 @@ async def create_interval(
         valid = [e.value for e in ScheduleType]
         raise HTTPException(status_code=400, detail=f"Invalid type '{type_str}'. Must be one of {valid}")
 
+    conflicts: List[str] = []
+    if conflict_mode:
+        try:
+            start_dt, end_dt = snap_period(parse_iso_utc(start_iso), parse_iso_utc(end_iso))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="startIso/endIso must be ISO-8601")
+        conflicts = _detect_conflicts(client, [("new", p_user_uuid, start_dt, end_dt)]).get("new", [])
+        if conflicts and conflict_mode == "reject":
+            raise _conflict_error(conflicts)
+
     res = client.rpc(
         "create_schedule_interval",
         {
@@ -147,15 +251,21 @@ async def create_interval(
     except Exception:
         pass
 
+    if conflict_mode == "report":
+        return {"id": new_id, "conflicts": conflicts}
     return {"id": new_id}
 
 
 @router.patch("/intervals", status_code=status.HTTP_200_OK)
-def update_interval(payload: Dict[str, Any]) -> Dict[str, Any]:
+def update_interval(
+    payload: Dict[str, Any],
+    conflicts_qp: Optional[str] = Query(None, alias="conflicts", description="Optional overlap check: reject or report"),
+) -> Dict[str, Any]:
     """Update a schedule interval by id with partial fields.
 
     Accepts JSON payload with id and any of: newStartIso, newEndIso, type, title, description, snap.
-    Returns the updated interval.
+    Optional conflicts=reject|report (query or body) checks the new period for overlaps.
+    Returns the updated interval (and `conflicts` in report mode).
     """
     client = _get_supabase_client()
 
@@ -182,6 +292,26 @@ def update_interval(payload: Dict[str, Any]) -> Dict[str, Any]:
             valid = [e.value for e in ScheduleType]
             raise HTTPException(status_code=400, detail=f"Invalid type '{type_str}'. Must be one of {valid}")
 
+    conflict_mode = _parse_conflict_mode(payload.get("conflicts") or conflicts_qp)
+    conflicts: List[str] = []
+    if conflict_mode and (new_start is not None or new_end is not None):
+        current = _get_intervals_by_ids(client, [p_id]).get(p_id)
+        if current is None:
+            raise HTTPException(status_code=404, detail="Interval not found")
+        try:
+            start_dt = parse_iso_utc(new_start) if new_start is not None else current.start_at
+            end_dt = parse_iso_utc(new_end) if new_end is not None else current.end_at
+        except ValueError:
+            raise HTTPException(status_code=400, detail="newStartIso/newEndIso must be ISO-8601")
+        if snap:
+            start_dt = snap_down(start_dt) if new_start is not None else start_dt
+            end_dt = snap_up(end_dt) if new_end is not None else end_dt
+        conflicts = _detect_conflicts(
+            client, [(p_id, str(current.user_id), start_dt, end_dt)], ignore_ids=[p_id]
+        ).get(p_id, [])
+        if conflicts and conflict_mode == "reject":
+            raise _conflict_error(conflicts)
+
     res = client.rpc(
         "update_schedule_interval_by_id",
         {
@@ -204,6 +334,8 @@ def update_interval(payload: Dict[str, Any]) -> Dict[str, Any]:
     if not rows:
         raise HTTPException(status_code=404, detail="Interval not found")
     interval = ScheduleInterval(**rows[0])
+    if conflict_mode == "report":
+        return {"interval": interval, "conflicts": conflicts}
     return {"interval": interval}
 
 
@@ -241,3 +373,539 @@ def delete_interval(
 
     return {"id": deleted_id}
 
+
+
+MAX_BATCH_OPS = 200
+
+
+def _validate_batch_op(op: Any) -> Dict[str, Any]:
+    """Validate one batch operation and map it to the RPC's snake_case shape.
+
+    Raises ValueError with a readable message; callers collect these per index.
+    """
+    if not isinstance(op, dict):
+        raise ValueError("operation must be an object")
+    kind = op.get("op")
+    valid_types = [e.value for e in ScheduleType]
+
+    def uuid_field(raw: Any, label: str) -> str:
+        if not raw:
+            raise ValueError(f"{label} is required")
+        try:
+            return str(UUID(str(raw)))
+        except Exception:
+            raise ValueError(f"{label} must be a UUID")
+
+    def iso_field(value: Any, label: str) -> str:
+        if not _check_iso(value):
+            raise ValueError(f"{label} must be ISO-8601")
+        return str(value)
+
+    if kind == "create":
+        start_iso = op.get("startIso") or op.get("startDateIso")
+        end_iso = op.get("endIso") or op.get("endDateIso")
+        type_str = op.get("type")
+        if not type_str:
+            raise ValueError("type is required")
+        if type_str not in valid_types:
+            raise ValueError(f"Invalid type '{type_str}'. Must be one of {valid_types}")
+        if not start_iso:
+            raise ValueError("startIso/startDateIso is required")
+        if not end_iso:
+            raise ValueError("endIso/endDateIso is required")
+        return {
+            "op": "create",
+            "user_id": uuid_field(op.get("userId") or op.get("user_id"), "userId"),
+            "type": type_str,
+            "start": iso_field(start_iso, "startIso"),
+            "end": iso_field(end_iso, "endIso"),
+            "title": op.get("title"),
+            "description": op.get("description"),
+        }
+
+    if kind == "update":
+        type_str = op.get("type")
+        if type_str is not None and type_str not in valid_types:
+            raise ValueError(f"Invalid type '{type_str}'. Must be one of {valid_types}")
+        new_start = op.get("newStartIso")
+        new_end = op.get("newEndIso")
+        return {
+            "op": "update",
+            "id": uuid_field(op.get("id"), "id"),
+            "new_start": iso_field(new_start, "newStartIso") if new_start is not None else None,
+            "new_end": iso_field(new_end, "newEndIso") if new_end is not None else None,
+            "type": type_str,
+            "title": op.get("title"),
+            "description": op.get("description"),
+            "snap": bool(op.get("snap", True)),
+        }
+
+    if kind == "delete":
+        return {"op": "delete", "id": uuid_field(op.get("id"), "id")}
+
+    raise ValueError("op must be one of create, update, delete")
+
+
+def _detect_batch_conflicts(client, ops: List[Dict[str, Any]]) -> Dict[int, List[str]]:
+    """Overlaps per operation index for creates and period-changing updates."""
+    update_ids = [op["id"] for op in ops if op["op"] == "update"]
+    touched = set(update_ids) | {op["id"] for op in ops if op["op"] == "delete"}
+    current = _get_intervals_by_ids(client, update_ids)
+
+    candidates: List[Tuple[Any, str, datetime, datetime]] = []
+    for idx, op in enumerate(ops):
+        if op["op"] == "create":
+            start_dt, end_dt = snap_period(parse_iso_utc(op["start"]), parse_iso_utc(op["end"]))
+            candidates.append((idx, op["user_id"], start_dt, end_dt))
+        elif op["op"] == "update" and op["id"] in current:
+            row = current[op["id"]]
+            start_dt, end_dt = row.start_at, row.end_at
+            if op["new_start"] is not None:
+                start_dt = parse_iso_utc(op["new_start"])
+                start_dt = snap_down(start_dt) if op["snap"] else start_dt
+            if op["new_end"] is not None:
+                end_dt = parse_iso_utc(op["new_end"])
+                end_dt = snap_up(end_dt) if op["snap"] else end_dt
+            candidates.append((idx, str(row.user_id), start_dt, end_dt))
+    return _detect_conflicts(client, candidates, ignore_ids=touched)
+
+
+def _run_batch(client, ops: List[Dict[str, Any]], atomic: bool) -> List[Dict[str, Any]]:
+    res = client.rpc(
+        "batch_schedule_intervals",
+        {"p_ops": ops, "p_atomic": atomic},
+    ).execute()
+
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    return data or []
+
+
+@router.post("/intervals/batch", status_code=status.HTTP_200_OK)
+async def batch_intervals(
+    request: Request,
+    client = Depends(_get_supabase_client),
+) -> Dict[str, Any]:
+    """Apply many create/update/delete operations in one transactional RPC.
+
+    Body: {"operations": [{"op": "create"|"update"|"delete", ...}], "atomic": true} or a bare array.
+    Operation fields match the single-item endpoints. All operations are validated
+    together before anything is written. Optional conflicts=reject|report (body or query)
+    checks every new period against the schedule and the other operations.
+    Returns per-item results in input order.
+    """
+    payload = await _read_json_body(request)
+    atomic = True
+    conflict_value = request.query_params.get("conflicts")
+    if isinstance(payload, dict):
+        atomic = bool(payload.get("atomic", True))
+        conflict_value = payload.get("conflicts") or conflict_value
+        payload = payload.get("operations")
+    conflict_mode = _parse_conflict_mode(conflict_value)
+    if not isinstance(payload, list) or not payload:
+        raise HTTPException(status_code=400, detail="operations must be a non-empty array")
+    if len(payload) > MAX_BATCH_OPS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_OPS} operations per batch")
+
+    ops: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    for idx, op in enumerate(payload):
+        try:
+            ops.append(_validate_batch_op(op))
+        except ValueError as e:
+            errors.append({"index": idx, "error": str(e)})
+    if errors:
+        raise HTTPException(status_code=400, detail={"errors": errors})
+
+    conflicts: Dict[int, List[str]] = {}
+    if conflict_mode:
+        conflicts = _detect_batch_conflicts(client, ops)
+        if conflicts and conflict_mode == "reject":
+            raise _conflict_error([{"index": i, "conflicts": c} for i, c in sorted(conflicts.items())])
+
+    results = _run_batch(client, ops, atomic)
+    for item in results:
+        if isinstance(item.get("interval"), dict):
+            item["interval"] = ScheduleInterval(**item["interval"])
+        if conflict_mode == "report" and item.get("op") in ("create", "update"):
+            item["conflicts"] = conflicts.get(item.get("index"), [])
+    succeeded = sum(1 for item in results if item.get("ok"))
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+
+def _insert_recurrence(
+    client,
+    p_user_uuid: str,
+    type_value: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    rule: RecurrenceRule,
+    exdates: List[datetime],
+    title: Optional[str],
+    description: Optional[str],
+) -> str:
+    """Snap the first occurrence, precompute the series end and store the series. Returns its id."""
+    dtstart, first_end = snap_period(start_dt, end_dt)
+    if dtstart >= first_end:
+        raise HTTPException(status_code=400, detail="startIso must be before endIso")
+
+    duration = first_end - dtstart
+    end_of_series = series_end(dtstart, duration, rule)
+
+    res = client.rpc(
+        "create_schedule_recurrence",
+        {
+            "p_user_id": p_user_uuid,
+            "p_type": type_value,
+            "p_dtstart": to_iso_z(dtstart),
+            "p_duration_minutes": int(duration.total_seconds() // 60),
+            "p_rrule": rule.to_rrule(),
+            "p_exdates": [to_iso_z(d) for d in exdates],
+            "p_series_end": to_iso_z(end_of_series) if end_of_series else None,
+            "p_title": title,
+            "p_description": description,
+        },
+    ).execute()
+
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+
+    new_id = data
+    try:
+        new_id = str(UUID(str(data)))
+    except Exception:
+        pass
+    return new_id
+
+
+@router.post("/recurrences", status_code=status.HTTP_200_OK)
+async def create_recurrence(
+    request: Request,
+    client = Depends(_get_supabase_client),
+) -> Dict[str, Any]:
+    """Create a recurring series from its first occurrence and an RRULE.
+
+    Required: userId, type, startIso, endIso (first occurrence), rrule
+    (FREQ=DAILY|WEEKLY; INTERVAL, BYDAY, UNTIL or COUNT). Optional exdates, title, description.
+    Returns the new series id and its canonical RRULE.
+    """
+    body_obj = await _read_json_body(request)
+    body: Dict[str, Any] = body_obj if isinstance(body_obj, dict) else {}
+
+    user_id_raw = body.get("userId") or body.get("user_id")
+    type_str = body.get("type")
+    start_iso = body.get("startIso") or body.get("startDateIso")
+    end_iso = body.get("endIso") or body.get("endDateIso")
+    if not user_id_raw:
+        raise HTTPException(status_code=400, detail="userId is required")
+    if not type_str:
+        raise HTTPException(status_code=400, detail="type is required")
+    if not start_iso or not end_iso:
+        raise HTTPException(status_code=400, detail="startIso and endIso of the first occurrence are required")
+
+    p_user_uuid = _parse_uuid(str(user_id_raw))
+    try:
+        stype = ScheduleType(type_str)
+    except Exception:
+        valid = [e.value for e in ScheduleType]
+        raise HTTPException(status_code=400, detail=f"Invalid type '{type_str}'. Must be one of {valid}")
+    try:
+        rule = parse_rrule(body.get("rrule") or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rrule: {e}")
+    try:
+        start_dt, end_dt = parse_iso_utc(start_iso), parse_iso_utc(end_iso)
+        exdates = [parse_iso_utc(d) for d in (body.get("exdates") or [])]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="startIso/endIso/exdates must be ISO-8601")
+
+    new_id = _insert_recurrence(
+        client, p_user_uuid, stype.value, start_dt, end_dt, rule, exdates,
+        body.get("title"), body.get("description"),
+    )
+    return {"id": new_id, "rrule": rule.to_rrule()}
+
+
+@router.get("/recurrences", status_code=status.HTTP_200_OK)
+def list_recurrences(
+    user_id: Optional[str] = Query(None, alias="userId"),
+    types_csv: Optional[str] = Query(None, alias="types", description="Optional comma-separated types: Cycling,Work,Other"),
+) -> Dict[str, Any]:
+    """List stored recurring series (unexpanded). Use GET /schedule/intervals for occurrences."""
+    client = _get_supabase_client()
+
+    res = client.rpc(
+        "list_schedule_recurrences",
+        {
+            "p_user_id": _parse_uuid(user_id),
+            **({"p_types": _parse_types_csv(types_csv)} if types_csv else {}),
+        },
+    ).execute()
+
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    rows: List[Dict[str, Any]] = data or []
+    return {"recurrences": [ScheduleRecurrence(**row) for row in rows]}
+
+
+@router.post("/recurrences/exceptions", status_code=status.HTTP_200_OK)
+def add_recurrence_exception(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Skip one occurrence of a series. Accepts JSON with id and occurrenceStartIso."""
+    client = _get_supabase_client()
+
+    try:
+        p_id = str(UUID(str(payload.get("id"))))
+    except Exception:
+        raise HTTPException(status_code=400, detail="id must be a UUID")
+    try:
+        occurrence_start = parse_iso_utc(payload.get("occurrenceStartIso") or "")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="occurrenceStartIso must be ISO-8601")
+
+    res = client.rpc(
+        "add_schedule_recurrence_exception",
+        {"p_id": p_id, "p_occurrence_start": to_iso_z(occurrence_start)},
+    ).execute()
+
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    if not data:
+        raise HTTPException(status_code=404, detail="Recurrence not found")
+    return {"id": str(data), "excluded": to_iso_z(occurrence_start)}
+
+
+@router.delete("/recurrences", status_code=status.HTTP_200_OK)
+def delete_recurrence(
+    recurrence_id: str = Query(..., alias="id", description="Recurrence UUID to delete"),
+) -> Dict[str, Any]:
+    """Delete a recurring series (all of its occurrences). Returns the deleted id."""
+    client = _get_supabase_client()
+
+    try:
+        p_id = str(UUID(str(recurrence_id)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="id must be a UUID")
+
+    res = client.rpc(
+        "delete_schedule_recurrence_by_id",
+        {"p_id": p_id},
+    ).execute()
+
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    if not data:
+        raise HTTPException(status_code=404, detail="Recurrence not found")
+    return {"id": str(data)}
+
+
+EXPORT_PAGE_SIZE = 500
+IMPORT_BATCH_SIZE = MAX_BATCH_OPS
+MAX_IMPORT_ERRORS = 50
+
+
+def _interval_pages(
+    client,
+    start_dt: datetime,
+    end_dt: datetime,
+    p_user_uuid: Optional[str],
+    p_types: Optional[List[str]],
+) -> Iterator[List[ScheduleInterval]]:
+    """Yield pages of unclipped intervals via keyset pagination on (start_at, id)."""
+    after: Optional[ScheduleInterval] = None
+    while True:
+        res = client.rpc(
+            "list_schedule_intervals_page",
+            {
+                "p_start": to_iso_z(start_dt),
+                "p_end": to_iso_z(end_dt),
+                "p_user_id": p_user_uuid,
+                **({"p_types": p_types} if p_types is not None else {}),
+                "p_after_start": to_iso_z(after.start_at) if after else None,
+                "p_after_id": str(after.id) if after else None,
+                "p_limit": EXPORT_PAGE_SIZE,
+            },
+        ).execute()
+
+        data = getattr(res, "data", None)
+        err = getattr(res, "error", None)
+        if err:
+            raise HTTPException(status_code=500, detail=str(err))
+        rows = [ScheduleInterval(**row) for row in data or []]
+        if rows:
+            yield rows
+        if len(rows) < EXPORT_PAGE_SIZE:
+            return
+        after = rows[-1]
+
+
+@router.get("/export.ics", status_code=status.HTTP_200_OK)
+def export_ics(
+    start_date_iso: str = Query(..., alias="startDateIso", description="Inclusive ISO-8601 UTC start"),
+    end_date_iso: str = Query(..., alias="endDateIso", description="Exclusive ISO-8601 UTC end"),
+    user_id: Optional[str] = Query(None, alias="userId"),
+    types_csv: Optional[str] = Query(None, alias="types", description="Optional comma-separated types: Cycling,Work,Other"),
+) -> StreamingResponse:
+    """Stream the schedule for a window as an iCalendar file.
+
+    One-off intervals are fetched page by page and written as they arrive; recurring
+    series are exported once with their RRULE/EXDATE instead of per occurrence.
+    """
+    client = _get_supabase_client()
+
+    p_user_uuid = _parse_uuid(user_id)
+    p_types = _parse_types_csv(types_csv)
+    start_dt, end_dt = _parse_window(start_date_iso, end_date_iso)
+
+    res = client.rpc(
+        "list_schedule_recurrences",
+        {
+            "p_start": to_iso_z(start_dt),
+            "p_end": to_iso_z(end_dt),
+            "p_user_id": p_user_uuid,
+            **({"p_types": p_types} if p_types is not None else {}),
+        },
+    ).execute()
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    series = [ScheduleRecurrence(**row) for row in data or []]
+
+    pages = _interval_pages(client, start_dt, end_dt, p_user_uuid, p_types)
+    first_page = next(pages, [])  # surface RPC errors before the response starts
+
+    def body() -> Iterator[str]:
+        stamp = datetime.now(timezone.utc)
+        yield calendar_header("Cycling coach schedule")
+        for r in series:
+            yield render_event(
+                uid=f"{r.id}@cycling-coach",
+                start=r.dtstart,
+                end=r.dtstart + timedelta(minutes=r.duration_minutes),
+                summary=r.title or r.type.value,
+                description=r.description,
+                category=r.type.value,
+                rrule=r.rrule,
+                exdates=r.exdates,
+                stamp=stamp,
+            )
+        for rows in itertools.chain([first_page], pages):
+            yield "".join(
+                render_event(
+                    uid=f"{i.id}@cycling-coach",
+                    start=i.start_at,
+                    end=i.end_at,
+                    summary=i.title or i.type.value,
+                    description=i.description,
+                    category=i.type.value,
+                    stamp=stamp,
+                )
+                for i in rows
+            )
+        yield calendar_footer()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/calendar; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="schedule.ics"'},
+    )
+
+
+@router.post("/import", status_code=status.HTTP_200_OK)
+async def import_ics(
+    request: Request,
+    user_id: str = Query(..., alias="userId", description="Owner of the imported intervals"),
+    default_type: str = Query("Other", alias="type", description="Type for events whose CATEGORIES is not a schedule type"),
+    client = Depends(_get_supabase_client),
+) -> Dict[str, Any]:
+    """Import an iCalendar body (text/calendar) into the user's schedule.
+
+    The upload is parsed incrementally while it streams in; one-off events are written
+    in batched RPCs of up to IMPORT_BATCH_SIZE and recurring events (supported RRULE
+    subset) become series. Returns counts plus the first errors encountered.
+    """
+    p_user_uuid = _parse_uuid(user_id)
+    try:
+        fallback_type = ScheduleType(default_type)
+    except Exception:
+        valid = [e.value for e in ScheduleType]
+        raise HTTPException(status_code=400, detail=f"Invalid type '{default_type}'. Must be one of {valid}")
+    type_by_name = {e.value.lower(): e for e in ScheduleType}
+
+    summary: Dict[str, Any] = {"created": 0, "series_created": 0, "skipped": 0, "failed": 0, "errors": []}
+    pending: List[Tuple[Optional[str], Dict[str, Any]]] = []
+
+    def note_error(uid: Optional[str], message: str) -> None:
+        if len(summary["errors"]) < MAX_IMPORT_ERRORS:
+            summary["errors"].append({"uid": uid, "error": message})
+
+    async def flush() -> None:
+        if not pending:
+            return
+        batch = list(pending)
+        pending.clear()
+        results = await run_in_threadpool(_run_batch, client, [op for _, op in batch], False)
+        for item in results:
+            if item.get("ok"):
+                summary["created"] += 1
+            else:
+                summary["failed"] += 1
+                note_error(batch[item["index"]][0], str(item.get("error")))
+
+    async def handle(events: List[Dict[str, Any]]) -> None:
+        for ev in events:
+            uid = ev.get("uid")
+            if ev.get("error"):
+                summary["skipped"] += 1
+                note_error(uid, ev["error"])
+                continue
+            stype = next(
+                (type_by_name[c.lower()] for c in ev.get("categories", []) if c.lower() in type_by_name),
+                fallback_type,
+            )
+            if ev.get("rrule"):
+                try:
+                    rule = parse_rrule(ev["rrule"])
+                except ValueError as e:
+                    summary["skipped"] += 1
+                    note_error(uid, f"Unsupported RRULE: {e}")
+                    continue
+                try:
+                    await run_in_threadpool(
+                        _insert_recurrence, client, p_user_uuid, stype.value, ev["start"], ev["end"],
+                        rule, ev["exdates"], ev.get("summary"), ev.get("description"),
+                    )
+                    summary["series_created"] += 1
+                except HTTPException as e:
+                    summary["failed"] += 1
+                    note_error(uid, str(e.detail))
+                continue
+            pending.append((uid, {
+                "op": "create",
+                "user_id": p_user_uuid,
+                "type": stype.value,
+                "start": to_iso_z(ev["start"]),
+                "end": to_iso_z(ev["end"]),
+                "title": ev.get("summary"),
+                "description": ev.get("description"),
+            }))
+            if len(pending) >= IMPORT_BATCH_SIZE:
+                await flush()
+
+    reader = IcsEventReader()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    async for chunk in request.stream():
+        await handle(reader.feed(decoder.decode(chunk)))
+    await handle(reader.feed(decoder.decode(b"", final=True)) + reader.close())
+    await flush()
+    return summary
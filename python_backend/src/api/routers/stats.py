@@ -5,6 +5,8 @@ import os
 import math
 from uuid import UUID
 
+from src.services.activity_store import activity_store
+from src.services.single_flight import normalize_key, upstream_calls
 from src.services.supabase_service import get_client_anon
 
 
@@ -34,22 +36,33 @@ def _fetch_activities(
             p_user_uuid = str(UUID(user_id))
         except Exception:
             raise HTTPException(status_code=400, detail="Invalid userId; must be a UUID")
-        
-    res = client.rpc(
-        "load_cycling_activities",
-        {
-            "p_start_date_iso": start_date_iso,
-            "p_end_date_iso": end_date_iso,
-            "p_user_id": p_user_uuid,
-            "p_limit": limit,
-            "p_offset": offset,
-        },
-    ).execute()
-    data = getattr(res, "data", None)
-    err = getattr(res, "error", None)
-    if err:
-        raise HTTPException(status_code=500, detail=str(err))
-    rows: List[Dict[str, Any]] = data or []
+
+    # Heavy users' history is served from the local memory-mapped store when it has one
+    if p_user_uuid and offset == 0:
+        stored = activity_store.load(client, p_user_uuid, start_date_iso, end_date_iso, limit)
+        if stored is not None:
+            return [CyclingActivity(**row) for row in stored]
+
+    params = {
+        "p_start_date_iso": start_date_iso,
+        "p_end_date_iso": end_date_iso,
+        "p_user_id": p_user_uuid,
+        "p_limit": limit,
+        "p_offset": offset,
+    }
+
+    def load() -> List[Dict[str, Any]]:
+        res = client.rpc("load_cycling_activities", params).execute()
+        data = getattr(res, "data", None)
+        err = getattr(res, "error", None)
+        if err:
+            raise HTTPException(status_code=500, detail=str(err))
+        return data or []
+
+    # Dashboards fire several stats routes for the same window at once; share the read
+    rows: List[Dict[str, Any]] = upstream_calls.do(normalize_key("load_cycling_activities", **params), load)
+    if p_user_uuid:
+        activity_store.observe(client, p_user_uuid, len(rows))
     return [CyclingActivity(**row) for row in rows]
 
 
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from src.services.supabase_service import get_client_anon
+from src.utils.cursor import cursor_issued_at, decode_cursor, encode_cursor
+from src.utils.intervals import to_iso_z
+
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+SYNC_ENTITIES = ("activities", "intervals", "recurrences", "memories")
+# Tombstones are pruned after this long (prune_sync_tombstones); older cursors cannot be served
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", "90"))
+
+
+def _get_supabase_client():
+    return get_client_anon()
+
+
+def _parse_entities(value: Optional[str]) -> Optional[List[str]]:
+    if not value:
+        return None
+    names = [v.strip() for v in value.split(",") if v.strip()]
+    invalid = [n for n in names if n not in SYNC_ENTITIES]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Unknown entities {invalid}. Must be among {list(SYNC_ENTITIES)}")
+    return names or None
+
+
+@router.get("/changes", status_code=status.HTTP_200_OK)
+def sync_changes(
+    user_id: str = Query(..., alias="userId", description="User UUID (Supabase user id)"),
+    since: Optional[str] = Query(None, description="Cursor from a previous response; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    entities: Optional[str] = Query(None, description="Comma-separated subset of activities,intervals,recurrences,memories"),
+    client = Depends(_get_supabase_client),
+) -> Dict[str, Any]:
+    """Rows created, updated or deleted since a cursor, oldest change first.
+
+    Each change is {entity, op: upsert|delete, id, changed_at, data}; deletes carry no data.
+    Store `cursor` and pass it as `since` next time; keep paging while `has_more` is true.
+    A cursor older than the tombstone retention window returns 410 and the client must
+    resync from scratch (omit `since`).
+    """
+    try:
+        p_user_id = str(UUID(user_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="userId must be a UUID")
+    p_entities = _parse_entities(entities)
+
+    since_ts: Optional[datetime] = None
+    since_id: Optional[str] = None
+    if since:
+        try:
+            since_ts, since_id = decode_cursor(since)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Deletions the client still has to learn about happened after it last synced; if that
+        # was longer ago than the retention window, their tombstones may be gone. (An old
+        # since_ts alone is fine: paging through a first full sync produces those.)
+        issued = cursor_issued_at(since) or since_ts
+        if issued < datetime.now(timezone.utc) - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+            raise HTTPException(status_code=410, detail="Cursor expired; resync without `since`")
+
+    res = client.rpc(
+        "sync_changes",
+        {
+            "p_user_id": p_user_id,
+            "p_since_ts": to_iso_z(since_ts) if since_ts else None,
+            "p_since_id": since_id,
+            "p_limit": limit,
+            "p_entities": p_entities,
+        },
+    ).execute()
+
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    changes: List[Dict[str, Any]] = data or []
+
+    # With no new changes the position stays where it was, but the cursor is re-issued
+    now = datetime.now(timezone.utc)
+    if changes:
+        cursor: Optional[str] = encode_cursor(changes[-1]["changed_at"], changes[-1]["id"], issued_at=now)
+    else:
+        cursor = encode_cursor(since_ts, since_id, issued_at=now) if since_ts else None
+    return {"changes": changes, "cursor": cursor, "has_more": len(changes) >= limit}
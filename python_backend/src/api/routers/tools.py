@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+
+from src.services.activity_service import iter_activity_pages, parse_user_id
+from src.services.supabase_service import get_client_anon
+from src.utils.cursor import decode_cursor, encode_cursor
+from src.utils.intervals import parse_iso_utc, to_iso_z
+
+
+router = APIRouter(prefix="/api/tools", tags=["Tools"])
+
+# Hard cap on a tool response; the agent pastes it into its context
+MAX_RESPONSE_BYTES = int(os.environ.get("TOOL_RESPONSE_MAX_BYTES", "16384"))
+MIN_RESPONSE_BYTES = 1024
+PAGE_SIZE = 200
+
+# Column -> decimals kept when compacting (None: not a float column)
+ACTIVITY_FIELDS: Dict[str, Optional[int]] = {
+    "id": None,
+    "user_id": None,
+    "started_at": None,
+    "ended_at": None,
+    "duration_seconds": None,
+    "distance_km": 2,
+    "avg_speed_kmh": 1,
+    "active_energy_kcal": 0,
+    "elevation_gain_m": 0,
+    "avg_hr_bpm": None,
+    "max_hr_bpm": None,
+    "vo2max": 1,
+    "created_at": None,
+    "updated_at": None,
+}
+DEFAULT_FIELDS = (
+    "id", "started_at", "duration_seconds", "distance_km", "avg_speed_kmh",
+    "elevation_gain_m", "avg_hr_bpm", "max_hr_bpm", "active_energy_kcal", "vo2max",
+)
+TIME_FIELDS = ("started_at", "ended_at", "created_at", "updated_at")
+
+
+def _get_supabase_client():
+    return get_client_anon()
+
+
+def _parse_fields(value: Any) -> List[str]:
+    if value is None or value == "" or value == []:
+        return list(DEFAULT_FIELDS)
+    names = value.split(",") if isinstance(value, str) else value
+    if not isinstance(names, list):
+        raise HTTPException(status_code=400, detail="fields must be a list or comma-separated string")
+    fields = list(dict.fromkeys(str(n).strip() for n in names if str(n).strip()))
+    unknown = [f for f in fields if f not in ACTIVITY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}. Must be among {list(ACTIVITY_FIELDS)}")
+    return fields or list(DEFAULT_FIELDS)
+
+
+def _compact_number(value: Any, decimals: int) -> Any:
+    number = round(float(value), decimals)
+    if not math.isfinite(number):
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def _compact_row(row: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Projected row without nulls, timestamps to the second, floats rounded per field."""
+    out: Dict[str, Any] = {}
+    for field in fields:
+        value = row.get(field)
+        if value is None:
+            continue
+        if field in TIME_FIELDS:
+            value = to_iso_z(parse_iso_utc(str(value)).replace(microsecond=0))
+        elif ACTIVITY_FIELDS[field] is not None:
+            value = _compact_number(value, ACTIVITY_FIELDS[field])
+            if value is None:
+                continue
+        out[field] = value
+    return out
+
+
+def _json_size(obj: Any) -> int:
+    # Same encoding as the JSON response body
+    return len(json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+# Longest cursor encode_cursor can produce: four-digit year, microseconds, a UUID
+_MAX_CURSOR = encode_cursor(datetime(9999, 12, 31, 23, 59, 59, 999999, tzinfo=timezone.utc), "f" * 8 + "-ffff" * 3 + "-" + "f" * 12)
+
+
+def _envelope_size(fields: List[str], budget: int) -> int:
+    """Bytes of a response with no activities, sized for the worst-case count and cursor."""
+    return _json_size({"activities": [], "count": budget, "cursor": _MAX_CURSOR, "has_more": False, "fields": fields})
+
+
+def _collect(client, start_iso: str, end_iso: str, user_id: Optional[str], fields: List[str],
+             after: Optional[Dict[str, Any]], budget: int) -> Dict[str, Any]:
+    activities: List[Dict[str, Any]] = []
+    used = _envelope_size(fields, budget)
+    last = after  # sort key the continuation cursor resumes from
+    for page in iter_activity_pages(client, start_iso, end_iso, user_id, PAGE_SIZE, after=after):
+        for row in page:
+            item = _compact_row(row, fields)
+            size = _json_size(item) + 1  # separating comma
+            if used + size > budget:
+                cursor = encode_cursor(last["started_at"], last["id"]) if last else None
+                return {"activities": activities, "count": len(activities), "cursor": cursor,
+                        "has_more": True, "fields": fields}
+            activities.append(item)
+            used += size
+            last = row
+    return {"activities": activities, "count": len(activities), "cursor": None, "has_more": False, "fields": fields}
+
+
+@router.post("/load_cycling_activities", status_code=status.HTTP_200_OK)
+async def load_cycling_activities_tool(
+    request: Request,
+    client = Depends(_get_supabase_client),
+) -> Dict[str, Any]:
+    """Raw cycling sessions in [start_date_iso, end_date_iso), oldest first, for the agent.
+
+    Body: start_date_iso, end_date_iso, optional user_id, fields (list or comma-separated
+    columns), cursor (from a previous response) and max_bytes. Rows are projected to
+    `fields`, nulls are dropped and numbers rounded. The response stays under max_bytes
+    (capped at TOOL_RESPONSE_MAX_BYTES); when rows are left over, `has_more` is true and
+    `cursor` continues after the last returned session.
+    """
+    try:
+        raw = await request.body()
+        payload = json.loads(raw or b"{}")
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    # ElevenLabs may wrap as {"body": {...}}
+    if isinstance(payload, dict) and isinstance(payload.get("body"), dict):
+        payload = payload["body"]
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Body must be an object")
+
+    start_iso, end_iso = payload.get("start_date_iso"), payload.get("end_date_iso")
+    if not start_iso or not end_iso:
+        raise HTTPException(status_code=400, detail="start_date_iso and end_date_iso are required")
+    try:
+        start_iso = to_iso_z(parse_iso_utc(start_iso))
+        end_iso = to_iso_z(parse_iso_utc(end_iso))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date_iso and end_date_iso must be ISO-8601")
+    user_id = parse_user_id(payload["user_id"]) if payload.get("user_id") else None
+    fields = _parse_fields(payload.get("fields"))
+
+    after: Optional[Dict[str, Any]] = None
+    if payload.get("cursor"):
+        try:
+            ts, row_id = decode_cursor(str(payload["cursor"]))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        after = {"started_at": to_iso_z(ts), "id": row_id}
+
+    try:
+        budget = int(payload.get("max_bytes") or MAX_RESPONSE_BYTES)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="max_bytes must be an integer")
+    budget = max(MIN_RESPONSE_BYTES, min(budget, MAX_RESPONSE_BYTES))
+
+    return await run_in_threadpool(_collect, client, start_iso, end_iso, user_id, fields, after, budget)
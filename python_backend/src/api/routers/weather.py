@@ -1,15 +1,34 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, List
-from datetime import datetime, timezone
+import asyncio
+import json
+import time
+from uuid import UUID
+from typing import Any, Callable, Dict, Optional, List, Tuple
+from datetime import date, datetime, timedelta, timezone
 
-import requests
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+
+from src.services.aq_stations import nearest_air_quality
+from src.services.ride_planner import best_windows
+from src.services.schedule_service import load_intervals
+from src.services.supabase_service import get_client_anon
+from src.services.weather_cache import DEFAULT_VARIABLES, weather_cache
+from src.utils.intervals import parse_iso_utc
+from src.utils.solar import solar_days
 
 
 router = APIRouter(prefix="/weather", tags=["Weather"])
 
 
+def _staleness(stale_age: Optional[float]) -> Dict[str, Any]:
+    """Response fields marking a value served from cache after its provider failed or expired."""
+    if stale_age is None:
+        return {}
+    return {"stale": True, "age_seconds": int(stale_age)}
+
+
 def _parse_iso_utc(ts: str) -> datetime:
     try:
         if ts.endswith("Z"):
@@ -35,117 +54,159 @@ def weather_by_time(
 ) -> Dict[str, Any]:
     """Fetch hourly weather at a given time using the free Open-Meteo API.
 
-    Returns the nearest-hour values for requested variables.
+    Returns the nearest-hour values for requested variables. Whole UTC days are
+    cached per grid cell, so nearby times and places are usually served from memory.
     """
 
     dt = _parse_iso_utc(datetime_iso)
-    start = dt.replace(minute=0, second=0, microsecond=0)
-    end = start
-
-    default_vars = [
-        "temperature_2m",
-        "windspeed_10m",
-        "winddirection_10m",
-        "precipitation",
-        "cloudcover",
-    ]
-    vars_list: List[str] = default_vars
+
+    vars_list: List[str] = list(DEFAULT_VARIABLES)
     if variables_csv:
         seq = [v.strip() for v in variables_csv.split(",") if v.strip()]
         if seq:
             vars_list = seq
 
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "hourly": ",".join(vars_list),
-        "timezone": "UTC",
-        # limit to the single target hour window
-        "start_hour": start.isoformat().replace("+00:00", "Z"),
-        "end_hour": (end.isoformat().replace("+00:00", "Z")),
-    }
+    target_iso, values, stale_age = weather_cache.hour_values(lat, lon, dt, vars_list)
+    return {"time": target_iso, "latitude": lat, "longitude": lon, "values": values, **_staleness(stale_age)}
+
+
+MAX_BATCH_POINTS = 500
+
+
+def _parse_variables(value: Any) -> List[str]:
+    if isinstance(value, list):
+        seq = [str(v).strip() for v in value if str(v).strip()]
+    elif isinstance(value, str):
+        seq = [v.strip() for v in value.split(",") if v.strip()]
+    else:
+        seq = []
+    return seq or list(DEFAULT_VARIABLES)
 
-    # Open-Meteo expects start/end as start/end hour; some deployments use start_date/end_date.
-    # Fallback to the generic start/end params if the above are not supported.
-    alt_params = {
-        "latitude": lat,
-        "longitude": lon,
-        "hourly": ",".join(vars_list),
-        "timezone": "UTC",
-        "start": start.isoformat().replace("+00:00", "Z"),
-        "end": end.isoformat().replace("+00:00", "Z"),
-    }
 
+@router.post("/batch", status_code=status.HTTP_200_OK)
+async def weather_batch(request: Request) -> Dict[str, Any]:
+    """Hourly weather for many (lat, lon, time) points, e.g. along a planned ride.
+
+    Body: {"points": [{"lat", "lon", "datetimeIso"}, ...], "variables": csv or list}.
+    Points are grouped into grid-cell/day fetches (several locations per upstream
+    request, run concurrently); results are returned in input order.
+    """
     try:
-        resp = requests.get(url, params=params, timeout=15)
-        if resp.status_code >= 400 or not resp.ok:
-            # Try fallback param names
-            resp = requests.get(url, params=alt_params, timeout=15)
-        data = resp.json()
+        raw = await request.body()
+        body = json.loads(raw or b"{}")
     except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Failed to fetch weather: {e}")
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if isinstance(body, dict) and isinstance(body.get("body"), (dict, list)):
+        body = body["body"]
+    if isinstance(body, list):
+        body = {"points": body}
+    points_raw = body.get("points") if isinstance(body, dict) else None
+    if not isinstance(points_raw, list) or not points_raw:
+        raise HTTPException(status_code=400, detail="points must be a non-empty array")
+    if len(points_raw) > MAX_BATCH_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_POINTS} points per request")
+    vars_list = _parse_variables(body.get("variables"))
 
-    hourly = data.get("hourly") or {}
-    times = hourly.get("time") or []
-    if not times:
-        return {"time": start.isoformat().replace("+00:00", "Z"), "values": {}}
+    points: List[Tuple[float, float, datetime]] = []
+    errors: List[Dict[str, Any]] = []
+    for i, p in enumerate(points_raw):
+        try:
+            if not isinstance(p, dict):
+                raise ValueError("point must be an object")
+            lat, lon = float(p["lat"]), float(p["lon"])
+            if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+                raise ValueError("lat/lon out of range")
+            when = parse_iso_utc(p.get("datetimeIso") or p.get("datetime_iso") or p["time"])
+            points.append((lat, lon, when))
+        except KeyError as e:
+            errors.append({"index": i, "error": f"missing {e.args[0]}"})
+        except (TypeError, ValueError) as e:
+            errors.append({"index": i, "error": str(e)})
+    if errors:
+        raise HTTPException(status_code=400, detail={"errors": errors})
 
-    # Find exact hour index
-    target_iso = start.isoformat().replace("+00:00", "Z")
-    try:
-        idx = times.index(target_iso)
-    except ValueError:
-        # If not found, return first element or empty
-        idx = 0
+    def run() -> Dict[str, Any]:
+        fetches = weather_cache.prefetch(((lat, lon, when.date()) for lat, lon, when in points), vars_list)
+        results = []
+        for lat, lon, when in points:
+            target_iso, values, stale_age = weather_cache.hour_values(lat, lon, when, vars_list)
+            results.append(
+                {"time": target_iso, "latitude": lat, "longitude": lon, "values": values, **_staleness(stale_age)}
+            )
+        return {"results": results, "upstream_requests": fetches}
+
+    return await run_in_threadpool(run)
+
+
+@router.get("/best_window", status_code=status.HTTP_200_OK)
+def best_ride_window(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude in decimal degrees"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude in decimal degrees"),
+    duration_hours: int = Query(2, alias="durationHours", ge=1, le=12, description="Ride duration in hours"),
+    horizon_hours: int = Query(48, alias="horizonHours", ge=1, le=168, description="How far ahead to look for a start time"),
+    start_iso: Optional[str] = Query(None, alias="startIso", description="Earliest start (ISO-8601 UTC); defaults to the next full hour"),
+    k: int = Query(3, ge=1, le=10, description="Number of windows to return"),
+    user_id: Optional[str] = Query(None, alias="userId", description="If set, hours busy in this user's schedule are excluded"),
+    daylight_only: bool = Query(True, alias="daylightOnly", description="Exclude windows mostly after dark"),
+) -> Dict[str, Any]:
+    """Best times to start a ride of the given duration within the horizon.
+
+    Scores every hourly start from one cached forecast (wind, precipitation,
+    temperature, daylight) and returns the top-k non-overlapping windows, best first.
+    """
+    if start_iso:
+        start = _parse_iso_utc(start_iso)
+    else:
+        start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+    busy: List[Tuple[datetime, datetime]] = []
+    if user_id:
+        try:
+            p_user_id = str(UUID(user_id))
+        except Exception:
+            raise HTTPException(status_code=400, detail="userId must be a UUID")
+        window_start = start.replace(minute=0, second=0, microsecond=0)
+        window_end = window_start + timedelta(hours=horizon_hours + duration_hours)
+        busy = [(i.start_at, i.end_at) for i in load_intervals(get_client_anon(), window_start, window_end, p_user_id)]
+
+    result = best_windows(
+        weather_cache, lat, lon, start, horizon_hours, duration_hours, k, busy=busy, daylight_only=daylight_only
+    )
+    return {"latitude": lat, "longitude": lon, "duration_hours": duration_hours, **result}
 
-    values: Dict[str, Any] = {}
-    for v in vars_list:
-        seq = hourly.get(v)
-        if isinstance(seq, list) and len(seq) > idx:
-            values[v] = seq[idx]
 
-    return {"time": target_iso, "latitude": lat, "longitude": lon, "values": values}
+def _iso_or_none(dt: Optional[datetime]) -> Optional[str]:
+    return dt.isoformat() if dt is not None else None
 
 
 @router.get("/daylight", status_code=status.HTTP_200_OK)
 def daylight_for_date(
-    lat: float = Query(..., description="Latitude in decimal degrees"),
-    lon: float = Query(..., description="Longitude in decimal degrees"),
+    lat: float = Query(..., ge=-90, le=90, description="Latitude in decimal degrees"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude in decimal degrees"),
     date_iso: Optional[str] = Query(None, alias="dateIso", description="Date YYYY-MM-DD (UTC). Defaults to today (UTC) if omitted."),
+    days: int = Query(1, ge=1, le=366, description="Number of consecutive days starting at dateIso"),
 ) -> Dict[str, Any]:
-    """Get sunrise/sunset times for a given date using sunrise-sunset.org (free)."""
+    """Get sunrise/sunset, solar noon, day length and civil twilight for a date (UTC).
+
+    Computed locally with NOAA's solar equations. With days > 1, returns {"days": [...]}.
+    Times that do not occur (polar day/night) are null.
+    """
 
     if date_iso is None:
-        date_iso = datetime.now(timezone.utc).date().isoformat()
-
-    url = "https://api.sunrise-sunset.org/json"
-    params = {
-        "lat": lat,
-        "lng": lon,
-        "date": date_iso,
-        "formatted": 0,  # return ISO-8601
-    }
-    try:
-        resp = requests.get(url, params=params, timeout=15)
-        data = resp.json()
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Failed to fetch daylight: {e}")
-
-    status_str = data.get("status")
-    if status_str != "OK":
-        raise HTTPException(status_code=502, detail=f"Daylight API error: {status_str}")
-
-    res = data.get("results", {})
-    subset = {
-        "sunrise": res.get("sunrise"),
-        "sunset": res.get("sunset"),
-        "solar_noon": res.get("solar_noon"),
-        "day_length": res.get("day_length"),
-        "civil_twilight_begin": res.get("civil_twilight_begin"),
-        "civil_twilight_end": res.get("civil_twilight_end"),
-    }
-    return {"date": date_iso, "latitude": lat, "longitude": lon, **subset}
+        start = datetime.now(timezone.utc).date()
+    else:
+        try:
+            start = date.fromisoformat(date_iso)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="dateIso must be YYYY-MM-DD")
+
+    results = [
+        {k: (_iso_or_none(v) if isinstance(v, datetime) or v is None else v) for k, v in row.items()}
+        for row in solar_days(lat, lon, (start + timedelta(days=i) for i in range(days)))
+    ]
+    if days == 1:
+        return {"latitude": lat, "longitude": lon, **results[0]}
+    return {"latitude": lat, "longitude": lon, "days": results}
 
 
 @router.get("/air_quality", status_code=status.HTTP_200_OK)
@@ -156,38 +217,81 @@ def air_quality_by_location(
     limit: int = Query(10, ge=1, le=50, description="Max stations to include"),
 ) -> Dict[str, Any]:
     """Fetch latest air quality near coordinates using OpenAQ (free)."""
+    return _fetch_air_quality(lat, lon, radius_m, limit)
 
-    url = "https://api.openaq.org/v2/latest"
-    params = {
-        "coordinates": f"{lat},{lon}",
-        "radius": radius_m,
-        "limit": limit,
-        "order_by": "distance",
-        "sort": "asc",
-    }
-    try:
-        resp = requests.get(url, params=params, timeout=20)
-        data = resp.json()
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Failed to fetch air quality: {e}")
-
-    results = data.get("results", [])
-    pollutants: Dict[str, Any] = {}
-    for site in results:
-        for m in site.get("measurements", []):
-            param = str(m.get("parameter")).lower()
-            value = m.get("value")
-            unit = m.get("unit")
-            # Keep the best (nearest) value per pollutant; since ordered by distance asc, first wins
-            if param not in pollutants and value is not None:
-                pollutants[param] = {"value": value, "unit": unit}
 
+def _fetch_air_quality(lat: float, lon: float, radius_m: int = 10000, limit: int = 10) -> Dict[str, Any]:
+    # Nearest stations come from the local catalogue; only their latest readings are requested
+    found = nearest_air_quality(lat, lon, radius_m, limit)
     return {
         "latitude": lat,
         "longitude": lon,
         "radius_m": radius_m,
-        "pollutants": pollutants,
+        "pollutants": found["pollutants"],
+        "stations": found["stations"],
         "source": "OpenAQ",
+        **_staleness(found["stale_age"]),
     }
 
 
+# Per-source deadlines (seconds) for /weather/conditions
+CONDITIONS_DEADLINES = {"weather": 4.0, "daylight": 1.0, "air_quality": 3.0}
+
+
+async def _with_deadline(name: str, fn: Callable[[], Dict[str, Any]], deadline: float) -> Tuple[str, Dict[str, Any]]:
+    """Run a blocking source in a worker thread; report it unavailable past its deadline.
+
+    A timed-out thread is not interrupted; it finishes in the background (and still
+    fills the weather cache), but the response no longer waits for it.
+    """
+    started = time.perf_counter()
+    try:
+        data = await asyncio.wait_for(asyncio.to_thread(fn), timeout=deadline)
+    except asyncio.TimeoutError:
+        return name, {"status": "unavailable", "reason": f"timed out after {deadline:g}s"}
+    except HTTPException as e:
+        return name, {"status": "unavailable", "reason": str(e.detail)}
+    except Exception as e:
+        return name, {"status": "unavailable", "reason": str(e)}
+    return name, {"status": "ok", "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 1), "data": data}
+
+
+@router.get("/conditions", status_code=status.HTTP_200_OK)
+async def riding_conditions(
+    lat: float = Query(..., ge=-90, le=90, description="Latitude in decimal degrees"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude in decimal degrees"),
+    datetime_iso: Optional[str] = Query(None, alias="datetimeIso", description="ISO-8601 UTC time; defaults to now"),
+    deadline_ms: Optional[int] = Query(None, alias="deadlineMs", ge=100, le=15000, description="Override every source's deadline"),
+) -> Dict[str, Any]:
+    """Weather, daylight and air quality for one place and time, fetched concurrently.
+
+    Each source has its own deadline; sources that fail or miss it are returned as
+    {"status": "unavailable", "reason"} instead of failing the whole response.
+    """
+    when = _parse_iso_utc(datetime_iso) if datetime_iso else datetime.now(timezone.utc)
+
+    def weather() -> Dict[str, Any]:
+        target_iso, values, stale_age = weather_cache.hour_values(lat, lon, when, DEFAULT_VARIABLES)
+        return {"time": target_iso, "values": values, **_staleness(stale_age)}
+
+    def daylight() -> Dict[str, Any]:
+        row = solar_days(lat, lon, [when.date()])[0]
+        return {k: (_iso_or_none(v) if isinstance(v, datetime) or v is None else v) for k, v in row.items()}
+
+    sources: Dict[str, Callable[[], Dict[str, Any]]] = {
+        "weather": weather,
+        "daylight": daylight,
+        "air_quality": lambda: _fetch_air_quality(lat, lon),
+    }
+    results = await asyncio.gather(
+        *(
+            _with_deadline(name, fn, deadline_ms / 1000.0 if deadline_ms else CONDITIONS_DEADLINES[name])
+            for name, fn in sources.items()
+        )
+    )
+    return {
+        "time": when.isoformat().replace("+00:00", "Z"),
+        "latitude": lat,
+        "longitude": lon,
+        **dict(results),
+    }
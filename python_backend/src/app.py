@@ -1,20 +1,39 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from src.api.routers import health
 from src.api.routers import stats
 from src.api.routers import schedule
 from src.api.routers import memory
 from src.api.routers import weather
+from src.api.routers import activities
+from src.api.routers import sync
+from src.api.routers import tools
 from mcp.server.fastmcp import FastMCP
 from src.api.routers.mcp_server import register_tools
+from src.services.http_client import http_client
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Warm pooled session for outbound API calls; closed (connections released) on shutdown
+    http_client.open()
+    try:
+        yield
+    finally:
+        http_client.close()
 
 
 def app() -> FastAPI:
-    project = FastAPI(title="Temp", version="1.0.0")
+    project = FastAPI(title="Temp", version="1.0.0", lifespan=lifespan)
     project.include_router(health.router)
     project.include_router(stats.router)
     project.include_router(schedule.router)
     project.include_router(memory.router)
     project.include_router(weather.router)
+    project.include_router(activities.router)
+    project.include_router(sync.router)
+    project.include_router(tools.router)
 
     # Register MCP tools and mount the MCP HTTP app (exposes OpenAPI) at /mcp.
     # Also mount SSE app at /mcp/sse for event streaming if needed.
@@ -1,12 +1,13 @@
 """Pydantic models for schedule intervals.
 
 `ScheduleInterval` mirrors rows returned by the `public.schedule_intervals`
-table/functions. Timestamps are validated to be timezone-aware.
+table/functions. `ScheduleRecurrence` mirrors `public.schedule_recurrences`
+(one row per recurring series). Timestamps are validated to be timezone-aware.
 """
 
 from enum import Enum
 from pydantic import BaseModel, field_validator
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 from datetime import datetime
 
@@ -29,6 +30,7 @@ class ScheduleInterval(BaseModel):
     description: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    recurrence_id: Optional[UUID] = None  # set on occurrences expanded from a series
 
     @field_validator("start_at", "end_at", "created_at", "updated_at")
     @classmethod
@@ -38,3 +40,31 @@ class ScheduleInterval(BaseModel):
         if v.tzinfo is None or v.tzinfo.utcoffset(v) is None:
             raise ValueError("timestamps must be timezone-aware")
         return v
+
+
+class ScheduleRecurrence(BaseModel):
+    """Recurring schedule series: first occurrence, duration and RRULE.
+
+    Occurrences are expanded on read; `series_end` is None for open-ended rules.
+    """
+    id: UUID
+    user_id: UUID
+    type: ScheduleType
+    dtstart: datetime  # tz-aware start of the first occurrence
+    duration_minutes: int
+    rrule: str
+    exdates: List[datetime] = []
+    series_end: Optional[datetime] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    @field_validator("dtstart", "series_end", "created_at", "updated_at")
+    @classmethod
+    def tz_aware(cls, v: datetime) -> datetime:
+        if v is None:
+            return v
+        if v.tzinfo is None or v.tzinfo.utcoffset(v) is None:
+            raise ValueError("timestamps must be timezone-aware")
+        return v
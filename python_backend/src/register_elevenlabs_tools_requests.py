@@ -123,7 +123,7 @@ def build_tools(base_url: str) -> List[Dict[str, Any]]:
         {
             "type": "webhook",
             "name": "sessions-get-range",
-            "description": "Get raw cycling sessions in a date range from Supabase (no aggregation). Returns: { activities: [activity rows…] }. Use as the canonical source for client-side processing or external tools.",
+            "description": "Get raw cycling sessions in a date range (no aggregation), oldest first. Returns: { activities: [compact rows with only the requested fields, nulls omitted], count, has_more, cursor }. Responses are size-capped; when has_more is true, call again with the same dates and the returned cursor. Ask only for the fields you need.",
             "api_schema": {
                 "url": f"{base}/api/tools/load_cycling_activities",
                 "method": "POST",
@@ -132,7 +132,10 @@ def build_tools(base_url: str) -> List[Dict[str, Any]]:
                     "properties": {
                         "start_date_iso": {"type": "string", "description": "Inclusive ISO-8601 UTC start (e.g. 2025-06-01T00:00:00Z)"},
                         "end_date_iso": {"type": "string", "description": "Exclusive ISO-8601 UTC end (boundary not included)"},
-                        "user_id": {"type": "string", "description": "Optional athlete UUID (Supabase user id)"}
+                        "user_id": {"type": "string", "description": "Optional athlete UUID (Supabase user id)"},
+                        "fields": {"type": "string", "description": "Optional comma-separated columns: id, started_at, ended_at, duration_seconds, distance_km, avg_speed_kmh, active_energy_kcal, elevation_gain_m, avg_hr_bpm, max_hr_bpm, vo2max (default: all of these but ended_at)"},
+                        "cursor": {"type": "string", "description": "Optional cursor from a previous response to continue after its last session"},
+                        "max_bytes": {"type": "integer", "description": "Optional smaller response size limit in bytes"}
                     },
                     "required": ["start_date_iso", "end_date_iso"]
                 }
@@ -173,7 +176,7 @@ def build_tools(base_url: str) -> List[Dict[str, Any]]:
         {
             "type": "webhook",
             "name": "list-schedule-intervals",
-            "description": "List schedule intervals overlapping a date window. Returns: { intervals: [interval…] } where interval matches the schedule_intervals table (id, user_id, type, start_at, end_at, title, description, created_at, updated_at).",
+            "description": "List schedule intervals overlapping a date window. Returns: { intervals: [interval…] } where interval matches the schedule_intervals table (id, user_id, type, start_at, end_at, title, description, created_at, updated_at). Occurrences of recurring series include recurrence_id.",
             "api_schema": {
                 "url": f"{base}/schedule/intervals",
                 "method": "GET",
@@ -202,6 +205,7 @@ def build_tools(base_url: str) -> List[Dict[str, Any]]:
                         "endIso": {"type": "string", "description": "ISO-8601 UTC end (exclusive)"},
                         "title": {"type": "string", "description": "Title (required)"},
                         "description": {"type": "string", "description": "Description (required)"},
+                        "conflicts": {"type": "string", "description": "Optional overlap check: reject (409 with conflicting ids) or report (create and return conflicts)", "nullable": True},
                     },
                     "required": ["userId", "type", "startIso", "endIso"],
                 },
@@ -225,6 +229,7 @@ def build_tools(base_url: str) -> List[Dict[str, Any]]:
                         "title": {"type": "string", "description": "New title", "nullable": True},
                         "description": {"type": "string", "description": "New description", "nullable": True},
                         "snap": {"type": "boolean", "description": "Snap to 15-minute grid (default true)", "nullable": True},
+                        "conflicts": {"type": "string", "description": "Optional overlap check: reject or report", "nullable": True},
                     },
                     "required": ["id"],
                 },
@@ -244,10 +249,71 @@ def build_tools(base_url: str) -> List[Dict[str, Any]]:
             },
             "response_timeout_secs": 20,
         },
+        {
+            "type": "webhook",
+            "name": "batch-schedule-intervals",
+            "description": "Create, update and delete many schedule intervals in one call (e.g. a whole training week). Returns: { results[{ index, op, ok, id, interval?, error? }], succeeded, failed }. Prefer this over repeated single-interval calls.",
+            "api_schema": {
+                "url": f"{base}/schedule/intervals/batch",
+                "method": "POST",
+                "request_body_schema": {
+                    "type": "object",
+                    "properties": {
+                        "operations": {
+                            "type": "array",
+                            "description": "Operations applied in order",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "op": {"type": "string", "description": "One of create, update, delete"},
+                                    "id": {"type": "string", "description": "Interval UUID (update/delete)", "nullable": True},
+                                    "userId": {"type": "string", "description": "Athlete UUID (create)", "nullable": True},
+                                    "type": {"type": "string", "description": "One of Cycling, Work, Other", "nullable": True},
+                                    "startIso": {"type": "string", "description": "ISO-8601 UTC start (create)", "nullable": True},
+                                    "endIso": {"type": "string", "description": "ISO-8601 UTC end, exclusive (create)", "nullable": True},
+                                    "newStartIso": {"type": "string", "description": "New ISO-8601 UTC start (update)", "nullable": True},
+                                    "newEndIso": {"type": "string", "description": "New ISO-8601 UTC end (update)", "nullable": True},
+                                    "title": {"type": "string", "description": "Title", "nullable": True},
+                                    "description": {"type": "string", "description": "Description", "nullable": True},
+                                },
+                                "required": ["op"],
+                            },
+                        },
+                        "atomic": {"type": "boolean", "description": "If true (default), any failure rolls back the whole batch", "nullable": True},
+                        "conflicts": {"type": "string", "description": "Optional overlap check across the schedule and the batch itself: reject or report", "nullable": True},
+                    },
+                    "required": ["operations"],
+                },
+            },
+            "response_timeout_secs": 20,
+        },
+        {
+            "type": "webhook",
+            "name": "create-schedule-recurrence",
+            "description": "Create a recurring schedule series (e.g. weekly work hours or a standing ride) stored once and expanded in list-schedule-intervals. Returns: { id, rrule }.",
+            "api_schema": {
+                "url": f"{base}/schedule/recurrences",
+                "method": "POST",
+                "request_body_schema": {
+                    "type": "object",
+                    "properties": {
+                        "userId": {"type": "string", "description": "Athlete UUID (Supabase user id)"},
+                        "type": {"type": "string", "description": "One of Cycling, Work, Other"},
+                        "startIso": {"type": "string", "description": "ISO-8601 UTC start of the first occurrence"},
+                        "endIso": {"type": "string", "description": "ISO-8601 UTC end of the first occurrence (exclusive)"},
+                        "rrule": {"type": "string", "description": "RRULE, e.g. FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;UNTIL=20251231 (DAILY/WEEKLY, INTERVAL, BYDAY, UNTIL or COUNT)"},
+                        "title": {"type": "string", "description": "Title", "nullable": True},
+                        "description": {"type": "string", "description": "Description", "nullable": True},
+                    },
+                    "required": ["userId", "type", "startIso", "endIso", "rrule"],
+                },
+            },
+            "response_timeout_secs": 20,
+        },
         {
             "type": "webhook",
             "name": "memory-create",
-            "description": "Create a user memory entry. Returns: { id } of the new memory.",
+            "description": "Create a user memory entry. Near-duplicates of an existing memory are skipped by default. Returns: { id, action, duplicate_of?, similarity? }.",
             "api_schema": {
                 "url": f"{base}/memories",
                 "method": "POST",
@@ -257,6 +323,7 @@ def build_tools(base_url: str) -> List[Dict[str, Any]]:
                         "userId": {"type": "string", "description": "User UUID (Supabase user id)"},
                         "content": {"type": "string", "description": "Memory content"},
                         "title": {"type": "string", "description": "Optional title", "nullable": True},
+                        "onDuplicate": {"type": "string", "enum": ["skip", "merge", "flag"], "description": "What to do when a near-duplicate exists: skip (default, return existing id), merge (append new sentences to it), flag (insert anyway and report it)"},
                     },
                     "required": ["userId", "content"]
                 }
@@ -280,14 +347,45 @@ def build_tools(base_url: str) -> List[Dict[str, Any]]:
         {
             "type": "webhook",
             "name": "memory-list",
-            "description": "List user memories (most recent first). Returns: { memories: [...] }.",
+            "description": "List user memories (most recent first). Returns: { memories: [...], next_cursor }. Pass next_cursor back as cursor for the next page.",
             "api_schema": {
                 "url": f"{base}/memories",
                 "method": "GET",
                 "query_params_schema": _props([
                     {"name": "userId", "type": "string", "description": "User UUID (Supabase user id)"},
                     {"name": "limit", "type": "integer", "description": "Max rows (1–200, default 50)"},
-                    {"name": "offset", "type": "integer", "description": "Offset for pagination (default 0)"},
+                    {"name": "cursor", "type": "string", "description": "Opaque next_cursor from the previous page (omit for the first page)"},
+                ]),
+            },
+            "response_timeout_secs": 20,
+        },
+        {
+            "type": "webhook",
+            "name": "memory-search",
+            "description": "Search a user's memories by free text (e.g. 'knee injury'), best matches first. Returns: { memories: [{ id, title, content, created_at, score }] }. Prefer this over memory-list when recalling something specific.",
+            "api_schema": {
+                "url": f"{base}/memories/search",
+                "method": "GET",
+                "query_params_schema": _props([
+                    {"name": "userId", "type": "string", "description": "User UUID (Supabase user id)"},
+                    {"name": "q", "type": "string", "description": "Free-text query"},
+                    {"name": "limit", "type": "integer", "description": "Max results (1–50, default 5)"},
+                ]),
+            },
+            "response_timeout_secs": 20,
+        },
+        {
+            "type": "webhook",
+            "name": "memory-context",
+            "description": "Get a compact, prompt-ready summary of the user's most relevant and recent memories for a topic, within a size budget. Returns: { context, memories, used, budget, unit }. Prefer this when you need background about the user rather than a specific memory.",
+            "api_schema": {
+                "url": f"{base}/memories/context",
+                "method": "GET",
+                "query_params_schema": _props([
+                    {"name": "userId", "type": "string", "description": "User UUID (Supabase user id)"},
+                    {"name": "q", "type": "string", "description": "Topic of the conversation (optional; empty favours recent memories)"},
+                    {"name": "budget", "type": "integer", "description": "Size limit (16–8000, default 400)"},
+                    {"name": "unit", "type": "string", "description": "Budget unit: tokens (default, ~4 chars each) or chars"},
                 ]),
             },
             "response_timeout_secs": 20,
@@ -308,10 +406,75 @@ def build_tools(base_url: str) -> List[Dict[str, Any]]:
             },
             "response_timeout_secs": 20,
         },
+        {
+            "type": "webhook",
+            "name": "weather-batch",
+            "description": "Get hourly weather for many (location, time) points at once, e.g. along a planned ride. Returns: { results[{ time, latitude, longitude, values{...} }] in input order, upstream_requests }. Prefer this over repeated weather-by-time calls.",
+            "api_schema": {
+                "url": f"{base}/weather/batch",
+                "method": "POST",
+                "request_body_schema": {
+                    "type": "object",
+                    "properties": {
+                        "points": {
+                            "type": "array",
+                            "description": "Points to look up (max 500)",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "lat": {"type": "number", "description": "Latitude in decimal degrees"},
+                                    "lon": {"type": "number", "description": "Longitude in decimal degrees"},
+                                    "datetimeIso": {"type": "string", "description": "Target time (ISO-8601 UTC)"},
+                                },
+                                "required": ["lat", "lon", "datetimeIso"],
+                            },
+                        },
+                        "variables": {"type": "string", "description": "Optional CSV of variables: temperature_2m,windspeed_10m,winddirection_10m,precipitation,cloudcover", "nullable": True},
+                    },
+                    "required": ["points"],
+                },
+            },
+            "response_timeout_secs": 20,
+        },
+        {
+            "type": "webhook",
+            "name": "riding-conditions",
+            "description": "Check current (or given-time) riding conditions in one call: weather, daylight and air quality fetched concurrently. Returns: { time, weather, daylight, air_quality }, each { status: ok, data } or { status: unavailable, reason }. Prefer this over calling weather-by-time, daylight-by-date and air-quality separately.",
+            "api_schema": {
+                "url": f"{base}/weather/conditions",
+                "method": "GET",
+                "query_params_schema": _props([
+                    {"name": "lat", "type": "number", "description": "Latitude in decimal degrees"},
+                    {"name": "lon", "type": "number", "description": "Longitude in decimal degrees"},
+                    {"name": "datetimeIso", "type": "string", "description": "Optional time (ISO-8601 UTC); defaults to now"},
+                ]),
+            },
+            "response_timeout_secs": 20,
+        },
+        {
+            "type": "webhook",
+            "name": "weather-best-window",
+            "description": "Find the best times to start a ride of a given duration in the next hours/days from one forecast (wind, rain, temperature, daylight), optionally skipping the user's busy schedule blocks. Returns: { windows[{ start, end, score (0–100), avg_temperature_2m, max_windspeed_10m, total_precipitation, daylight_fraction }], considered }. Prefer this over probing weather-by-time hour by hour.",
+            "api_schema": {
+                "url": f"{base}/weather/best_window",
+                "method": "GET",
+                "query_params_schema": _props([
+                    {"name": "lat", "type": "number", "description": "Latitude in decimal degrees"},
+                    {"name": "lon", "type": "number", "description": "Longitude in decimal degrees"},
+                    {"name": "durationHours", "type": "integer", "description": "Ride duration in hours (1–12, default 2)"},
+                    {"name": "horizonHours", "type": "integer", "description": "Hours ahead to search (1–168, default 48)"},
+                    {"name": "startIso", "type": "string", "description": "Optional earliest start (ISO-8601 UTC); defaults to next full hour"},
+                    {"name": "k", "type": "integer", "description": "Number of windows (1–10, default 3)"},
+                    {"name": "userId", "type": "string", "description": "Optional user UUID; busy schedule blocks are excluded"},
+                    {"name": "daylightOnly", "type": "boolean", "description": "Exclude windows mostly after dark (default true)"},
+                ]),
+            },
+            "response_timeout_secs": 20,
+        },
         {
             "type": "webhook",
             "name": "daylight-by-date",
-            "description": "Get sunrise/sunset for a date at a location using sunrise-sunset.org. Returns: { sunrise, sunset, day_length, ... }.",
+            "description": "Get sunrise/sunset, solar noon, day length and civil twilight for a date (or several consecutive days) at a location. Returns: { date, sunrise, sunset, solar_noon, day_length, civil_twilight_begin, civil_twilight_end } or { days: [...] } when days > 1.",
             "api_schema": {
                 "url": f"{base}/weather/daylight",
                 "method": "GET",
@@ -319,6 +482,7 @@ def build_tools(base_url: str) -> List[Dict[str, Any]]:
                     {"name": "lat", "type": "number", "description": "Latitude in decimal degrees"},
                     {"name": "lon", "type": "number", "description": "Longitude in decimal degrees"},
                     {"name": "dateIso", "type": "string", "description": "Date YYYY-MM-DD (UTC). Optional (defaults to today)."},
+                    {"name": "days", "type": "integer", "description": "Optional number of consecutive days (1–366, default 1)"},
                 ]),
             },
             "response_timeout_secs": 20,
@@ -0,0 +1,146 @@
+"""Columnar exports of cycling activities (Arrow IPC stream or Parquet).
+
+Rows arrive page by page from `iter_activity_pages`; each page becomes one
+Arrow record batch (one Parquet row group) and the bytes written for it are
+yielded straight away, so an export never holds more than a page in memory.
+
+pyarrow is an optional dependency (`pip install .[export]`); callers check
+`pyarrow_available()` first.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from src.utils.intervals import parse_iso_utc
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ("parquet", "arrow")
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Column -> Arrow type name, in export order
+EXPORT_COLUMNS: Dict[str, str] = {
+    "id": "string",
+    "user_id": "string",
+    "started_at": "timestamp",
+    "ended_at": "timestamp",
+    "duration_seconds": "int32",
+    "distance_km": "float64",
+    "avg_speed_kmh": "float64",
+    "active_energy_kcal": "float64",
+    "elevation_gain_m": "float64",
+    "avg_hr_bpm": "int16",
+    "max_hr_bpm": "int16",
+    "vo2max": "float64",
+    "created_at": "timestamp",
+    "updated_at": "timestamp",
+}
+
+
+def pyarrow_available() -> bool:
+    return pa is not None
+
+
+def parse_columns(value: Optional[str]) -> List[str]:
+    """Validate a comma-separated projection; None/empty means every column.
+
+    Raises ValueError naming unknown columns.
+    """
+    if not value:
+        return list(EXPORT_COLUMNS)
+    names = list(dict.fromkeys(v.strip() for v in value.split(",") if v.strip()))
+    unknown = [n for n in names if n not in EXPORT_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown}. Must be among {list(EXPORT_COLUMNS)}")
+    return names or list(EXPORT_COLUMNS)
+
+
+def _arrow_type(name: str):
+    if name == "timestamp":
+        return pa.timestamp("us", tz="UTC")
+    return getattr(pa, name)()
+
+
+def export_schema(columns: Sequence[str]):
+    return pa.schema([pa.field(c, _arrow_type(EXPORT_COLUMNS[c])) for c in columns])
+
+
+def _column_values(rows: List[Dict[str, Any]], column: str) -> List[Any]:
+    values = [row.get(column) for row in rows]
+    if EXPORT_COLUMNS[column] == "timestamp":
+        return [parse_iso_utc(v) if v else None for v in values]
+    return values
+
+
+def _record_batch(rows: List[Dict[str, Any]], schema):
+    arrays = [pa.array(_column_values(rows, f.name), type=f.type) for f in schema]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object collecting bytes until the caller drains them."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+
+def stream_export(pages: Iterable[List[Dict[str, Any]]], columns: Sequence[str], fmt: str) -> Iterator[bytes]:
+    """Yield the encoded file, one chunk per page plus the header/footer.
+
+    An export with no rows is still a valid (empty) file with the schema.
+    """
+    schema = export_schema(columns)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        for rows in pages:
+            batch = _record_batch(rows, schema)
+            if fmt == "parquet":
+                writer.write_batch(batch, row_group_size=batch.num_rows)
+            else:
+                writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    tail = sink.drain()
+    if tail:
+        yield tail
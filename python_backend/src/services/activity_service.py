@@ -0,0 +1,194 @@
+"""Cycling activity ingestion shared by the HTTP routes and the ingest utilities.
+
+Incoming rows may use the API's camelCase names, the CSV export's snake_case
+headers or the database column names; `normalize_activity` maps any of them to
+the column shape expected by the insert RPCs and validates values up front, so
+a batch is rejected or reported before anything is written.
+
+Both RPCs upsert on a fingerprint of (user, start, duration, distance), so
+re-importing the same rides is idempotent; results report what was inserted,
+updated (values changed) or skipped (already identical).
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+
+from src.utils.intervals import parse_iso_utc, to_iso_z
+
+INSERT_CHUNK_SIZE = 500
+UPSERT_ACTIONS = ("inserted", "updated", "skipped")
+
+# Column -> accepted input names (API camelCase, CSV header, column name)
+FIELD_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "started_at": ("startTime", "start_time", "started_at"),
+    "ended_at": ("endTime", "end_time", "ended_at"),
+    "duration_seconds": ("durationSeconds", "duration_seconds"),
+    "distance_km": ("distanceKm", "distance_km"),
+    "avg_speed_kmh": ("averageSpeedKmh", "avg_speed_kmh"),
+    "active_energy_kcal": ("activeEnergyKcal", "active_energy_kcal"),
+    "elevation_gain_m": ("elevationGainMeters", "elevation_gain_m"),
+    "avg_hr_bpm": ("averageHeartRateBpm", "avg_hr_bpm"),
+    "max_hr_bpm": ("maxHeartRateBpm", "max_hr_bpm"),
+    "vo2max": ("vo2Max", "vo2max"),
+}
+REQUIRED_FIELDS = ("started_at", "ended_at", "duration_seconds", "distance_km")
+INTEGER_FIELDS = ("duration_seconds", "avg_hr_bpm", "max_hr_bpm")
+
+
+def _pick(row: Dict[str, Any], column: str) -> Any:
+    for name in FIELD_ALIASES[column]:
+        value = row.get(name)
+        if value is not None and value != "":
+            return value
+    return None
+
+
+def normalize_activity(row: Any) -> Dict[str, Any]:
+    """Validate one activity and map it to RPC column names.
+
+    Raises ValueError with a readable message; callers collect these per row.
+    """
+    if not isinstance(row, dict):
+        raise ValueError("activity must be an object")
+    out: Dict[str, Any] = {}
+    for column in FIELD_ALIASES:
+        raw = _pick(row, column)
+        if raw is None:
+            if column in REQUIRED_FIELDS:
+                raise ValueError(f"{FIELD_ALIASES[column][0]} is required")
+            out[column] = None
+            continue
+        if column in ("started_at", "ended_at"):
+            try:
+                out[column] = parse_iso_utc(str(raw))
+            except ValueError:
+                raise ValueError(f"{FIELD_ALIASES[column][0]} must be ISO-8601")
+            continue
+        try:
+            number = float(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"{FIELD_ALIASES[column][0]} must be a number")
+        if not math.isfinite(number) or number < 0:
+            raise ValueError(f"{FIELD_ALIASES[column][0]} must be a non-negative number")
+        out[column] = int(round(number)) if column in INTEGER_FIELDS else number
+
+    if out["ended_at"] <= out["started_at"]:
+        raise ValueError("endTime must be after startTime")
+    out["started_at"] = to_iso_z(out["started_at"])
+    out["ended_at"] = to_iso_z(out["ended_at"])
+    return out
+
+
+def parse_user_id(value: Optional[str]) -> str:
+    if not value:
+        raise HTTPException(status_code=400, detail="userId is required")
+    try:
+        return str(UUID(str(value)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="userId must be a UUID")
+
+
+def normalize_rows(rows: Iterable[Any], first_index: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Split rows into (valid column dicts, [{"index", "error"}]) preserving input order."""
+    valid: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    for idx, row in enumerate(rows, start=first_index):
+        try:
+            valid.append(normalize_activity(row))
+        except ValueError as e:
+            errors.append({"index": idx, "error": str(e)})
+    return valid, errors
+
+
+def insert_activity(client, user_id: str, activity: Dict[str, Any]) -> Dict[str, Any]:
+    """Upsert one normalized activity; returns {"id", "action"} (inserted/updated/skipped)."""
+    res = client.rpc(
+        "insert_cycling_activity",
+        {
+            "p_user_id": user_id,
+            "p_start_time": activity["started_at"],
+            "p_end_time": activity["ended_at"],
+            "p_duration_seconds": activity["duration_seconds"],
+            "p_distance_km": activity["distance_km"],
+            "p_avg_speed_kmh": activity["avg_speed_kmh"],
+            "p_active_energy_kcal": activity["active_energy_kcal"],
+            "p_elevation_gain_m": activity["elevation_gain_m"],
+            "p_avg_hr_bpm": activity["avg_hr_bpm"],
+            "p_max_hr_bpm": activity["max_hr_bpm"],
+            "p_vo2max": activity["vo2max"],
+        },
+    ).execute()
+
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    data = data or {}
+    return {"id": str(data.get("id")) if data.get("id") else None, "action": data.get("action")}
+
+
+def insert_activities(client, user_id: str, activities: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Upsert normalized activities in chunks of INSERT_CHUNK_SIZE.
+
+    Returns inserted/updated/skipped counts and the ids in input order.
+    """
+    summary: Dict[str, Any] = {action: 0 for action in UPSERT_ACTIONS}
+    ids: List[str] = []
+    for i in range(0, len(activities), INSERT_CHUNK_SIZE):
+        res = client.rpc(
+            "insert_cycling_activities_batch",
+            {"p_user_id": user_id, "p_rows": activities[i:i + INSERT_CHUNK_SIZE]},
+        ).execute()
+
+        data = getattr(res, "data", None)
+        err = getattr(res, "error", None)
+        if err:
+            raise HTTPException(status_code=500, detail=str(err))
+        data = data or {}
+        for action in UPSERT_ACTIONS:
+            summary[action] += int(data.get(action) or 0)
+        ids.extend(str(x) for x in data.get("ids") or [])
+    summary["ids"] = ids
+    return summary
+
+
+def iter_activity_pages(
+    client,
+    start_iso: str,
+    end_iso: str,
+    user_id: Optional[str],
+    page_size: int,
+    after: Optional[Dict[str, Any]] = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield pages of raw activity rows, oldest first, via keyset pagination on (started_at, id).
+
+    `after` ({"started_at", "id"}) resumes behind a row returned earlier.
+    """
+    while True:
+        res = client.rpc(
+            "load_cycling_activities_page",
+            {
+                "p_start_date_iso": start_iso,
+                "p_end_date_iso": end_iso,
+                "p_user_id": user_id,
+                "p_after_started_at": after["started_at"] if after else None,
+                "p_after_id": after["id"] if after else None,
+                "p_limit": page_size,
+            },
+        ).execute()
+
+        data = getattr(res, "data", None)
+        err = getattr(res, "error", None)
+        if err:
+            raise HTTPException(status_code=500, detail=str(err))
+        rows: List[Dict[str, Any]] = data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        after = rows[-1]
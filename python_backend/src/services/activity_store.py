@@ -0,0 +1,358 @@
+"""Local memory-mapped copy of heavy users' ride history for the stats routes.
+
+Enabled by setting `ACTIVITY_STORE_DIR` (and having numpy installed). Users
+whose stats reads return at least `ACTIVITY_STORE_MIN_ROWS` rides get a store,
+built in the background; afterwards `/stats` reads them from disk instead of
+calling `load_cycling_activities`.
+
+Layout per user (`<dir>/<user_id>/`):
+
+- `g<generation>/<column>.bin`: one fixed-width file per column, rows sorted
+  by (started_at, id). Files are only appended to; `meta.json` holds the row
+  count, so bytes written past it by an interrupted sync are ignored and
+  truncated on the next append. Readers memory-map the first `count` rows,
+  so every uvicorn worker shares the same page-cache pages.
+- `meta.json` (replaced atomically): generation, count, the sync watermark,
+  the mutable tail and the ids of frozen rows that were since edited or
+  deleted (`dead`).
+
+Rides newer than `FREEZE_DAYS` stay in the tail, because recent rides are the
+ones still being edited. Syncs pull `sync_changes` after the stored
+(updated_at, id) watermark, so deletions arrive through tombstones. Edits to
+frozen rides mark the old row dead and keep the new version in the tail; the
+next freeze then rewrites a new generation, as it does when too many dead ids
+pile up.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from src.services.resilience import run_in_background
+from src.utils.intervals import parse_iso_utc
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+log = logging.getLogger(__name__)
+
+STORE_DIR = os.environ.get("ACTIVITY_STORE_DIR", "")
+MIN_ROWS = int(os.environ.get("ACTIVITY_STORE_MIN_ROWS", "500"))
+SYNC_INTERVAL_SECONDS = float(os.environ.get("ACTIVITY_STORE_SYNC_SECONDS", "15"))
+# When a sync fails, keep serving the store for this long before falling back to the RPC
+MAX_STALE_SECONDS = float(os.environ.get("ACTIVITY_STORE_MAX_STALE_SECONDS", "3600"))
+FREEZE_DAYS = 30
+MAX_DEAD = 256
+SYNC_PAGE = 1000
+# Matches sync_changes: a watermark older than the tombstone retention cannot be caught up
+TOMBSTONE_RETENTION_DAYS = int(os.environ.get("SYNC_TOMBSTONE_RETENTION_DAYS", "90"))
+STORE_VERSION = 1
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_US = timedelta(microseconds=1)
+_MISSING_INT = -1
+
+# Column -> numpy dtype; timestamps are microseconds since the epoch, NaN / -1 mean null
+COLUMNS: Dict[str, str] = {
+    "id": "S36",
+    "started_at": "<i8",
+    "ended_at": "<i8",
+    "duration_seconds": "<i4",
+    "distance_km": "<f8",
+    "avg_speed_kmh": "<f8",
+    "active_energy_kcal": "<f8",
+    "elevation_gain_m": "<f8",
+    "avg_hr_bpm": "<i2",
+    "max_hr_bpm": "<i2",
+    "vo2max": "<f8",
+    "created_at": "<i8",
+    "updated_at": "<i8",
+}
+TIME_COLUMNS = ("started_at", "ended_at", "created_at", "updated_at")
+INT_COLUMNS = ("duration_seconds", "avg_hr_bpm", "max_hr_bpm")
+
+
+def _to_us(value: Any) -> int:
+    dt = value if isinstance(value, datetime) else parse_iso_utc(str(value))
+    return (dt - _EPOCH) // _US
+
+
+def _from_us(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+def _row_key(row: Dict[str, Any]) -> Tuple[int, str]:
+    return _to_us(row["started_at"]), str(row["id"])
+
+
+def _encode(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Column arrays for rows already sorted by (started_at, id)."""
+    out = {}
+    for column, dtype in COLUMNS.items():
+        values = [row.get(column) for row in rows]
+        if column == "id":
+            out[column] = np.array([str(v).encode() for v in values], dtype=dtype)
+        elif column in TIME_COLUMNS:
+            out[column] = np.array([_to_us(v) if v else 0 for v in values], dtype=dtype)
+        elif column in INT_COLUMNS:
+            out[column] = np.array([_MISSING_INT if v is None else int(v) for v in values], dtype=dtype)
+        else:
+            out[column] = np.array([np.nan if v is None else float(v) for v in values], dtype=dtype)
+    return out
+
+
+def _decode(cols: Dict[str, Any], selector: Any) -> List[Dict[str, Any]]:
+    """Rows for a slice or mask of the column arrays, converted a column at a time."""
+    values: Dict[str, List[Any]] = {}
+    for column in COLUMNS:
+        raw = cols[column][selector].tolist()
+        if column == "id":
+            values[column] = [v.decode() for v in raw]
+        elif column in TIME_COLUMNS:
+            values[column] = [_from_us(v) for v in raw]
+        elif column in INT_COLUMNS:
+            values[column] = [None if v == _MISSING_INT else v for v in raw]
+        else:
+            values[column] = [None if v != v else v for v in raw]  # NaN
+    return [dict(zip(values, row)) for row in zip(*values.values())]
+
+
+class ActivityStore:
+    """Per-user columnar files plus a JSON tail, shared by all worker processes."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self._maps: "OrderedDict[Tuple[str, int, int], Dict[str, Any]]" = OrderedDict()
+        self._maps_lock = threading.Lock()
+        self._building: Dict[Any, None] = {}
+        self._building_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.root) and np is not None
+
+    # -- files ---------------------------------------------------------------
+
+    def _user_dir(self, user_id: str) -> str:
+        return os.path.join(self.root, user_id)
+
+    def _gen_dir(self, user_id: str, generation: int) -> str:
+        return os.path.join(self._user_dir(user_id), f"g{generation}")
+
+    def _read_meta(self, user_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self._user_dir(user_id), "meta.json"), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("version") == STORE_VERSION else None
+
+    def _write_meta(self, user_id: str, meta: Dict[str, Any]) -> None:
+        path = os.path.join(self._user_dir(user_id), "meta.json")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _columns(self, user_id: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+        """Memory-mapped frozen columns for the committed row count."""
+        generation, count = meta["generation"], meta["count"]
+        key = (user_id, generation, count)
+        with self._maps_lock:
+            cols = self._maps.get(key)
+            if cols is not None:
+                self._maps.move_to_end(key)
+                return cols
+        gen_dir = self._gen_dir(user_id, generation)
+        cols = {
+            column: (np.memmap(os.path.join(gen_dir, f"{column}.bin"), dtype=dtype, mode="r", shape=(count,))
+                     if count else np.empty(0, dtype=dtype))
+            for column, dtype in COLUMNS.items()
+        }
+        with self._maps_lock:
+            self._maps[key] = cols
+            while len(self._maps) > 64:
+                self._maps.popitem(last=False)
+        return cols
+
+    def _write_columns(self, gen_dir: str, arrays: Dict[str, Any], count: int) -> None:
+        """Append to each column file after cutting anything beyond `count` rows."""
+        os.makedirs(gen_dir, exist_ok=True)
+        for column, dtype in COLUMNS.items():
+            with open(os.path.join(gen_dir, f"{column}.bin"), "ab") as f:
+                f.truncate(count * np.dtype(dtype).itemsize)
+                f.write(arrays[column].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+    # -- sync ----------------------------------------------------------------
+
+    def _pull_changes(self, client, user_id: str, cursor: Optional[List[str]]) -> Tuple[List[Dict[str, Any]], Optional[List[str]]]:
+        changes: List[Dict[str, Any]] = []
+        while True:
+            res = client.rpc(
+                "sync_changes",
+                {
+                    "p_user_id": user_id,
+                    "p_since_ts": cursor[0] if cursor else None,
+                    "p_since_id": cursor[1] if cursor else None,
+                    "p_limit": SYNC_PAGE,
+                    "p_entities": ["activities"],
+                },
+            ).execute()
+            data = getattr(res, "data", None)
+            err = getattr(res, "error", None)
+            if err:
+                raise HTTPException(status_code=500, detail=str(err))
+            page: List[Dict[str, Any]] = data or []
+            changes.extend(page)
+            if page:
+                cursor = [page[-1]["changed_at"], str(page[-1]["id"])]
+            if len(page) < SYNC_PAGE:
+                return changes, cursor
+
+    def sync(self, client, user_id: str) -> Dict[str, Any]:
+        """Apply changes since the watermark and freeze settled tail rows; returns the new meta."""
+        user_dir = self._user_dir(user_id)
+        os.makedirs(user_dir, exist_ok=True)
+        with open(os.path.join(user_dir, "lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)  # one writer per user across workers
+            meta = self._read_meta(user_id)
+            now = time.time()
+            if meta and now - meta["synced_at"] < SYNC_INTERVAL_SECONDS:
+                return meta  # another worker just synced
+            if meta is None or now - meta["synced_at"] > TOMBSTONE_RETENTION_DAYS * 86400:
+                # New store, or deletions may have been pruned since: rebuild from scratch
+                generation = meta["generation"] + 1 if meta else 1
+                meta = {"version": STORE_VERSION, "generation": generation, "count": 0,
+                        "cursor": None, "synced_at": 0, "tail": {}, "dead": []}
+
+            changes, cursor = self._pull_changes(client, user_id, meta["cursor"])
+            tail: Dict[str, Dict[str, Any]] = meta["tail"]
+            touched = set()
+            for change in changes:
+                rid = str(change["id"])
+                touched.add(rid)
+                if change["op"] == "delete":
+                    tail.pop(rid, None)
+                else:
+                    row = dict(change["data"])
+                    row.pop("user_id", None)
+                    tail[rid] = row
+
+            cols = self._columns(user_id, meta)
+            dead = set(meta["dead"])
+            if touched and meta["count"]:
+                frozen = np.isin(cols["id"], np.array([t.encode() for t in touched], dtype=COLUMNS["id"]))
+                dead.update(v.decode() for v in cols["id"][frozen])
+
+            meta = self._freeze(user_id, meta, cols, tail, dead)
+            meta["cursor"] = cursor
+            meta["synced_at"] = now
+            self._write_meta(user_id, meta)
+            # Processes still mapping replaced generations keep those pages until they remap
+            current = f"g{meta['generation']}"
+            for name in os.listdir(user_dir):
+                if name.startswith("g") and name != current:
+                    shutil.rmtree(os.path.join(user_dir, name), ignore_errors=True)
+            return meta
+
+    def _freeze(self, user_id: str, meta: Dict[str, Any], cols: Dict[str, Any], tail: Dict[str, Dict[str, Any]], dead: set) -> Dict[str, Any]:
+        """Move tail rides older than FREEZE_DAYS into the columns; returns the new meta."""
+        horizon = _to_us(datetime.now(timezone.utc) - timedelta(days=FREEZE_DAYS))
+        settled = sorted((r for r in tail.values() if _to_us(r["started_at"]) < horizon), key=_row_key)
+        remaining = {rid: r for rid, r in tail.items() if _to_us(r["started_at"]) >= horizon}
+        count = meta["count"]
+        last_key = (int(cols["started_at"][-1]), cols["id"][-1].decode()) if count else None
+        appendable = (
+            not settled
+            or last_key is None
+            or (_row_key(settled[0]) > last_key and not dead.intersection(r["id"] for r in settled))
+        )
+
+        if appendable and len(dead) <= MAX_DEAD:
+            if settled:
+                self._write_columns(self._gen_dir(user_id, meta["generation"]), _encode(settled), count)
+            return {**meta, "count": count + len(settled), "tail": remaining, "dead": sorted(dead)}
+
+        # Rewrite: surviving frozen rows merged with the settled ones into a new generation
+        live = _decode(cols, ~np.isin(cols["id"], np.array([d.encode() for d in dead], dtype=COLUMNS["id"])))
+        rows = sorted(live + settled, key=_row_key)
+        generation = meta["generation"] + 1
+        gen_dir = self._gen_dir(user_id, generation)
+        shutil.rmtree(gen_dir, ignore_errors=True)
+        self._write_columns(gen_dir, _encode(rows), 0)
+        return {**meta, "generation": generation, "count": len(rows), "tail": remaining, "dead": []}
+
+    # -- reads ---------------------------------------------------------------
+
+    def load(self, client, user_id: str, start_iso: str, end_iso: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Rides in [start, end), newest first like `load_cycling_activities`, or None if not stored."""
+        if not self.enabled:
+            return None
+        meta = self._read_meta(user_id)
+        if meta is None:
+            return None
+        try:
+            start_us, end_us = _to_us(start_iso), _to_us(end_iso)
+        except ValueError:
+            return None
+        if time.time() - meta["synced_at"] >= SYNC_INTERVAL_SECONDS:
+            try:
+                meta = self.sync(client, user_id)
+            except Exception as e:
+                log.info("activity store sync for %s failed: %s", user_id, e)
+                if time.time() - meta["synced_at"] > MAX_STALE_SECONDS:
+                    return None
+
+        for _ in range(2):
+            try:
+                cols = self._columns(user_id, meta)
+                break
+            except FileNotFoundError:  # generation replaced by another worker
+                meta = self._read_meta(user_id)
+                if meta is None:
+                    return None
+        else:
+            return None
+
+        started = cols["started_at"]
+        lo = int(np.searchsorted(started, start_us, side="left"))
+        hi = int(np.searchsorted(started, end_us, side="left"))
+        window = slice(lo, hi)
+        if meta["dead"]:
+            ids = cols["id"][window]
+            window = np.flatnonzero(~np.isin(ids, np.array([d.encode() for d in meta["dead"]], dtype=COLUMNS["id"]))) + lo
+        rows = _decode(cols, window)
+        for row in meta["tail"].values():
+            if start_us <= _to_us(row["started_at"]) < end_us:
+                rows.append({**row, **{c: parse_iso_utc(row[c]) for c in TIME_COLUMNS if row.get(c)}})
+        rows.sort(key=lambda r: r["started_at"], reverse=True)
+        for row in rows:
+            row["user_id"] = user_id
+        return rows[:limit]
+
+    def observe(self, client, user_id: str, rows_returned: int) -> None:
+        """Start building a store for users whose reads reach the hot-tier size."""
+        if not self.enabled or rows_returned < MIN_ROWS or self._read_meta(user_id) is not None:
+            return
+        run_in_background(("activity_store", user_id), lambda: self.sync(client, user_id),
+                          self._building, self._building_lock)
+
+
+activity_store = ActivityStore(STORE_DIR)
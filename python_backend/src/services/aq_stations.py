@@ -0,0 +1,229 @@
+"""Local catalogue of OpenAQ stations with a spatial index for nearest lookups.
+
+Station metadata changes rarely, so it is loaded per coarse tile (TILE_DEG
+squares, one OpenAQ `/v2/locations` request each) the first time a query
+touches the tile, and refreshed in the background after CATALOGUE_TTL_SECONDS.
+All loaded stations live in one k-d tree, rebuilt only when a tile changes,
+so the nearest stations are resolved in memory. Only those stations' latest
+readings are then requested, each cached for a short TTL.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+
+from src.services.http_client import http_client
+from src.services.resilience import SwrCache, breakers, is_upstream_failure, run_in_background
+from src.services.single_flight import upstream_calls
+from src.utils.intervals import parse_iso_utc
+from src.utils.kdtree import KDTree
+
+OPENAQ_URL = "https://api.openaq.org/v2"
+
+TILE_DEG = float(os.environ.get("AQ_CATALOGUE_TILE_DEG", "0.25"))
+TILE_RADIUS_M = 25000  # OpenAQ's maximum search radius; covers a 0.25 degree tile
+CATALOGUE_TTL_SECONDS = int(os.environ.get("AQ_CATALOGUE_TTL_SECONDS", "86400"))
+MAX_TILES = int(os.environ.get("AQ_CATALOGUE_MAX_TILES", "4096"))
+INACTIVE_AFTER_DAYS = 7  # stations without a reading for this long are skipped
+LOCATIONS_PAGE_LIMIT = 1000
+FETCH_WORKERS = 4
+
+Tile = Tuple[int, int]
+
+
+class Station(NamedTuple):
+    id: int
+    name: str
+    lat: float
+    lon: float
+
+
+def _tile_center(tile: Tile) -> Tuple[float, float]:
+    return round((tile[0] + 0.5) * TILE_DEG, 4), round((tile[1] + 0.5) * TILE_DEG, 4)
+
+
+def tiles_within(lat: float, lon: float, radius_m: float) -> List[Tile]:
+    """Tiles overlapping the bounding box of a circle (longitudes wrap at the antimeridian)."""
+    dlat = radius_m / 111_195.0
+    dlon = dlat / max(0.01, math.cos(math.radians(min(89.0, abs(lat)))))
+    lat_lo, lat_hi = max(-90.0, lat - dlat), min(90.0 - 1e-9, lat + dlat)
+    n_lon = int(round(360.0 / TILE_DEG))
+    lon_lo = int(math.floor((lon - min(180.0, dlon)) / TILE_DEG))
+    lon_hi = int(math.floor((lon + min(180.0, dlon)) / TILE_DEG))
+    cols = {((c + n_lon // 2) % n_lon) - n_lon // 2 for c in range(lon_lo, lon_hi + 1)}
+    rows = range(int(math.floor(lat_lo / TILE_DEG)), int(math.floor(lat_hi / TILE_DEG)) + 1)
+    return [(r, c) for r in rows for c in sorted(cols)]
+
+
+def _is_active(row: Dict[str, Any], now: datetime) -> bool:
+    last = row.get("lastUpdated")
+    if not last:
+        return True
+    try:
+        return now - parse_iso_utc(last) <= timedelta(days=INACTIVE_AFTER_DAYS)
+    except ValueError:
+        return True
+
+
+def _request_tile_stations(tile: Tile) -> Dict[int, Station]:
+    lat, lon = _tile_center(tile)
+    params = {"coordinates": f"{lat},{lon}", "radius": TILE_RADIUS_M, "limit": LOCATIONS_PAGE_LIMIT}
+    try:
+        resp = http_client.get(f"{OPENAQ_URL}/locations", params=params)
+        resp.raise_for_status()
+        rows = resp.json().get("results", [])
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to fetch air quality stations: {e}")
+
+    now = datetime.now(timezone.utc)
+    stations: Dict[int, Station] = {}
+    for row in rows:
+        coords = row.get("coordinates") or {}
+        s_lat, s_lon = coords.get("latitude"), coords.get("longitude")
+        if row.get("id") is None or s_lat is None or s_lon is None or not _is_active(row, now):
+            continue
+        stations[int(row["id"])] = Station(int(row["id"]), str(row.get("name") or ""), float(s_lat), float(s_lon))
+    return stations
+
+
+def _request_station_latest(station_id: int) -> Dict[str, Dict[str, Any]]:
+    try:
+        resp = http_client.get(f"{OPENAQ_URL}/latest/{station_id}")
+        resp.raise_for_status()
+        results = resp.json().get("results", [])
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to fetch air quality: {e}")
+
+    pollutants: Dict[str, Dict[str, Any]] = {}
+    for site in results:
+        for m in site.get("measurements", []):
+            param = str(m.get("parameter")).lower()
+            if param not in pollutants and m.get("value") is not None:
+                pollutants[param] = {"value": m.get("value"), "unit": m.get("unit")}
+    return pollutants
+
+
+class StationCatalogue:
+    """Tile-loaded station metadata behind one k-d tree."""
+
+    def __init__(self, ttl: float = CATALOGUE_TTL_SECONDS, max_tiles: int = MAX_TILES) -> None:
+        self.ttl = ttl
+        self.max_tiles = max_tiles
+        self._tiles: "OrderedDict[Tile, Tuple[float, Dict[int, Station]]]" = OrderedDict()
+        self._tree: Optional[KDTree[Station]] = None
+        self._lock = threading.Lock()
+        self._refreshing: Dict[Any, None] = {}
+        self._refresh_lock = threading.Lock()
+
+    def _load_tile(self, tile: Tile) -> None:
+        stations = upstream_calls.do(
+            ("openaq-tile", tile), lambda: breakers["openaq"].call(lambda: _request_tile_stations(tile))
+        )
+        with self._lock:
+            self._tiles[tile] = (time.time(), stations)
+            self._tiles.move_to_end(tile)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+            self._tree = None
+
+    def ensure(self, tiles: List[Tile]) -> None:
+        """Load missing tiles synchronously; refresh expired ones in the background."""
+        now = time.time()
+        missing: List[Tile] = []
+        expired: List[Tile] = []
+        with self._lock:
+            for t in tiles:
+                hit = self._tiles.get(t)
+                if hit is None:
+                    missing.append(t)
+                    continue
+                self._tiles.move_to_end(t)
+                if now - hit[0] > self.ttl:
+                    expired.append(t)
+        for t in expired:
+            run_in_background(("openaq-tile", t), lambda t=t: self._load_tile(t), self._refreshing, self._refresh_lock)
+        if len(missing) == 1:
+            self._load_tile(missing[0])
+        elif missing:
+            with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+                list(pool.map(self._load_tile, missing))
+
+    def _index(self) -> KDTree[Station]:
+        with self._lock:
+            if self._tree is None:
+                merged: Dict[int, Station] = {}
+                for _, stations in self._tiles.values():
+                    merged.update(stations)
+                self._tree = KDTree([(s.lat, s.lon, s) for s in merged.values()])
+            return self._tree
+
+    def nearest(self, lat: float, lon: float, radius_m: float, k: int) -> List[Tuple[float, Station]]:
+        self.ensure(tiles_within(lat, lon, radius_m))
+        return self._index().nearest(lat, lon, k=k, max_distance_m=radius_m)
+
+
+station_catalogue = StationCatalogue()
+
+# Station readings update roughly hourly; serve up to 3h stale while refreshing
+station_latest_cache = SwrCache(fresh_ttl=600, max_stale=3 * 3600, max_entries=4096)
+
+
+def _station_latest(station_id: int) -> Tuple[Dict[str, Dict[str, Any]], Optional[float]]:
+    return station_latest_cache.get(
+        ("openaq-station", station_id),
+        lambda: breakers["openaq"].call(lambda: _request_station_latest(station_id)),
+    )
+
+
+def nearest_air_quality(lat: float, lon: float, radius_m: int, limit: int) -> Dict[str, Any]:
+    """Latest pollutant values from the nearest stations; the closest station wins per pollutant.
+
+    Returns the pollutants, the stations used (with distances) and the largest
+    stale age among their readings (None when all are fresh).
+    """
+    nearest = station_catalogue.nearest(lat, lon, radius_m, limit)
+    readings: List[Optional[Tuple[Dict[str, Dict[str, Any]], Optional[float]]]] = [None] * len(nearest)
+    errors: List[BaseException] = []
+
+    def load(i: int) -> None:
+        try:
+            readings[i] = _station_latest(nearest[i][1].id)
+        except Exception as e:
+            if not is_upstream_failure(e):
+                raise
+            errors.append(e)
+
+    if len(nearest) > 1:
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+            list(pool.map(load, range(len(nearest))))
+    elif nearest:
+        load(0)
+    if errors and len(errors) == len(nearest):
+        raise errors[0]
+
+    pollutants: Dict[str, Dict[str, Any]] = {}
+    stations: List[Dict[str, Any]] = []
+    stale_ages: List[float] = []
+    for (distance, station), reading in zip(nearest, readings):
+        if reading is None:
+            continue
+        values, stale_age = reading
+        if stale_age is not None:
+            stale_ages.append(stale_age)
+        for param, v in values.items():
+            pollutants.setdefault(param, v)
+        stations.append({"id": station.id, "name": station.name, "distance_m": round(distance)})
+    return {
+        "pollutants": pollutants,
+        "stations": stations,
+        "stale_age": max(stale_ages) if stale_ages else None,
+    }
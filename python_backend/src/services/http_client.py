@@ -0,0 +1,102 @@
+"""Shared pooled HTTP client for outbound API calls (weather, daylight, air quality).
+
+One `requests.Session` keeps connections alive across requests, with a bounded
+pool per host and urllib3 retries (jittered exponential backoff, Retry-After
+honoured) for connection errors and transient statuses. The session is opened
+and closed by the app lifespan; it is also created lazily so scripts and tests
+can use the client without the app.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", "8"))
+POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "10"))
+RETRY_TOTAL = int(os.environ.get("HTTP_RETRY_TOTAL", "2"))
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+def _retry() -> Retry:
+    return Retry(
+        total=RETRY_TOTAL,
+        connect=RETRY_TOTAL,
+        read=1,
+        status=RETRY_TOTAL,
+        backoff_factor=0.2,
+        backoff_jitter=0.2,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+class HttpClient:
+    """Keep-alive session with per-host pool limits and retries."""
+
+    def __init__(self) -> None:
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()
+        # Index of the parameter variant that last worked, per caller-chosen key
+        self._styles: Dict[Hashable, int] = {}
+
+    def open(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                # pool_block bounds concurrent connections per host instead of opening extras
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE, pool_block=True, max_retries=_retry()
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def close(self) -> None:
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, timeout: Optional[Timeout] = None) -> requests.Response:
+        return self.open().get(url, params=params, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT))
+
+    def get_first_accepted(
+        self,
+        key: Hashable,
+        url: str,
+        variants: Sequence[Dict[str, Any]],
+        timeout: Optional[Timeout] = None,
+    ) -> requests.Response:
+        """GET with the first parameter variant the server accepts, remembering the winner.
+
+        The variant that last succeeded for `key` is tried first, so the fallback
+        round trip is only paid once rather than on every call. Other variants are
+        tried only on 400/422; if all are rejected the first rejection is returned.
+        """
+        learned = self._styles.get(key, 0)
+        order = [learned] + [i for i in range(len(variants)) if i != learned]
+        first: Optional[requests.Response] = None
+        for i in order:
+            resp = self.get(url, params=variants[i], timeout=timeout)
+            if resp.status_code not in (400, 422):
+                self._styles[key] = i
+                return resp
+            if first is None:  # Response.__bool__ is False for 4xx, so compare to None
+                first = resp
+        assert first is not None
+        return first
+
+
+http_client = HttpClient()
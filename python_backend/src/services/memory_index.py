@@ -0,0 +1,243 @@
+"""In-process full-text index over user memories.
+
+Each user gets an inverted index with BM25 ranking plus MinHash/LSH buckets
+for near-duplicate detection, built lazily from the `list_user_memories` RPC on
+first use and kept in sync by the memory routes on create/delete. Indexes for recently active users are kept in an LRU; a TTL
+bounds staleness from writes made by other processes (MCP tools, other workers).
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.utils import minhash
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its me my "
+    "of on or our she that the their them they this to was we were will with you your".split()
+)
+
+MAX_USERS = int(os.environ.get("MEMORY_INDEX_MAX_USERS", "256"))
+TTL_SECONDS = float(os.environ.get("MEMORY_INDEX_TTL_SECONDS", "300"))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase word tokens without stopwords; a trailing plural 's' is folded."""
+    out: List[str] = []
+    for tok in _TOKEN_RE.findall((text or "").lower()):
+        if tok in _STOPWORDS or len(tok) < 2:
+            continue
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        out.append(tok)
+    return out
+
+
+class MemoryIndex:
+    """BM25 inverted index for one user's memories (title + content)."""
+
+    k1 = 1.5
+    b = 0.75
+
+    def __init__(self) -> None:
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_len = 0
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self.built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, row: Dict[str, Any]) -> None:
+        doc_id = str(row["id"])
+        if doc_id in self.rows:
+            self.remove(doc_id)
+        terms = Counter(tokenize(row.get("title")) + tokenize(row.get("content")))
+        self.rows[doc_id] = row
+        self._lengths[doc_id] = sum(terms.values())
+        self._total_len += self._lengths[doc_id]
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+        sig = minhash.signature(row.get("content") or "")
+        self._signatures[doc_id] = sig
+        for key in minhash.band_keys(sig):
+            self._buckets.setdefault(key, set()).add(doc_id)
+
+    def remove(self, doc_id: str) -> None:
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return
+        self._total_len -= self._lengths.pop(doc_id, 0)
+        for term in set(tokenize(row.get("title")) + tokenize(row.get("content"))):
+            docs = self._postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self._postings[term]
+        sig = self._signatures.pop(doc_id, None)
+        if sig is not None:
+            for key in minhash.band_keys(sig):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(doc_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def score(self, query: str) -> Dict[str, float]:
+        """BM25 score for every memory matching at least one query term."""
+        n = len(self.rows)
+        if not n:
+            return {}
+        avg_len = self._total_len / n or 1.0
+        k1 = self.k1
+        base = k1 * (1.0 - self.b)
+        per_len = k1 * self.b / avg_len
+        lengths = self._lengths
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            docs = self._postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1.0 + (n - len(docs) + 0.5) / (len(docs) + 0.5)) * (k1 + 1.0)
+            for doc_id, tf in docs.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf / (tf + base + per_len * lengths[doc_id])
+        return scores
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
+        scores = self.score(query)
+        top = heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+        return [(s, self.rows[doc_id]) for doc_id, s in top]
+
+    def nearest_duplicate(self, content: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Most similar existing memory among LSH candidates, as (similarity, row)."""
+        sig = minhash.signature(content)
+        candidates: Set[str] = set()
+        for key in minhash.band_keys(sig):
+            candidates |= self._buckets.get(key, set())
+        best: Optional[Tuple[float, str]] = None
+        for doc_id in candidates:
+            sim = minhash.similarity(sig, self._signatures[doc_id])
+            if best is None or sim > best[0]:
+                best = (sim, doc_id)
+        if best is None:
+            return None
+        return best[0], self.rows[best[1]]
+
+
+class MemoryIndexRegistry:
+    """LRU of per-user indexes with lazy builds and write-through updates."""
+
+    def __init__(self, max_users: int = MAX_USERS, ttl_seconds: float = TTL_SECONDS) -> None:
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._indexes: "OrderedDict[str, MemoryIndex]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, user_id: str, loader: Callable[[], List[Dict[str, Any]]]) -> MemoryIndex:
+        """Return the user's index, building it with `loader` if missing or expired."""
+        with self._lock:
+            index = self._fresh(user_id)
+            if index is not None:
+                return index
+            build_lock = self._build_locks.setdefault(user_id, threading.Lock())
+
+        with build_lock:  # one build per user; concurrent callers wait for it
+            with self._lock:
+                index = self._fresh(user_id)
+                if index is not None:
+                    return index
+                version = self._versions.get(user_id, 0)
+            index = MemoryIndex()
+            for row in loader():
+                index.add(row)
+            with self._lock:
+                # A write landed mid-build: serve this result once but do not cache it
+                if self._versions.get(user_id, 0) == version:
+                    self._indexes[user_id] = index
+                    self._indexes.move_to_end(user_id)
+                    while len(self._indexes) > self.max_users:
+                        evicted, _ = self._indexes.popitem(last=False)
+                        self._build_locks.pop(evicted, None)
+            return index
+
+    def search(
+        self, user_id: str, loader: Callable[[], List[Dict[str, Any]]], query: str, limit: int = 5
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top `limit` memories for `query` as (score, row), best first."""
+        index = self.get(user_id, loader)
+        with self._lock:  # writes mutate postings under the same lock
+            return index.search(query, limit)
+
+    def find_duplicate(
+        self, user_id: str, loader: Callable[[], List[Dict[str, Any]]], content: str, threshold: float
+    ) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Closest existing memory with estimated similarity >= threshold, if any."""
+        index = self.get(user_id, loader)
+        with self._lock:
+            hit = index.nearest_duplicate(content)
+        if hit is None or hit[0] < threshold:
+            return None
+        return hit
+
+    def with_index(
+        self,
+        user_id: str,
+        loader: Callable[[], List[Dict[str, Any]]],
+        fn: Callable[[MemoryIndex, Tuple[int, float]], Any],
+    ) -> Any:
+        """Run `fn(index, stamp)` under the registry lock and return its result.
+
+        The stamp changes whenever the user's memories change or the index is
+        rebuilt, so callers can cache results derived from the index.
+        """
+        index = self.get(user_id, loader)
+        with self._lock:
+            return fn(index, (self._versions.get(user_id, 0), index.built_at))
+
+    def _fresh(self, user_id: str) -> Optional[MemoryIndex]:
+        index = self._indexes.get(user_id)
+        if index is None:
+            return None
+        if time.monotonic() - index.built_at > self.ttl_seconds:
+            del self._indexes[user_id]
+            return None
+        self._indexes.move_to_end(user_id)
+        return index
+
+    def on_create(self, user_id: str, row: Dict[str, Any]) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            index = self._indexes.get(user_id)
+            if index is not None:
+                index.add(row)
+
+    def on_delete(self, user_id: str, memory_id: str) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            index = self._indexes.get(user_id)
+            if index is not None:
+                index.remove(memory_id)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(user_id, None)
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+
+memory_indexes = MemoryIndexRegistry()
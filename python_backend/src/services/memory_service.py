@@ -0,0 +1,274 @@
+"""Memory operations shared by the HTTP routes and MCP tools.
+
+Creation goes through near-duplicate detection against the user's in-process
+memory index (MinHash/LSH) so repeated notes do not pile up in `user_memories`.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+
+from src.services.memory_index import memory_indexes
+from src.utils.intervals import parse_iso_utc
+from src.utils.minhash import normalize
+
+DUPLICATE_THRESHOLD = float(os.environ.get("MEMORY_DUPLICATE_THRESHOLD", "0.8"))
+DUPLICATE_ACTIONS = ("skip", "merge", "flag")
+LOAD_PAGE_SIZE = 200
+MAX_STALE_DUPLICATES = 3
+
+CONTEXT_RECENT = 20  # newest memories always considered, even without a term match
+CONTEXT_HALF_LIFE_DAYS = float(os.environ.get("MEMORY_CONTEXT_HALF_LIFE_DAYS", "30"))
+CONTEXT_RELEVANCE_WEIGHT = 0.7
+CONTEXT_CACHE_SIZE = 512
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def list_memories_page(
+    client, p_user_id: str, limit: int, before: Optional[Tuple[datetime, str]] = None
+) -> List[Dict[str, Any]]:
+    """One newest-first page of memories strictly older than the `before` (created_at, id) key."""
+    params: Dict[str, Any] = {"p_user_id": p_user_id, "p_limit": int(limit)}
+    if before is not None:
+        params["p_before_created_at"] = before[0].isoformat()
+        params["p_before_id"] = before[1]
+    res = client.rpc("list_user_memories_keyset", params).execute()
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    return data or []
+
+
+def load_all_memories(client, p_user_id: str) -> List[Dict[str, Any]]:
+    """Fetch every memory of a user by keyset paging (used to build the index)."""
+    rows: List[Dict[str, Any]] = []
+    before: Optional[Tuple[datetime, str]] = None
+    while True:
+        page = list_memories_page(client, p_user_id, LOAD_PAGE_SIZE, before)
+        rows.extend(page)
+        if len(page) < LOAD_PAGE_SIZE:
+            return rows
+        before = (parse_iso_utc(page[-1]["created_at"]), str(page[-1]["id"]))
+
+
+def merge_content(existing: str, new: str) -> str:
+    """Append sentences from `new` that `existing` does not already contain."""
+    seen = {normalize(s) for s in _SENTENCE_RE.split(existing) if s.strip()}
+    extra = [s.strip() for s in _SENTENCE_RE.split(new) if s.strip() and normalize(s) not in seen]
+    return existing if not extra else existing.rstrip() + "\n" + " ".join(extra)
+
+
+def _as_uuid_str(value: Any) -> str:
+    try:
+        return str(UUID(str(value)))
+    except Exception:
+        return str(value)
+
+
+def get_memory(client, user_id: str, memory_id: str) -> Optional[Dict[str, Any]]:
+    """The stored memory row, or None if it no longer exists."""
+    res = client.rpc("get_user_memory", {"p_id": memory_id, "p_user_id": user_id}).execute()
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    return data or None
+
+
+def _find_live_duplicate(client, user_id: str, content: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+    """Nearest duplicate from the index, confirmed against the database.
+
+    Another worker's delete only reaches this worker's index when the index expires,
+    so a match is re-read before it is trusted; vanished rows are dropped from the
+    index and the next best match is tried.
+    """
+    for _ in range(MAX_STALE_DUPLICATES):
+        dup = memory_indexes.find_duplicate(
+            user_id, lambda: load_all_memories(client, user_id), content, DUPLICATE_THRESHOLD
+        )
+        if dup is None:
+            return None
+        row = get_memory(client, user_id, str(dup[1]["id"]))
+        if row is not None:
+            return dup[0], row
+        memory_indexes.on_delete(user_id, str(dup[1]["id"]))
+    # Index is badly out of date; rebuild it once from the database
+    memory_indexes.invalidate(user_id)
+    return memory_indexes.find_duplicate(
+        user_id, lambda: load_all_memories(client, user_id), content, DUPLICATE_THRESHOLD
+    )
+
+
+def create_memory(
+    client,
+    user_id: str,
+    content: str,
+    title: Optional[str] = None,
+    on_duplicate: str = "skip",
+) -> Dict[str, Any]:
+    """Create a memory unless it near-duplicates an existing one.
+
+    on_duplicate: "skip" returns the existing id, "merge" folds new sentences into the
+    existing memory, "flag" inserts anyway. Returns {id, action, duplicate_of?, similarity?}.
+    """
+    if on_duplicate not in DUPLICATE_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"onDuplicate must be one of {list(DUPLICATE_ACTIONS)}")
+
+    dup = _find_live_duplicate(client, user_id, content)
+    if dup is not None and on_duplicate != "flag":
+        similarity, row = dup
+        existing_id = str(row["id"])
+        result = {"id": existing_id, "duplicate_of": existing_id, "similarity": round(similarity, 3)}
+        if on_duplicate == "skip":
+            return {**result, "action": "skipped"}
+
+        merged = merge_content(row.get("content") or "", content)
+        if merged != row.get("content"):
+            res = client.rpc(
+                "update_user_memory",
+                {"p_id": existing_id, "p_user_id": user_id, "p_content": merged, "p_title": title},
+            ).execute()
+            err = getattr(res, "error", None)
+            if err:
+                raise HTTPException(status_code=500, detail=str(err))
+            memory_indexes.on_create(user_id, {**row, "content": merged, "title": title or row.get("title")})
+        return {**result, "action": "merged"}
+
+    res = client.rpc(
+        "create_user_memory",
+        {"p_user_id": user_id, "p_title": title, "p_content": content},
+    ).execute()
+
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(500, str(err))
+    if not data:
+        raise HTTPException(500, "Empty response from RPC")
+
+    new_id = _as_uuid_str(data)
+    memory_indexes.on_create(
+        user_id,
+        {
+            "id": new_id,
+            "user_id": user_id,
+            "title": title,
+            "content": content,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+    )
+    if dup is not None:
+        return {
+            "id": new_id,
+            "action": "flagged",
+            "duplicate_of": str(dup[1]["id"]),
+            "similarity": round(dup[0], 3),
+        }
+    return {"id": new_id, "action": "created"}
+
+
+def _render(row: Dict[str, Any]) -> str:
+    day = str(row.get("created_at") or "")[:10]
+    title = (row.get("title") or "").strip()
+    body = " ".join(str(row.get("content") or "").split())
+    text = f"{title}: {body}" if title else body
+    return f"- [{day}] {text}" if day else f"- {text}"
+
+
+def _cost(text: str, unit: str) -> int:
+    n = len(text) + 1  # joining newline
+    return n if unit == "chars" else math.ceil(n / CHARS_PER_TOKEN)
+
+
+def pack_context(
+    items: List[Tuple[float, Dict[str, Any], str]], budget: int, unit: str
+) -> List[Tuple[float, Dict[str, Any], str]]:
+    """Greedy 0/1 knapsack: take items by value per unit cost while they fit.
+
+    Items are (value, row, rendered_text). The best single item that fits is used
+    instead when it alone beats the greedy pack (keeps the 1/2-approximation bound).
+    Result is ordered by value, best first.
+    """
+    fitting = [it for it in items if _cost(it[2], unit) <= budget]
+    if not fitting:
+        return []
+    chosen: List[Tuple[float, Dict[str, Any], str]] = []
+    used = 0
+    for it in sorted(fitting, key=lambda it: it[0] / _cost(it[2], unit), reverse=True):
+        c = _cost(it[2], unit)
+        if used + c <= budget:
+            chosen.append(it)
+            used += c
+    best = max(fitting, key=lambda it: it[0])
+    if best[0] > sum(it[0] for it in chosen):
+        chosen = [best]
+    return sorted(chosen, key=lambda it: it[0], reverse=True)
+
+
+def _rank_for_context(index, query: str, now: datetime) -> List[Tuple[float, Dict[str, Any], str]]:
+    scores = index.score(query) if query else {}
+    top = max(scores.values(), default=0.0) or 1.0
+    by_age = sorted(index.rows.values(), key=lambda r: str(r.get("created_at") or ""), reverse=True)
+    ids = set(scores) | {str(r["id"]) for r in by_age[:CONTEXT_RECENT]}
+
+    rel_w = CONTEXT_RELEVANCE_WEIGHT if scores else 0.0
+    items: List[Tuple[float, Dict[str, Any], str]] = []
+    for doc_id in ids:
+        row = index.rows[doc_id]
+        try:
+            age_days = max(0.0, (now - parse_iso_utc(row["created_at"])).total_seconds() / 86400.0)
+        except Exception:
+            age_days = CONTEXT_HALF_LIFE_DAYS * 10
+        recency = 0.5 ** (age_days / CONTEXT_HALF_LIFE_DAYS)
+        value = rel_w * scores.get(doc_id, 0.0) / top + (1.0 - rel_w) * recency
+        items.append((value, row, _render(row)))
+    return items
+
+
+_context_cache: "OrderedDict[Tuple[str, str, int, str], Tuple[Any, Dict[str, Any]]]" = OrderedDict()
+_context_lock = threading.Lock()
+
+
+def build_context(client, user_id: str, query: str, budget: int, unit: str = "tokens") -> Dict[str, Any]:
+    """Most relevant and recent memories for `query` packed into `budget` tokens or chars.
+
+    Results are cached per (user, query, budget) until the user's memories change.
+    """
+    query = " ".join((query or "").split())
+    key = (user_id, query.lower(), int(budget), unit)
+    now = datetime.now(timezone.utc)
+
+    def _build(index, stamp) -> Dict[str, Any]:
+        with _context_lock:
+            hit = _context_cache.get(key)
+            if hit is not None and hit[0] == stamp:
+                _context_cache.move_to_end(key)
+                return hit[1]
+        chosen = pack_context(_rank_for_context(index, query, now), budget, unit)
+        result = {
+            "context": "\n".join(text for _, _, text in chosen),
+            "memories": [{**row, "score": round(value, 4)} for value, row, _ in chosen],
+            "used": sum(_cost(text, unit) for _, _, text in chosen),
+            "budget": int(budget),
+            "unit": unit,
+        }
+        with _context_lock:
+            _context_cache[key] = (stamp, result)
+            _context_cache.move_to_end(key)
+            while len(_context_cache) > CONTEXT_CACHE_SIZE:
+                _context_cache.popitem(last=False)
+        return result
+
+    return memory_indexes.with_index(user_id, lambda: load_all_memories(client, user_id), _build)
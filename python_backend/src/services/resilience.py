@@ -0,0 +1,184 @@
+"""Circuit breakers and stale-while-revalidate caching for external providers.
+
+A `CircuitBreaker` opens after `failure_threshold` consecutive failures and
+then fails fast for `reset_timeout` seconds; the next call after that is a
+single probe whose outcome closes or re-opens the circuit.
+
+`SwrCache` serves fresh values from memory. Once a value is past its fresh
+TTL but still within `max_stale`, it is returned at once, marked with its
+age, and refreshed in a background thread. When a synchronous fetch fails,
+the last known good value is served instead of the error.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from fastapi import HTTPException
+
+from src.services.single_flight import upstream_calls
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+RESET_TIMEOUT_SECONDS = float(os.environ.get("CIRCUIT_RESET_TIMEOUT_SECONDS", "30"))
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Count 5xx/transport errors against a provider, not client errors like a bad variable."""
+    if isinstance(exc, HTTPException):
+        return exc.status_code >= 500
+    return True
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a half-open single probe."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or self.clock() - self._opened_at < self.reset_timeout:
+                return "open"
+            return "half_open"
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            wait = self.reset_timeout - (self.clock() - self._opened_at)
+            if wait > 0 or self._probing:
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"{self.name} temporarily unavailable (circuit open); retry in {max(1, int(wait))}s",
+                )
+            self._probing = True  # this caller is the half-open probe
+
+    def call(self, fn: Callable[[], T], is_failure: Callable[[BaseException], bool] = is_upstream_failure) -> T:
+        self._admit()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._record(not is_failure(e))
+            raise
+        self._record(True)
+        return result
+
+    def _record(self, ok: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if ok:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    log.warning("circuit %s opened after %d failures", self.name, self._failures)
+                self._opened_at = self.clock()
+
+
+breakers: Dict[str, CircuitBreaker] = {
+    "open-meteo": CircuitBreaker("Open-Meteo"),
+    "openaq": CircuitBreaker("OpenAQ"),
+}
+
+
+def run_in_background(key: Hashable, fn: Callable[[], Any], running: Dict[Hashable, None], lock: threading.Lock) -> None:
+    """Start `fn` in a daemon thread unless a refresh for `key` is already running."""
+    with lock:
+        if key in running:
+            return
+        running[key] = None
+
+    def target() -> None:
+        try:
+            fn()
+        except Exception as e:  # the stale value keeps being served; next read retries
+            log.info("background refresh %r failed: %s", key, e)
+        finally:
+            with lock:
+                running.pop(key, None)
+
+    threading.Thread(target=target, name=f"refresh-{key!r}"[:60], daemon=True).start()
+
+
+class SwrCache:
+    """Bounded stale-while-revalidate cache of JSON-like values."""
+
+    def __init__(
+        self,
+        fresh_ttl: float,
+        max_stale: float,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.fresh_ttl = fresh_ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: Dict[Hashable, None] = {}
+
+    def _put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self.clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _fetch(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        value = upstream_calls.do(("swr", key), fetch)
+        self._put(key, value)
+        return value
+
+    def get(self, key: Hashable, fetch: Callable[[], Any]) -> Tuple[Any, Optional[float]]:
+        """Return (value, stale_age_seconds); the age is None for freshly fetched values.
+
+        Values older than fresh_ttl + max_stale are refetched synchronously, but are
+        still returned (as last known good) if that fetch fails upstream.
+        """
+        now = self.clock()
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+        if hit is not None:
+            age = now - hit[0]
+            if age <= self.fresh_ttl:
+                return hit[1], None
+            if age <= self.fresh_ttl + self.max_stale:
+                run_in_background(key, lambda: self._fetch(key, fetch), self._refreshing, self._lock)
+                return hit[1], age
+
+        try:
+            return self._fetch(key, fetch), None
+        except Exception as e:
+            if hit is None or not is_upstream_failure(e):
+                raise
+            return hit[1], now - hit[0]
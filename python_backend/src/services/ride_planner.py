@@ -0,0 +1,164 @@
+"""Best departure windows for a ride from one hourly forecast.
+
+Every hour in the horizon gets a discomfort penalty from wind, precipitation,
+temperature and darkness; prefix sums then give the mean penalty of every
+candidate window in O(1) each, so all start times are scored in one pass.
+Busy hours (from the user's schedule), hours the forecast has no value for and,
+optionally, dark hours make a window ineligible. The top windows are picked greedily without overlap.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.services.weather_cache import WeatherCache
+from src.utils.solar import solar_day
+
+PLANNER_VARIABLES = ("temperature_2m", "windspeed_10m", "precipitation")
+
+WIND_COMFORT_KMH = 15.0
+TEMP_COMFORT_RANGE = (8.0, 28.0)
+DARK_MAX_FRACTION = 0.25  # per window, when daylight is required
+
+HOUR = timedelta(hours=1)
+
+
+def hour_penalty(
+    temp: Optional[float], wind: Optional[float], precip: Optional[float], dark: float
+) -> Optional[float]:
+    """Discomfort for one hour; 0 is ideal. None when any forecast value is missing."""
+    if temp is None or wind is None or precip is None:
+        return None
+    lo, hi = TEMP_COMFORT_RANGE
+    p = max(0.0, wind - WIND_COMFORT_KMH) / 5.0
+    p += 4.0 * precip
+    p += max(0.0, lo - temp, temp - hi) / 3.0
+    return p + 5.0 * dark
+
+
+def _daylight_spans(lat: float, lon: float, days: Sequence[date]) -> List[Tuple[datetime, datetime]]:
+    """Sunrise-to-sunset spans for the days plus neighbours (sunrise can fall on another UTC day)."""
+    spans: List[Tuple[datetime, datetime]] = []
+    for d in sorted({d + timedelta(days=o) for d in days for o in (-1, 0, 1)}):
+        sd = solar_day(lat, lon, d)
+        if sd["sunrise"] is not None and sd["sunset"] is not None:
+            spans.append((sd["sunrise"], sd["sunset"]))
+        elif sd["day_length"] >= 86400:
+            midnight = datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+            spans.append((midnight, midnight + timedelta(days=1)))
+    return spans
+
+
+def _dark_fraction(hour_start: datetime, spans: Sequence[Tuple[datetime, datetime]]) -> float:
+    hour_end = hour_start + HOUR
+    lit = sum(
+        max(0.0, (min(hour_end, sunset) - max(hour_start, sunrise)).total_seconds()) for sunrise, sunset in spans
+    )
+    return 1.0 - min(3600.0, lit) / 3600.0
+
+
+def _prefix(values: Iterable[float]) -> List[float]:
+    out = [0.0]
+    for v in values:
+        out.append(out[-1] + v)
+    return out
+
+
+def best_windows(
+    cache: WeatherCache,
+    lat: float,
+    lon: float,
+    start: datetime,
+    horizon_hours: int,
+    duration_hours: int,
+    k: int = 3,
+    busy: Sequence[Tuple[datetime, datetime]] = (),
+    daylight_only: bool = True,
+) -> Dict[str, Any]:
+    """Top `k` non-overlapping windows of `duration_hours` starting within the horizon.
+
+    `start` is floored to the hour. Returns {"windows": [...], "considered": n}.
+    """
+    start = start.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    n_hours = horizon_hours + duration_hours - 1
+    hours = [start + i * HOUR for i in range(n_hours)]
+    days = sorted({h.date() for h in hours})
+
+    cache.prefetch(((lat, lon, d) for d in days), PLANNER_VARIABLES)
+    series: Dict[date, Tuple[List[str], Dict[str, List[Any]]]] = {
+        d: cache.day_series(lat, lon, d, PLANNER_VARIABLES) for d in days
+    }
+    spans = _daylight_spans(lat, lon, days)
+
+    temps: List[Optional[float]] = []
+    winds: List[Optional[float]] = []
+    precs: List[Optional[float]] = []
+    penalties: List[float] = []
+    darks: List[float] = []
+    gaps: List[float] = []
+    for h in hours:
+        times, vals = series[h.date()]
+        key = h.strftime("%Y-%m-%dT%H:%M")
+        idx = times.index(key) if key in times else None
+
+        def val(name: str) -> Optional[float]:
+            seq = vals.get(name) or []
+            return seq[idx] if idx is not None and idx < len(seq) else None
+
+        t, w, p = val("temperature_2m"), val("windspeed_10m"), val("precipitation")
+        dark = _dark_fraction(h, spans)
+        temps.append(t)
+        winds.append(w)
+        precs.append(p)
+        darks.append(dark)
+        pen = hour_penalty(t, w, p, dark)
+        gaps.append(1.0 if pen is None else 0.0)
+        penalties.append(pen or 0.0)
+
+    busy_hours = [0.0] * n_hours
+    for b_start, b_end in busy:
+        lo = max(0, int((b_start - start) // HOUR))
+        hi = min(n_hours, int(-((start - b_end) // HOUR)))  # ceil
+        for i in range(lo, hi):
+            if hours[i] < b_end and b_start < hours[i] + HOUR:
+                busy_hours[i] = 1.0
+
+    pen_sum, dark_sum, busy_sum = _prefix(penalties), _prefix(darks), _prefix(busy_hours)
+    gap_sum = _prefix(gaps)
+    d = duration_hours
+    candidates: List[Tuple[float, int]] = []
+    for i in range(horizon_hours):
+        if busy_sum[i + d] - busy_sum[i] > 0:
+            continue
+        if gap_sum[i + d] - gap_sum[i] > 0:  # unscored hours would rank as ideal
+            continue
+        if daylight_only and (dark_sum[i + d] - dark_sum[i]) / d > DARK_MAX_FRACTION:
+            continue
+        candidates.append(((pen_sum[i + d] - pen_sum[i]) / d, i))
+    candidates.sort()
+
+    chosen: List[Tuple[float, int]] = []
+    for mean_pen, i in candidates:
+        if len(chosen) >= k:
+            break
+        if all(abs(i - j) >= d for _, j in chosen):
+            chosen.append((mean_pen, i))
+
+    windows = []
+    for mean_pen, i in chosen:
+        t_win = [v for v in temps[i:i + d] if v is not None]
+        w_win = [v for v in winds[i:i + d] if v is not None]
+        p_win = [v for v in precs[i:i + d] if v is not None]
+        windows.append(
+            {
+                "start": hours[i].isoformat().replace("+00:00", "Z"),
+                "end": (hours[i] + d * HOUR).isoformat().replace("+00:00", "Z"),
+                "score": round(100.0 / (1.0 + mean_pen), 1),
+                "avg_temperature_2m": round(sum(t_win) / len(t_win), 1) if t_win else None,
+                "max_windspeed_10m": max(w_win) if w_win else None,
+                "total_precipitation": round(sum(p_win), 2) if p_win else None,
+                "daylight_fraction": round(1.0 - (dark_sum[i + d] - dark_sum[i]) / d, 2),
+            }
+        )
+    return {"windows": windows, "considered": len(candidates)}
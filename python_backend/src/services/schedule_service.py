@@ -0,0 +1,96 @@
+"""Schedule reads shared by the schedule routes and other planners.
+
+`load_intervals` merges stored one-off intervals with recurring series expanded
+for the requested window, so callers see a single ordered list of busy blocks.
+"""
+
+from __future__ import annotations
+
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from uuid import uuid5
+
+from fastapi import HTTPException
+
+from src.models.schedule_interval import ScheduleInterval, ScheduleRecurrence
+from src.utils.intervals import to_iso_z
+from src.utils.recurrence import iter_occurrences, parse_rrule
+
+
+def expand_recurrences(
+    client,
+    start_dt: datetime,
+    end_dt: datetime,
+    p_user_uuid: Optional[str],
+    p_types: Optional[List[str]],
+) -> List[ScheduleInterval]:
+    """Expand stored series into occurrences overlapping [start_dt, end_dt), clipped like the SQL list."""
+    res = client.rpc(
+        "list_schedule_recurrences",
+        {
+            "p_start": to_iso_z(start_dt),
+            "p_end": to_iso_z(end_dt),
+            "p_user_id": p_user_uuid,
+            **({"p_types": p_types} if p_types is not None else {}),
+        },
+    ).execute()
+
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+
+    occurrences: List[ScheduleInterval] = []
+    for row in data or []:
+        series = ScheduleRecurrence(**row)
+        try:
+            rule = parse_rrule(series.rrule)
+        except ValueError:
+            continue  # validated on write; never fail a read on a bad legacy row
+        duration = timedelta(minutes=series.duration_minutes)
+        for occ_start, occ_end in iter_occurrences(
+            series.dtstart.astimezone(timezone.utc), duration, rule, start_dt, end_dt, series.exdates
+        ):
+            occurrences.append(
+                ScheduleInterval(
+                    id=uuid5(series.id, to_iso_z(occ_start)),
+                    user_id=series.user_id,
+                    type=series.type,
+                    start_at=max(occ_start, start_dt),
+                    end_at=min(occ_end, end_dt),
+                    title=series.title,
+                    description=series.description,
+                    recurrence_id=series.id,
+                )
+            )
+    occurrences.sort(key=lambda i: i.start_at)
+    return occurrences
+
+
+def load_intervals(
+    client,
+    start_dt: datetime,
+    end_dt: datetime,
+    p_user_uuid: Optional[str],
+    p_types: Optional[List[str]] = None,
+) -> List[ScheduleInterval]:
+    """One-off intervals and expanded recurrences overlapping the window, ordered by start."""
+    res = client.rpc(
+        "list_schedule_intervals",
+        {
+            "p_start": to_iso_z(start_dt),
+            "p_end": to_iso_z(end_dt),
+            "p_user_id": p_user_uuid,
+            **({"p_types": p_types} if p_types is not None else {}),
+        },
+    ).execute()
+
+    data = getattr(res, "data", None)
+    err = getattr(res, "error", None)
+    if err:
+        raise HTTPException(status_code=500, detail=str(err))
+    rows: List[Dict[str, Any]] = data or []
+    singles = [ScheduleInterval(**row) for row in rows]
+    occurrences = expand_recurrences(client, start_dt, end_dt, p_user_uuid, p_types)
+    return list(heapq.merge(singles, occurrences, key=lambda i: i.start_at))
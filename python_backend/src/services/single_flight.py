@@ -0,0 +1,71 @@
+"""Single-flight coalescing of identical concurrent calls.
+
+While a call for a key is in flight, other threads asking for the same key wait
+for it and receive the same result (or exception) instead of issuing their own
+upstream request. Nothing is cached after the call completes; pair with a cache
+where results may be reused.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Per-key in-flight registry shared by blocking callers (threadpool routes)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.shared = 0  # calls answered by another caller's request
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run `fn` once for all concurrent callers with an equal `key`."""
+        value, _ = self.do_shared(key, fn)
+        return value
+
+    def do_shared(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """Like `do`, also returning whether the result came from another caller's call."""
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._calls[key] = fut
+            else:
+                self.shared += 1
+
+        if not leader:
+            return fut.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+def normalize_key(name: str, **params: Any) -> Tuple[Any, ...]:
+    """Order-independent key for an upstream request; floats are rounded to ~1 m."""
+    items = []
+    for k in sorted(params):
+        v = params[k]
+        if isinstance(v, float):
+            v = round(v, 5)
+        elif isinstance(v, (list, tuple)):
+            v = tuple(v)
+        items.append((k, v))
+    return (name, tuple(items))
+
+
+upstream_calls = SingleFlight()
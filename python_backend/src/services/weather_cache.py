@@ -0,0 +1,318 @@
+"""In-process cache of Open-Meteo hourly series by grid cell and UTC day.
+
+Coordinates are snapped to a GRID_DEG grid (about the resolution of the
+underlying forecast models), and each cache entry holds the full 24-hour series
+of one cell for one UTC day. Any hour or variable subset is then served from
+memory; variables not yet cached for a cell/day are fetched and merged in.
+
+Entries expire at the next forecast refresh boundary (FORECAST_REFRESH_SECONDS)
+for today and future days, and after PAST_TTL_SECONDS for past days, whose
+values no longer change. The cache is an LRU bounded by an estimated byte size.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from src.services.http_client import http_client
+from src.services.resilience import breakers, is_upstream_failure, run_in_background
+from src.services.single_flight import normalize_key, upstream_calls
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+DEFAULT_VARIABLES = (
+    "temperature_2m",
+    "windspeed_10m",
+    "winddirection_10m",
+    "precipitation",
+    "cloudcover",
+)
+
+GRID_DEG = float(os.environ.get("WEATHER_CACHE_GRID_DEG", "0.1"))
+FORECAST_REFRESH_SECONDS = int(os.environ.get("WEATHER_CACHE_REFRESH_SECONDS", "3600"))
+PAST_TTL_SECONDS = int(os.environ.get("WEATHER_CACHE_PAST_TTL_SECONDS", "86400"))
+MAX_BYTES = int(os.environ.get("WEATHER_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+MAX_STALE_SECONDS = int(os.environ.get("WEATHER_CACHE_MAX_STALE_SECONDS", str(6 * 3600)))
+
+CellKey = Tuple[int, int, date]
+DayFetcher = Callable[[float, float, date, List[str]], Dict[str, Any]]
+MultiDayFetcher = Callable[[List[Tuple[float, float]], date, List[str]], List[Dict[str, Any]]]
+
+MULTI_FETCH_MAX_LOCATIONS = 50
+MULTI_FETCH_WORKERS = 4
+
+
+def grid_cell(lat: float, lon: float, grid: float = GRID_DEG) -> Tuple[int, int]:
+    """Integer cell indexes for a coordinate."""
+    return int(math.floor(lat / grid + 0.5)), int(math.floor(lon / grid + 0.5))
+
+
+def cell_center(cell: Tuple[int, int], grid: float = GRID_DEG) -> Tuple[float, float]:
+    return round(cell[0] * grid, 4), round(cell[1] * grid, 4)
+
+
+def _day_param_variants(lat: Any, lon: Any, day: date, variables: List[str]) -> List[Dict[str, Any]]:
+    base = {"latitude": lat, "longitude": lon, "hourly": ",".join(variables), "timezone": "UTC"}
+    # Some Open-Meteo deployments only accept start_hour/end_hour; the client remembers which works
+    return [
+        {**base, "start_date": day.isoformat(), "end_date": day.isoformat()},
+        {**base, "start_hour": f"{day.isoformat()}T00:00", "end_hour": f"{day.isoformat()}T23:00"},
+    ]
+
+
+def _request_forecast(variants: List[Dict[str, Any]]) -> Any:
+    try:
+        resp = http_client.get_first_accepted("open-meteo-forecast", OPEN_METEO_URL, variants)
+        data = resp.json()
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to fetch weather: {e}")
+    if resp.status_code >= 400 or (isinstance(data, dict) and data.get("error")):
+        reason = (data.get("reason") if isinstance(data, dict) else None) or f"HTTP {resp.status_code}"
+        code = 400 if resp.status_code == 400 else 502
+        raise HTTPException(status_code=code, detail=f"Weather API error: {reason}")
+    return data
+
+
+def fetch_day(lat: float, lon: float, day: date, variables: List[str]) -> Dict[str, Any]:
+    """Fetch one UTC day of hourly values: {"time": [...], var: [...]}."""
+    variants = _day_param_variants(lat, lon, day, variables)
+    data = breakers["open-meteo"].call(lambda: _request_forecast(variants))
+    return data.get("hourly") or {}
+
+
+def fetch_days_multi(
+    coords: List[Tuple[float, float]], day: date, variables: List[str]
+) -> List[Dict[str, Any]]:
+    """Fetch one UTC day for several coordinates in one request; hourly dicts in input order."""
+    variants = _day_param_variants(
+        ",".join(str(c[0]) for c in coords), ",".join(str(c[1]) for c in coords), day, variables
+    )
+    data = breakers["open-meteo"].call(lambda: _request_forecast(variants))
+    # A single location comes back as an object, several as a list
+    items = data if isinstance(data, list) else [data]
+    if len(items) != len(coords):
+        raise HTTPException(status_code=502, detail="Weather API returned an unexpected number of locations")
+    return [item.get("hourly") or {} for item in items]
+
+
+class _Entry:
+    __slots__ = ("times", "series", "fetched_at", "expires_at", "size")
+
+    def __init__(self, times: List[str], fetched_at: float, expires_at: float) -> None:
+        self.times = times
+        self.fetched_at = fetched_at
+        self.series: Dict[str, List[Any]] = {}
+        self.expires_at = expires_at
+        self.size = 0
+
+    def resize(self) -> None:
+        # Rough footprint: list headers plus boxed values; enough for a memory cap
+        n = len(self.times)
+        self.size = 256 + sys.getsizeof(self.times) + n * 80 + len(self.series) * (sys.getsizeof([None] * n) + n * 24)
+
+
+class WeatherCache:
+    """LRU of per-cell, per-day hourly series with refresh-aligned expiry."""
+
+    def __init__(
+        self,
+        fetcher: DayFetcher = fetch_day,
+        multi_fetcher: MultiDayFetcher = fetch_days_multi,
+        grid: float = GRID_DEG,
+        max_bytes: int = MAX_BYTES,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.fetcher = fetcher
+        self.multi_fetcher = multi_fetcher
+        self.grid = grid
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._entries: "OrderedDict[CellKey, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshing: Dict[CellKey, None] = {}
+
+    def _expiry(self, day: date, now: float) -> float:
+        today = datetime.fromtimestamp(now, tz=timezone.utc).date()
+        if day < today:
+            return now + PAST_TTL_SECONDS
+        return (math.floor(now / FORECAST_REFRESH_SECONDS) + 1) * FORECAST_REFRESH_SECONDS
+
+    def day_series(
+        self, lat: float, lon: float, day: date, variables: Iterable[str]
+    ) -> Tuple[List[str], Dict[str, List[Any]]]:
+        """Return (times, {variable: values}) for one UTC day at the cell containing lat/lon."""
+        times, series, _ = self.lookup(lat, lon, day, variables)
+        return times, series
+
+    def lookup(
+        self, lat: float, lon: float, day: date, variables: Iterable[str]
+    ) -> Tuple[List[str], Dict[str, List[Any]], Optional[float]]:
+        """Like `day_series`, plus the data age in seconds when an expired entry was served.
+
+        Expired entries within MAX_STALE_SECONDS are served immediately and refreshed
+        in the background; if a synchronous fetch fails upstream, any expired entry
+        holding the variables is served as last known good.
+        """
+        wanted = list(dict.fromkeys(variables))
+        cell = grid_cell(lat, lon, self.grid)
+        key: CellKey = (cell[0], cell[1], day)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            missing = wanted if entry is None else [v for v in wanted if v not in entry.series]
+            if not missing:
+                self._entries.move_to_end(key)
+                values = {v: entry.series[v] for v in wanted}
+                if entry.expires_at > now:
+                    return entry.times, values, None
+                if now - entry.expires_at <= MAX_STALE_SECONDS:
+                    refresh_vars = list(entry.series)
+                    run_in_background(
+                        key, lambda: self._fetch_store(key, cell, day, refresh_vars), self._refreshing, self._refresh_lock
+                    )
+                    return entry.times, values, now - entry.fetched_at
+            fresh = entry is not None and entry.expires_at > now
+
+        # Fetch outside the lock; on a cold entry also pull the defaults so later
+        # lookups for other common variables hit.
+        to_fetch = missing if fresh else list(dict.fromkeys(wanted + list(DEFAULT_VARIABLES)))
+        try:
+            times, series = self._fetch_store(key, cell, day, to_fetch, wanted)
+        except Exception as e:
+            if entry is None or missing or not is_upstream_failure(e):
+                raise
+            return entry.times, {v: entry.series[v] for v in wanted}, now - entry.fetched_at
+        return times, series, None
+
+    def _fetch_store(
+        self, key: CellKey, cell: Tuple[int, int], day: date, to_fetch: List[str], wanted: Optional[List[str]] = None
+    ) -> Tuple[List[str], Dict[str, List[Any]]]:
+        center_lat, center_lon = cell_center(cell, self.grid)
+        # Concurrent misses for the same cell/day/variables share one upstream request
+        hourly = upstream_calls.do(
+            normalize_key("open-meteo-day", lat=center_lat, lon=center_lon, day=day.isoformat(), variables=to_fetch),
+            lambda: self.fetcher(center_lat, center_lon, day, to_fetch),
+        )
+        return self._store(key, self.clock(), hourly, to_fetch, wanted if wanted is not None else to_fetch)
+
+    def _store(
+        self, key: CellKey, now: float, hourly: Dict[str, Any], fetched: List[str], wanted: List[str]
+    ) -> Tuple[List[str], Dict[str, List[Any]]]:
+        times = list(hourly.get("time") or [])
+        with self._lock:
+            current = self._entries.get(key)
+            if current is None or current.expires_at <= now or current.times != times:
+                if current is not None:
+                    self._drop(key)
+                current = _Entry(times, now, self._expiry(key[2], now))
+                self._entries[key] = current
+            else:
+                self._bytes -= current.size
+            for v in fetched:
+                seq = hourly.get(v)
+                current.series[v] = list(seq) if isinstance(seq, list) else [None] * len(times)
+            current.resize()
+            self._bytes += current.size
+            self._entries.move_to_end(key)
+            self._evict()
+            return current.times, {v: current.series.get(v, [None] * len(times)) for v in wanted}
+
+    def prefetch(self, points: Iterable[Tuple[float, float, date]], variables: Iterable[str]) -> int:
+        """Make sure every (lat, lon, day) is cached for `variables`; returns upstream requests made.
+
+        Points are deduplicated to grid cells; missing cells of the same day share
+        one multi-location request (chunked), and requests run concurrently.
+        """
+        wanted = list(dict.fromkeys(variables))
+        now = self.clock()
+        groups: Dict[Tuple[date, Tuple[str, ...]], List[Tuple[int, int]]] = {}
+        with self._lock:
+            for lat, lon, day in points:
+                cell = grid_cell(lat, lon, self.grid)
+                key: CellKey = (cell[0], cell[1], day)
+                entry = self._entries.get(key)
+                if entry is not None and now - entry.expires_at <= MAX_STALE_SECONDS:
+                    # Fresh or servable-stale: `lookup` refreshes stale entries in the background
+                    missing = [v for v in wanted if v not in entry.series]
+                else:
+                    missing = list(dict.fromkeys(wanted + list(DEFAULT_VARIABLES)))
+                if missing:
+                    cells = groups.setdefault((day, tuple(missing)), [])
+                    if cell not in cells:
+                        cells.append(cell)
+
+        jobs = [
+            (day, list(vars_), cells[i:i + MULTI_FETCH_MAX_LOCATIONS])
+            for (day, vars_), cells in groups.items()
+            for i in range(0, len(cells), MULTI_FETCH_MAX_LOCATIONS)
+        ]
+        if not jobs:
+            return 0
+
+        def run(job: Tuple[date, List[str], List[Tuple[int, int]]]) -> None:
+            day, vars_, cells = job
+            coords = [cell_center(c, self.grid) for c in cells]
+            hourlies = upstream_calls.do(
+                normalize_key("open-meteo-days", coords=coords, day=day.isoformat(), variables=vars_),
+                lambda: self.multi_fetcher(coords, day, vars_),
+            )
+            for cell, hourly in zip(cells, hourlies):
+                self._store((cell[0], cell[1], day), now, hourly, vars_, vars_)
+
+        def run_safe(job: Tuple[date, List[str], List[Tuple[int, int]]]) -> None:
+            try:
+                run(job)
+            except Exception as e:
+                # Leave these cells to per-point lookups, which can fall back to stale data
+                if not is_upstream_failure(e):
+                    raise
+
+        if len(jobs) == 1:
+            run_safe(jobs[0])
+        else:
+            with ThreadPoolExecutor(max_workers=min(MULTI_FETCH_WORKERS, len(jobs))) as pool:
+                list(pool.map(run_safe, jobs))  # re-raises the first client error
+        return len(jobs)
+
+    def hour_values(
+        self, lat: float, lon: float, at: datetime, variables: Iterable[str]
+    ) -> Tuple[str, Dict[str, Any], Optional[float]]:
+        """Values at the UTC hour containing `at`: (hour_iso, {variable: value}, stale_age_seconds)."""
+        hour = at.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        times, series, stale_age = self.lookup(lat, lon, hour.date(), variables)
+        target = hour.strftime("%Y-%m-%dT%H:%M")
+        values: Dict[str, Any] = {}
+        if target in times:
+            idx = times.index(target)
+            values = {v: seq[idx] for v, seq in series.items() if len(seq) > idx}
+        return hour.isoformat().replace("+00:00", "Z"), values, stale_age
+
+    def _drop(self, key: CellKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+weather_cache = WeatherCache()
@@ -0,0 +1,196 @@
+"""Streaming extraction of cycling workouts from an Apple Health export.
+
+`export.xml` files run to hundreds of megabytes, almost all of it `Record`
+samples. The parser walks the document event by event and clears every
+top-level element once it is handled, so memory stays flat regardless of file
+size. Each `HKWorkoutActivityTypeCycling` workout becomes a dict keyed like
+`CyclingActivity` (started_at, ended_at, duration_seconds, distance_km, ...).
+
+Totals come from the workout's attributes (older exports) or its
+`WorkoutStatistics` children (iOS 16+). VO2max is a separate `Record` type; the
+most recent reading from the 30 days before a ride is attached to it. Those
+readings are few (about one per outdoor workout), so they are the only state kept.
+"""
+
+from __future__ import annotations
+
+import bisect
+import zipfile
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple, Union
+from xml.etree import ElementTree as ET
+
+CYCLING_TYPE = "HKWorkoutActivityTypeCycling"
+VO2MAX_TYPE = "HKQuantityTypeIdentifierVO2Max"
+VO2MAX_MAX_AGE = timedelta(days=30)
+
+_DISTANCE_TO_KM = {"km": 1.0, "m": 0.001, "mi": 1.609344, "ft": 0.0003048, "yd": 0.0009144}
+_ENERGY_TO_KCAL = {"kcal": 1.0, "Cal": 1.0, "cal": 0.001, "kJ": 0.239006, "J": 0.000239006}
+_DURATION_TO_S = {"s": 1.0, "min": 60.0, "hr": 3600.0, "h": 3600.0}
+_LENGTH_TO_M = {"m": 1.0, "cm": 0.01, "km": 1000.0, "ft": 0.3048, "in": 0.0254}
+
+
+def parse_health_date(value: str) -> datetime:
+    """Parse Health's `2025-08-07 17:13:00 +0200` format into aware UTC."""
+    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S %z").astimezone(timezone.utc)
+
+
+def _float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def _convert(value: Optional[float], unit: Optional[str], table: Dict[str, float]) -> Optional[float]:
+    if value is None:
+        return None
+    factor = table.get(unit or "")
+    return value * factor if factor is not None else None
+
+
+def _quantity(text: Optional[str], table: Dict[str, float]) -> Optional[float]:
+    """Metadata quantities such as '57520 cm'."""
+    if not text:
+        return None
+    number, _, unit = text.strip().partition(" ")
+    return _convert(_float(number), unit.strip(), table)
+
+
+class _Extractor:
+    """Turns (event, element) pairs into cycling workouts, clearing handled elements."""
+
+    def __init__(self) -> None:
+        self._depth = 0
+        self._root: Optional[ET.Element] = None
+        self._vo2: List[Tuple[datetime, float]] = []  # kept sorted by time
+
+    def handle(self, event: str, elem: ET.Element) -> Optional[Dict[str, Any]]:
+        if event == "start":
+            if self._depth == 0:
+                self._root = elem
+            self._depth += 1
+            return None
+        self._depth -= 1
+        if self._depth != 1:
+            return None  # nested elements are read through their top-level parent
+        workout = None
+        if elem.tag == "Workout" and elem.get("workoutActivityType") == CYCLING_TYPE:
+            workout = self._workout(elem)
+        elif elem.tag == "Record" and elem.get("type") == VO2MAX_TYPE:
+            self._add_vo2(elem)
+        elem.clear()
+        if self._root is not None:
+            self._root.clear()  # drop references to processed siblings
+        return workout
+
+    def _add_vo2(self, elem: ET.Element) -> None:
+        value = _float(elem.get("value"))
+        date = elem.get("startDate")
+        if value is None or not date:
+            return
+        try:
+            bisect.insort(self._vo2, (parse_health_date(date), value))
+        except ValueError:
+            pass
+
+    def _vo2_before(self, when: datetime) -> Optional[float]:
+        i = bisect.bisect_right(self._vo2, (when, float("inf")))
+        if i == 0:
+            return None
+        at, value = self._vo2[i - 1]
+        return value if when - at <= VO2MAX_MAX_AGE else None
+
+    def _workout(self, elem: ET.Element) -> Optional[Dict[str, Any]]:
+        try:
+            start = parse_health_date(elem.get("startDate", ""))
+            end = parse_health_date(elem.get("endDate", ""))
+        except ValueError:
+            return None
+
+        duration = _convert(_float(elem.get("duration")), elem.get("durationUnit") or "min", _DURATION_TO_S)
+        distance = _convert(_float(elem.get("totalDistance")), elem.get("totalDistanceUnit"), _DISTANCE_TO_KM)
+        energy = _convert(_float(elem.get("totalEnergyBurned")), elem.get("totalEnergyBurnedUnit"), _ENERGY_TO_KCAL)
+        avg_hr = max_hr = elevation = None
+
+        for child in elem:
+            if child.tag == "WorkoutStatistics":
+                kind, unit = child.get("type", ""), child.get("unit")
+                if kind.endswith("DistanceCycling") and distance is None:
+                    distance = _convert(_float(child.get("sum")), unit, _DISTANCE_TO_KM)
+                elif kind.endswith("ActiveEnergyBurned") and energy is None:
+                    energy = _convert(_float(child.get("sum")), unit, _ENERGY_TO_KCAL)
+                elif kind.endswith("HeartRate"):
+                    avg_hr = _float(child.get("average"))
+                    max_hr = _float(child.get("maximum"))
+            elif child.tag == "MetadataEntry" and child.get("key") == "HKElevationAscended":
+                elevation = _quantity(child.get("value"), _LENGTH_TO_M)
+
+        duration_seconds = int(round(duration)) if duration is not None else int((end - start).total_seconds())
+        distance_km = round(distance, 3) if distance is not None else 0.0
+        return {
+            "started_at": start.isoformat().replace("+00:00", "Z"),
+            "ended_at": end.isoformat().replace("+00:00", "Z"),
+            "duration_seconds": duration_seconds,
+            "distance_km": distance_km,
+            "avg_speed_kmh": round(distance_km / (duration_seconds / 3600.0), 2) if duration_seconds > 0 else None,
+            "active_energy_kcal": round(energy, 1) if energy is not None else None,
+            "elevation_gain_m": round(elevation, 1) if elevation is not None else None,
+            "avg_hr_bpm": int(round(avg_hr)) if avg_hr is not None else None,
+            "max_hr_bpm": int(round(max_hr)) if max_hr is not None else None,
+            "vo2max": self._vo2_before(start),
+        }
+
+
+def _open_export(source: Union[str, IO[bytes]]) -> Tuple[IO[bytes], Optional[zipfile.ZipFile]]:
+    if isinstance(source, str) and zipfile.is_zipfile(source):
+        archive = zipfile.ZipFile(source)
+        name = next((n for n in archive.namelist() if n.endswith("/export.xml") or n == "export.xml"), None)
+        if name is None:
+            archive.close()
+            raise ValueError("archive has no export.xml")
+        return archive.open(name), archive
+    if isinstance(source, str):
+        return open(source, "rb"), None
+    return source, None
+
+
+def iter_cycling_workouts(source: Union[str, IO[bytes]]) -> Iterator[Dict[str, Any]]:
+    """Yield cycling workouts from an export.xml path, the export .zip, or a binary file object."""
+    stream, archive = _open_export(source)
+    extractor = _Extractor()
+    try:
+        for event, elem in ET.iterparse(stream, events=("start", "end")):
+            workout = extractor.handle(event, elem)
+            if workout is not None:
+                yield workout
+    finally:
+        if stream is not source:
+            stream.close()
+        if archive is not None:
+            archive.close()
+
+
+class AppleHealthStreamParser:
+    """Push-style variant for uploads: feed bytes as they arrive, collect workouts."""
+
+    def __init__(self) -> None:
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._extractor = _Extractor()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        found = []
+        for event, elem in self._parser.read_events():
+            workout = self._extractor.handle(event, elem)
+            if workout is not None:
+                found.append(workout)
+        return found
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """Raises ET.ParseError on malformed XML."""
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> List[Dict[str, Any]]:
+        self._parser.close()
+        return self._drain()
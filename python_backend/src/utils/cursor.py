@@ -0,0 +1,58 @@
+"""Opaque keyset cursors for paginated list endpoints.
+
+A cursor encodes the sort key of the last row on a page, (timestamp, id), as
+URL-safe base64 JSON. Clients pass it back verbatim to fetch the next page;
+the database resumes with a row-value comparison on an index, so every page
+costs the same regardless of depth.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from src.utils.intervals import parse_iso_utc, to_iso_z
+
+
+def encode_cursor(ts: Any, row_id: Any, issued_at: Optional[datetime] = None) -> str:
+    """Encode a (timestamp, id) sort key; `ts` may be a datetime or ISO string.
+
+    `issued_at` optionally records when the cursor was handed out (see `cursor_issued_at`).
+    """
+    ts_text = to_iso_z(ts) if isinstance(ts, datetime) else to_iso_z(parse_iso_utc(str(ts)))
+    payload = {"t": ts_text, "i": str(row_id)}
+    if issued_at is not None:
+        payload["a"] = to_iso_z(issued_at)
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor into (aware UTC datetime, id string). Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return parse_iso_utc(payload["t"]), str(UUID(payload["i"]))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def cursor_issued_at(cursor: str) -> Optional[datetime]:
+    """When a cursor was issued, if it recorded that; None otherwise or if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        issued = json.loads(base64.urlsafe_b64decode(padded.encode("ascii"))).get("a")
+        return parse_iso_utc(issued) if issued else None
+    except Exception:
+        return None
+
+
+def next_cursor(rows: list, limit: int, ts_key: str = "created_at") -> Optional[str]:
+    """Cursor for the page after `rows`, or None when the page was not full."""
+    if len(rows) < limit or not rows:
+        return None
+    last: Dict[str, Any] = rows[-1]
+    return encode_cursor(last[ts_key], last["id"])
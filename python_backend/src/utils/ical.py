@@ -0,0 +1,281 @@
+"""Minimal iCalendar (RFC 5545) writer and incremental reader for schedules.
+
+The writer renders one VEVENT at a time so exports can be streamed. The reader
+is fed arbitrary text chunks and returns events as soon as their END:VEVENT
+line arrives, so imports run in memory bounded by a single event.
+Only the properties the schedule model uses are interpreted.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    from zoneinfo import ZoneInfo
+except Exception:  # pragma: no cover - Python < 3.9
+    ZoneInfo = None  # type: ignore
+
+PRODID = "-//Cycling AI Coach//Schedule//EN"
+CRLF = "\r\n"
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _unescape(text: str) -> str:
+    out: List[str] = []
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if ch == "\\" and i + 1 < len(text):
+            nxt = text[i + 1]
+            out.append("\n" if nxt in "nN" else nxt)
+            i += 2
+            continue
+        out.append(ch)
+        i += 1
+    return "".join(out)
+
+
+def _fold(line: str) -> str:
+    """Fold a content line at 75 octets as required by RFC 5545."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + CRLF
+    parts: List[str] = []
+    current = ""
+    limit = 75
+    for ch in line:
+        if len((current + ch).encode("utf-8")) > limit:
+            parts.append(current)
+            current = ch
+            limit = 74  # continuation lines start with a space
+        else:
+            current += ch
+    parts.append(current)
+    return (CRLF + " ").join(parts) + CRLF
+
+
+def format_dt(dt: datetime) -> str:
+    """Format as UTC date-time (YYYYMMDDTHHMMSSZ)."""
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def calendar_header(name: Optional[str] = None) -> str:
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN"]
+    if name:
+        lines.append(f"X-WR-CALNAME:{_escape(name)}")
+    return "".join(_fold(line) for line in lines)
+
+
+def calendar_footer() -> str:
+    return _fold("END:VCALENDAR")
+
+
+def render_event(
+    uid: str,
+    start: datetime,
+    end: datetime,
+    summary: Optional[str] = None,
+    description: Optional[str] = None,
+    category: Optional[str] = None,
+    rrule: Optional[str] = None,
+    exdates: Optional[List[datetime]] = None,
+    stamp: Optional[datetime] = None,
+) -> str:
+    """Render one VEVENT block (folded, CRLF-terminated)."""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{format_dt(stamp or datetime.now(timezone.utc))}",
+        f"DTSTART:{format_dt(start)}",
+        f"DTEND:{format_dt(end)}",
+    ]
+    if summary:
+        lines.append(f"SUMMARY:{_escape(summary)}")
+    if description:
+        lines.append(f"DESCRIPTION:{_escape(description)}")
+    if category:
+        lines.append(f"CATEGORIES:{_escape(category)}")
+    if rrule:
+        lines.append(f"RRULE:{rrule}")
+    if exdates:
+        lines.append("EXDATE:" + ",".join(format_dt(d) for d in exdates))
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+_DURATION_RE = re.compile(
+    r"^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+
+
+def parse_duration(value: str) -> timedelta:
+    m = _DURATION_RE.match(value.strip())
+    if not m:
+        raise ValueError(f"Invalid DURATION '{value}'")
+    delta = timedelta(
+        weeks=int(m["weeks"] or 0),
+        days=int(m["days"] or 0),
+        hours=int(m["hours"] or 0),
+        minutes=int(m["minutes"] or 0),
+        seconds=int(m["seconds"] or 0),
+    )
+    return -delta if m["sign"] == "-" else delta
+
+
+def parse_dt(value: str, params: Dict[str, str]) -> datetime:
+    """Parse DATE or DATE-TIME values (UTC, floating or TZID) into aware UTC datetimes.
+
+    Floating times and unknown TZIDs are treated as UTC; dates map to midnight UTC.
+    """
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or (len(value) == 8 and value.isdigit()):
+        d = datetime.strptime(value[:8], "%Y%m%d").date()
+        return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+    naive = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    tzid = params.get("TZID")
+    tz = None
+    if tzid and ZoneInfo is not None:
+        try:
+            tz = ZoneInfo(tzid.strip('"'))
+        except Exception:
+            tz = None
+    return naive.replace(tzinfo=tz or timezone.utc).astimezone(timezone.utc)
+
+
+def _split_property(line: str) -> tuple[str, Dict[str, str], str]:
+    # NAME;PARAM=V;PARAM2="x:y":VALUE -- the first colon outside quotes ends the name/params
+    in_quotes = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch == ":" and not in_quotes:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        return line.upper(), {}, ""
+    name, *raw_params = head.split(";")
+    params: Dict[str, str] = {}
+    for p in raw_params:
+        if "=" in p:
+            k, v = p.split("=", 1)
+            params[k.upper()] = v
+    return name.upper(), params, value
+
+
+class IcsEventReader:
+    """Incremental VEVENT reader: feed text chunks, collect parsed events.
+
+    Each event is a dict with uid, summary, description, categories, start, end,
+    rrule and exdates (or an `error` key when it cannot be interpreted).
+    Nested components (VALARM) are skipped.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pending: Optional[str] = None  # logical line awaiting possible continuation
+        self._event: Optional[List[tuple[str, Dict[str, str], str]]] = None
+        self._depth = 0  # nesting inside the current VEVENT
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a text chunk and return the events completed by it."""
+        self._buffer += chunk
+        *lines, self._buffer = re.split(r"\r?\n", self._buffer)
+        events: List[Dict[str, Any]] = []
+        for raw in lines:
+            events.extend(self._physical_line(raw))
+        return events
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Flush buffered input at end of stream."""
+        events: List[Dict[str, Any]] = []
+        if self._buffer:
+            events.extend(self._physical_line(self._buffer))
+            self._buffer = ""
+        if self._pending is not None:
+            line, self._pending = self._pending, None
+            events.extend(self._logical_line(line))
+        return events
+
+    def _physical_line(self, raw: str) -> Iterator[Dict[str, Any]]:
+        if raw[:1] in (" ", "\t") and self._pending is not None:
+            self._pending += raw[1:]
+            return
+        if self._pending is not None:
+            line = self._pending
+            self._pending = raw
+            yield from self._logical_line(line)
+        else:
+            self._pending = raw
+
+    def _logical_line(self, line: str) -> Iterator[Dict[str, Any]]:
+        if not line.strip():
+            return
+        name, params, value = _split_property(line)
+        if name == "BEGIN":
+            if value.upper() == "VEVENT" and self._event is None:
+                self._event, self._depth = [], 0
+            elif self._event is not None:
+                self._depth += 1
+            return
+        if name == "END":
+            if self._event is not None:
+                if self._depth:
+                    self._depth -= 1
+                elif value.upper() == "VEVENT":
+                    props, self._event = self._event, None
+                    yield _build_event(props)
+            return
+        if self._event is not None and not self._depth:
+            self._event.append((name, params, value))
+
+
+def _build_event(props: List[tuple[str, Dict[str, str], str]]) -> Dict[str, Any]:
+    event: Dict[str, Any] = {"exdates": []}
+    start_params: Dict[str, str] = {}
+    duration: Optional[timedelta] = None
+    try:
+        for name, params, value in props:
+            if name == "UID":
+                event["uid"] = value
+            elif name == "SUMMARY":
+                event["summary"] = _unescape(value)
+            elif name == "DESCRIPTION":
+                event["description"] = _unescape(value)
+            elif name == "CATEGORIES":
+                event["categories"] = [_unescape(c) for c in re.split(r"(?<!\\),", value) if c]
+            elif name == "DTSTART":
+                event["start"] = parse_dt(value, params)
+                start_params = params
+            elif name == "DTEND":
+                event["end"] = parse_dt(value, params)
+            elif name == "DURATION":
+                duration = parse_duration(value)
+            elif name == "RRULE":
+                event["rrule"] = value
+            elif name == "EXDATE":
+                event["exdates"].extend(parse_dt(v, params) for v in value.split(",") if v)
+    except ValueError as e:
+        event["error"] = str(e)
+        return event
+
+    start = event.get("start")
+    if start is None:
+        event["error"] = "missing DTSTART"
+    elif "end" not in event:
+        if duration is not None:
+            event["end"] = start + duration
+        elif start_params.get("VALUE") == "DATE":
+            event["end"] = start + timedelta(days=1)  # all-day event
+        else:
+            event["error"] = "missing DTEND/DURATION"
+    return event
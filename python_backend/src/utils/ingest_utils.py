@@ -1,73 +1,308 @@
+"""Activity ingest client for POST /activities/batch (CSV or Apple Health export).
+
+The file is streamed in batches that are sent concurrently (bounded by
+`max_workers`), each retried with exponential backoff on connection errors,
+429 and 5xx. Progress is checkpointed to a local JSON file after every batch:
+the offset below which all rows are committed, the batches committed beyond it,
+and a hash of the file. A rerun with the same file resumes from the checkpoint;
+it is removed once the whole file has been ingested.
+"""
+
 import csv
+import hashlib
+import json
 import os
-from typing import Optional
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import requests
 
+from src.utils.apple_health import iter_cycling_workouts
+
+REQUIRED_COLUMNS = [
+    "start_time",
+    "end_time",
+    "duration_seconds",
+    "distance_km",
+    "avg_speed_kmh",
+    "active_energy_kcal",
+    "elevation_gain_m",
+    "avg_hr_bpm",
+    "max_hr_bpm",
+    "vo2max",
+]
+BATCH_SIZE = 500
+MAX_WORKERS = 4
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def row_to_payload(row: Dict[str, str]) -> Dict[str, Any]:
+    """Map a CSV row (snake_case headers) to the API's camelCase activity fields."""
+    return {
+        "startTime": row["start_time"],
+        "endTime": row["end_time"],
+        "durationSeconds": int(row["duration_seconds"]) if row["duration_seconds"] else 0,
+        "distanceKm": float(row["distance_km"]) if row["distance_km"] else 0.0,
+        "averageSpeedKmh": float(row["avg_speed_kmh"]) if row["avg_speed_kmh"] else None,
+        "activeEnergyKcal": float(row["active_energy_kcal"]) if row["active_energy_kcal"] else None,
+        "elevationGainMeters": float(row["elevation_gain_m"]) if row["elevation_gain_m"] else None,
+        "averageHeartRateBpm": float(row["avg_hr_bpm"]) if row["avg_hr_bpm"] else None,
+        "maxHeartRateBpm": float(row["max_hr_bpm"]) if row["max_hr_bpm"] else None,
+        "vo2Max": float(row["vo2max"]) if row["vo2max"] else None,
+    }
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Committed-row watermark for one (file content, user) ingest, persisted atomically."""
+
+    def __init__(self, path: str, content_hash: str, user_id: Optional[str], batch_size: int) -> None:
+        self.path = path
+        self.content_hash = content_hash
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.committed_rows = 0
+        self.done_beyond: Dict[int, int] = {}  # offset -> row count of committed batches past the watermark
+        self.counts = {"inserted": 0, "updated": 0, "skipped": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, content_hash: str, user_id: Optional[str], batch_size: int) -> "Checkpoint":
+        cp = cls(path, content_hash, user_id, batch_size)
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return cp
+        # A checkpoint for other content or another user is ignored (and overwritten)
+        if state.get("content_hash") != content_hash or state.get("user_id") != user_id:
+            return cp
+        cp.committed_rows = int(state.get("committed_rows", 0))
+        cp.counts.update({k: int(v) for k, v in (state.get("counts") or {}).items() if k in cp.counts})
+        if state.get("batch_size") == batch_size:
+            cp.done_beyond = {int(o): int(n) for o, n in state.get("done_beyond", []) if int(o) >= cp.committed_rows}
+        return cp
+
+    def pending(self, offset: int, rows: List[Dict[str, str]]) -> Tuple[int, List[Dict[str, str]]]:
+        """The part of a batch not committed yet (empty when it is)."""
+        if offset in self.done_beyond:
+            return offset, []
+        skip = max(0, self.committed_rows - offset)
+        return offset + skip, rows[skip:]
+
+    def commit(self, offset: int, rows: int, result: Dict[str, Any]) -> None:
+        with self._lock:
+            for key in self.counts:
+                self.counts[key] += int(result.get(key) or 0)
+            self.done_beyond[offset] = rows
+            # Advance the watermark over the contiguous prefix of committed batches
+            while self.committed_rows in self.done_beyond:
+                self.committed_rows += self.done_beyond.pop(self.committed_rows)
+            self._save()
+
+    def _save(self) -> None:
+        state = {
+            "content_hash": self.content_hash,
+            "user_id": self.user_id,
+            "batch_size": self.batch_size,
+            "committed_rows": self.committed_rows,
+            "done_beyond": sorted(self.done_beyond.items()),
+            "counts": self.counts,
+        }
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def remove(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _batches(rows: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """Yield (offset of first row, rows) without holding more than one batch."""
+    batch: List[Dict[str, Any]] = []
+    offset = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield offset, batch
+            offset += len(batch)
+            batch = []
+    if batch:
+        yield offset, batch
+
+
+def _retry_delay(attempt: int, resp: Optional[requests.Response]) -> float:
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(BACKOFF_MAX_SECONDS, float(retry_after))
+    # Full jitter keeps concurrent workers from retrying in lockstep
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+def _request_target(base_url: str, user_id: Optional[str], user_id_header: Optional[str]) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+    endpoint = f"{base_url.rstrip('/')}/activities/batch"
+    headers = {"Content-Type": "application/json"}
+    params = {}
+    if user_id:
+        if user_id_header:
+            headers[user_id_header] = user_id
+        else:
+            params["userId"] = user_id
+    return endpoint, headers, params
+
+
+def _send_batches(
+    batches: Iterable[Tuple[int, List[Dict[str, Any]]]],
+    target: Tuple[str, Dict[str, str], Dict[str, str]],
+    checkpoint: Checkpoint,
+    max_workers: int,
+    max_retries: int,
+) -> int:
+    """POST uncommitted batches concurrently with retries; returns how many were sent.
+
+    Raises RuntimeError (after in-flight batches finish) once any batch fails for good.
+    """
+    endpoint, headers, params = target
+    local = threading.local()
+
+    def session() -> requests.Session:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    def send(offset: int, payload: List[Dict[str, Any]]) -> None:
+        for attempt in range(max_retries + 1):
+            resp: Optional[requests.Response] = None
+            try:
+                resp = session().post(endpoint, json=payload, headers=headers, params=params, timeout=60)
+            except requests.RequestException as e:
+                if attempt == max_retries:
+                    raise RuntimeError(f"Rows {offset}-{offset + len(payload) - 1}: {e}") from e
+            else:
+                if resp.status_code < 400:
+                    checkpoint.commit(offset, len(payload), resp.json())
+                    return
+                if resp.status_code not in RETRY_STATUSES or attempt == max_retries:
+                    raise RuntimeError(
+                        f"Failed to insert rows {offset}-{offset + len(payload) - 1}: {resp.status_code} {resp.text}"
+                    )
+            time.sleep(_retry_delay(attempt, resp))
+
+    sent = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight: Set[Future] = set()
+        error: Optional[BaseException] = None
+        for offset, rows in batches:
+            offset, rows = checkpoint.pending(offset, rows)
+            if not rows:
+                continue
+            # Bound memory: at most two batches queued per worker
+            while len(in_flight) >= 2 * max_workers:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                error = error or next((fut.exception() for fut in done if fut.exception()), None)
+            if error:
+                break
+            in_flight.add(pool.submit(send, offset, rows))
+            sent += 1
+        done, _ = wait(in_flight)
+        error = error or next((fut.exception() for fut in done if fut.exception()), None)
+
+    if error:
+        raise RuntimeError(
+            f"Ingest stopped; {checkpoint.committed_rows} rows committed, checkpoint at {checkpoint.path}: {error}"
+        )
+    return sent
+
 
 def ingest_csv_activities(
     csv_path: str,
     base_url: str = "http://localhost:8001",
     user_id: Optional[str] = None,
     user_id_header: Optional[str] = None,
-):
+    batch_size: int = BATCH_SIZE,
+    max_workers: int = MAX_WORKERS,
+    max_retries: int = MAX_RETRIES,
+    checkpoint_path: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Load a CSV file with columns:
     start_time,end_time,duration_seconds,distance_km,avg_speed_kmh,active_energy_kcal,elevation_gain_m,avg_hr_bpm,max_hr_bpm,vo2max
 
-    and POST each row to POST /activities one by one.
+    and POST the rows to POST /activities/batch in batches of `batch_size`,
+    up to `max_workers` batches in flight.
 
     - If user_id is provided, it will be sent as query param userId unless user_id_header is set,
-      in which case it's sent as header x-user-id.
+      in which case it's sent in that header (the API reads `x-user-id`).
     - base_url defaults to local dev server.
-    """
-    endpoint = f"{base_url.rstrip('/')}/activities"
+    - checkpoint_path defaults to `<csv_path>.checkpoint.json`. On failure the checkpoint is
+      kept and a RuntimeError is raised; calling again resumes after the committed rows.
 
-    headers = {"Content-Type": "application/json"}
-    params = {}
-    if user_id:
-        if user_id_header:
-            headers[user_id_header] = user_id
-        else:
-            params["userId"] = user_id
+    Rides already stored are updated or skipped server-side, so rerunning an import (or
+    resending a batch after a lost response) never duplicates them.
+
+    Returns {"inserted", "updated", "skipped", "batches", "resumed_from"}; counts include earlier runs.
+    """
+    target = _request_target(base_url, user_id, user_id_header)
+    checkpoint = Checkpoint.load(
+        checkpoint_path or f"{csv_path}.checkpoint.json", file_sha256(csv_path), user_id, batch_size
+    )
+    resumed_from = checkpoint.committed_rows
 
     with open(csv_path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
-        required = [
-            "start_time",
-            "end_time",
-            "duration_seconds",
-            "distance_km",
-            "avg_speed_kmh",
-            "active_energy_kcal",
-            "elevation_gain_m",
-            "avg_hr_bpm",
-            "max_hr_bpm",
-            "vo2max",
-        ]
-        missing = [c for c in required if c not in reader.fieldnames]
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
         if missing:
             raise ValueError(f"CSV is missing required columns: {missing}")
+        sent = _send_batches(
+            _batches((row_to_payload(row) for row in reader), batch_size), target, checkpoint, max_workers, max_retries
+        )
 
-        for row in reader:
-            payload = {
-                # Map CSV snake_case to API camelCase expected by FastAPI model
-                "startTime": row["start_time"],
-                "endTime": row["end_time"],
-                "durationSeconds": int(row["duration_seconds"]) if row["duration_seconds"] else 0,
-                "distanceKm": float(row["distance_km"]) if row["distance_km"] else 0.0,
-                "averageSpeedKmh": float(row["avg_speed_kmh"]) if row["avg_speed_kmh"] else None,
-                "activeEnergyKcal": float(row["active_energy_kcal"]) if row["active_energy_kcal"] else None,
-                "elevationGainMeters": float(row["elevation_gain_m"]) if row["elevation_gain_m"] else None,
-                "averageHeartRateBpm": float(row["avg_hr_bpm"]) if row["avg_hr_bpm"] else None,
-                "maxHeartRateBpm": float(row["max_hr_bpm"]) if row["max_hr_bpm"] else None,
-                "vo2Max": float(row["vo2max"]) if row["vo2max"] else None,
-            }
+    checkpoint.remove()
+    return {**checkpoint.counts, "batches": sent, "resumed_from": resumed_from}
 
-            resp = requests.post(endpoint, json=payload, headers=headers, params=params, timeout=30)
-            if resp.status_code >= 400:
-                raise RuntimeError(f"Failed to insert row: {resp.status_code} {resp.text}")
-
-    return True
 
+def ingest_apple_health_export(
+    export_path: str,
+    base_url: str = "http://localhost:8001",
+    user_id: Optional[str] = None,
+    user_id_header: Optional[str] = None,
+    batch_size: int = BATCH_SIZE,
+    max_workers: int = MAX_WORKERS,
+    max_retries: int = MAX_RETRIES,
+    checkpoint_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Stream cycling workouts out of an Apple Health `export.xml` (or the exported .zip)
+    and POST them to POST /activities/batch, like `ingest_csv_activities`.
 
+    The export is parsed incrementally, so memory does not grow with file size.
+    Checkpointing and resume work the same way (checkpoint defaults to
+    `<export_path>.checkpoint.json`).
+    """
+    target = _request_target(base_url, user_id, user_id_header)
+    checkpoint = Checkpoint.load(
+        checkpoint_path or f"{export_path}.checkpoint.json", file_sha256(export_path), user_id, batch_size
+    )
+    resumed_from = checkpoint.committed_rows
+    sent = _send_batches(
+        _batches(iter_cycling_workouts(export_path), batch_size), target, checkpoint, max_workers, max_retries
+    )
+    checkpoint.remove()
+    return {**checkpoint.counts, "batches": sent, "resumed_from": resumed_from}
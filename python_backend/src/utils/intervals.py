@@ -0,0 +1,85 @@
+"""Time helpers shared by schedule features.
+
+Schedule blocks are stored as half-open UTC ranges snapped to a 15-minute grid
+(see `create_schedule_interval.sql`). These helpers mirror that snapping so the
+backend can reason about periods before they reach the database, and detect
+overlaps between blocks without another round trip.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+SNAP = timedelta(minutes=15)
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_iso_utc(value: str) -> datetime:
+    """Parse an ISO-8601 string (``Z`` allowed) into an aware UTC datetime.
+
+    Naive values are treated as UTC. Raises ValueError on malformed input.
+    """
+    dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def to_iso_z(dt: datetime) -> str:
+    """Format an aware datetime as ISO-8601 UTC with a ``Z`` suffix."""
+    return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def snap_down(dt: datetime) -> datetime:
+    """Floor to the 15-minute grid (UTC)."""
+    return dt - ((dt - _EPOCH) % SNAP)
+
+
+def snap_up(dt: datetime) -> datetime:
+    """Ceil to the 15-minute grid (UTC)."""
+    rem = (dt - _EPOCH) % SNAP
+    return dt if not rem else dt + (SNAP - rem)
+
+
+def snap_period(start: datetime, end: datetime) -> Tuple[datetime, datetime]:
+    """Snap [start, end) outward to the grid, as the schedule SQL functions do."""
+    return snap_down(start), snap_up(end)
+
+
+def find_conflicts(
+    candidates: Iterable[Tuple[Hashable, datetime, datetime]],
+    existing: Iterable[Tuple[Hashable, datetime, datetime]],
+) -> Dict[Hashable, List[Hashable]]:
+    """Return overlaps for each candidate as {candidate_key: [overlapping keys]}.
+
+    Items are (key, start, end) half-open ranges. Candidates are checked against
+    existing items and against each other; existing items are not checked among
+    themselves. Single sorted sweep: O(n log n + k) for n items and k overlaps.
+    Candidates without overlaps are omitted from the result.
+    """
+    events: List[Tuple[datetime, int, bool, Hashable]] = []
+    for is_candidate, items in ((False, existing), (True, candidates)):
+        for key, start, end in items:
+            if start < end:
+                events.append((start, 1, is_candidate, key))
+                events.append((end, 0, is_candidate, key))
+    # Ends sort before starts at the same instant: touching ranges do not overlap
+    events.sort(key=lambda ev: (ev[0], ev[1]))
+
+    active_existing: Dict[Hashable, None] = {}
+    active_candidates: Dict[Hashable, None] = {}
+    conflicts: Dict[Hashable, List[Hashable]] = {}
+    for _, is_start, is_candidate, key in events:
+        active = active_candidates if is_candidate else active_existing
+        if not is_start:
+            active.pop(key, None)
+            continue
+        for other in active_candidates:
+            conflicts.setdefault(other, []).append(key)
+        if is_candidate:
+            hits = list(active_existing) + list(active_candidates)
+            if hits:
+                conflicts.setdefault(key, []).extend(hits)
+        active[key] = None
+    return conflicts
@@ -0,0 +1,90 @@
+"""Static k-d tree for nearest-neighbour queries on latitude/longitude points.
+
+Points are mapped to 3-D unit vectors so that straight-line (chord) distance is
+monotonic in great-circle distance: no special cases at the antimeridian or
+near the poles. The tree is built once (O(n log n)) and answers k-nearest
+queries in O(log n) on average; rebuild it when the point set changes.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+from typing import Generic, List, Optional, Sequence, Tuple, TypeVar
+
+EARTH_RADIUS_M = 6_371_008.8
+
+T = TypeVar("T")
+Vec = Tuple[float, float, float]
+
+
+def to_unit_vector(lat: float, lon: float) -> Vec:
+    phi, lam = math.radians(lat), math.radians(lon)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi)
+
+
+def chord_to_meters(chord: float) -> float:
+    return 2.0 * EARTH_RADIUS_M * math.asin(min(1.0, chord / 2.0))
+
+
+def meters_to_chord(meters: float) -> float:
+    return 2.0 * math.sin(min(math.pi, meters / EARTH_RADIUS_M) / 2.0)
+
+
+class KDTree(Generic[T]):
+    """Immutable 3-D k-d tree over (lat, lon, item) triples."""
+
+    def __init__(self, points: Sequence[Tuple[float, float, T]]) -> None:
+        self._vecs: List[Vec] = [to_unit_vector(lat, lon) for lat, lon, _ in points]
+        self._items: List[T] = [item for _, _, item in points]
+        # Implicit tree: node i stores a point index, split axis, left and right child
+        self._nodes: List[Tuple[int, int, int, int]] = []
+        self._root = self._build(list(range(len(self._vecs))), 0)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _build(self, idx: List[int], depth: int) -> int:
+        if not idx:
+            return -1
+        axis = depth % 3
+        idx.sort(key=lambda i: self._vecs[i][axis])
+        mid = len(idx) // 2
+        node = len(self._nodes)
+        self._nodes.append((idx[mid], axis, -1, -1))
+        left = self._build(idx[:mid], depth + 1)
+        right = self._build(idx[mid + 1:], depth + 1)
+        self._nodes[node] = (idx[mid], axis, left, right)
+        return node
+
+    def nearest(
+        self, lat: float, lon: float, k: int = 1, max_distance_m: Optional[float] = None
+    ) -> List[Tuple[float, T]]:
+        """Up to `k` nearest items as (distance_m, item), closest first."""
+        if self._root < 0 or k <= 0:
+            return []
+        q = to_unit_vector(lat, lon)
+        bound = meters_to_chord(max_distance_m) ** 2 if max_distance_m is not None else math.inf
+        best: List[Tuple[float, int]] = []  # max-heap of (-dist2, point index)
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            i, axis, left, right = self._nodes[node]
+            v = self._vecs[i]
+            d2 = (v[0] - q[0]) ** 2 + (v[1] - q[1]) ** 2 + (v[2] - q[2]) ** 2
+            worst = -best[0][0] if len(best) == k else bound
+            if d2 <= worst:
+                heapq.heappush(best, (-d2, i))
+                if len(best) > k:
+                    heapq.heappop(best)
+                worst = -best[0][0] if len(best) == k else bound
+            diff = q[axis] - v[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            if diff * diff <= worst:
+                stack.append(far)
+            stack.append(near)  # popped first
+        return [(chord_to_meters(math.sqrt(-nd2)), self._items[i]) for nd2, i in sorted(best, reverse=True)]
+
@@ -0,0 +1,79 @@
+"""MinHash signatures and LSH banding for near-duplicate text detection.
+
+Texts are normalized and split into character shingles; a signature keeps
+NUM_PERM per-slot minima over the hashed shingle set, so the fraction of equal
+slots estimates Jaccard similarity. Signatures are cut into BANDS bands:
+texts sharing any band bucket become candidates (default ~0.5 similarity knee).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from typing import Iterable, Set, Tuple
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+
+_EMPTY = (1 << 58) - 1
+_WS_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return _WS_RE.sub(" ", _PUNCT_RE.sub(" ", (text or "").lower())).strip()
+
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> Set[str]:
+    norm = normalize(text)
+    if len(norm) <= k:
+        return {norm} if norm else set()
+    return {norm[i:i + k] for i in range(len(norm) - k + 1)}
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def signature(text: str) -> Tuple[int, ...]:
+    """MinHash signature of NUM_PERM slots using one-permutation hashing.
+
+    Each shingle is hashed once; its low bits pick a slot and the remaining bits
+    compete for that slot's minimum. Empty slots borrow from the next non-empty
+    slot (rotation densification) so signatures stay comparable slot by slot.
+    Cost is O(shingles) rather than O(shingles * NUM_PERM).
+    """
+    slots = [_EMPTY] * NUM_PERM
+    for sh in shingles(text):
+        h = _hash64(sh)
+        idx, val = h % NUM_PERM, h // NUM_PERM
+        if val < slots[idx]:
+            slots[idx] = val
+    filled = [i for i, v in enumerate(slots) if v != _EMPTY]
+    if not filled:
+        return tuple(slots)
+    if len(filled) < NUM_PERM:
+        dense = list(slots)
+        for i in range(NUM_PERM):
+            if slots[i] == _EMPTY:
+                step = 1
+                while slots[(i + step) % NUM_PERM] == _EMPTY:
+                    step += 1
+                # Offset by distance so borrowed values rarely collide by accident
+                dense[i] = slots[(i + step) % NUM_PERM] + step * _EMPTY
+        slots = dense
+    return tuple(slots)
+
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the underlying shingle sets."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / float(NUM_PERM)
+
+
+def band_keys(sig: Tuple[int, ...]) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+    """LSH bucket keys, one per band."""
+    for band in range(BANDS):
+        yield band, sig[band * ROWS:(band + 1) * ROWS]
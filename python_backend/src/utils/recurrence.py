@@ -0,0 +1,201 @@
+"""Recurrence rules for schedule intervals (RFC 5545 RRULE subset).
+
+Supported: ``FREQ=DAILY|WEEKLY``, ``INTERVAL``, ``BYDAY`` (weekly only, plain
+weekday codes), ``UNTIL`` and ``COUNT``. Exceptions are passed separately as
+EXDATE-style occurrence start times.
+
+A rule is stored once and expanded lazily: `iter_occurrences` jumps straight to
+the first period that can overlap the requested window, so expansion cost is
+proportional to the occurrences returned rather than the age of the series.
+All arithmetic is in UTC.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Optional, Tuple
+
+from src.utils.intervals import parse_iso_utc
+
+WEEKDAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+MAX_COUNT = 1000
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    """Parsed RRULE. ``by_day`` holds weekday indexes (0 = Monday)."""
+
+    freq: str
+    interval: int = 1
+    by_day: Tuple[int, ...] = ()
+    until: Optional[datetime] = None
+    count: Optional[int] = None
+
+    def to_rrule(self) -> str:
+        """Serialize back to canonical RRULE text."""
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.by_day:
+            parts.append("BYDAY=" + ",".join(WEEKDAY_CODES[d] for d in self.by_day))
+        if self.until is not None:
+            parts.append("UNTIL=" + self.until.strftime("%Y%m%dT%H%M%SZ"))
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        return ";".join(parts)
+
+
+def _parse_until(value: str) -> datetime:
+    for fmt in ("%Y%m%dT%H%M%SZ", "%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            dt = datetime.strptime(value, fmt)
+            if fmt == "%Y%m%d":
+                # Date-only UNTIL includes the whole day
+                dt = dt + timedelta(days=1) - timedelta(seconds=1)
+            return dt.replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return parse_iso_utc(value)
+
+
+def parse_rrule(text: str) -> RecurrenceRule:
+    """Parse RRULE text (with or without the ``RRULE:`` prefix).
+
+    Raises ValueError for anything outside the supported subset.
+    """
+    if not text or not str(text).strip():
+        raise ValueError("rrule is required")
+    body = str(text).strip()
+    if body.upper().startswith("RRULE:"):
+        body = body[6:]
+
+    fields = {}
+    for part in body.split(";"):
+        if not part.strip():
+            continue
+        if "=" not in part:
+            raise ValueError(f"Invalid RRULE part '{part}'")
+        key, value = part.split("=", 1)
+        fields[key.strip().upper()] = value.strip()
+
+    freq = fields.pop("FREQ", "").upper()
+    if freq not in ("DAILY", "WEEKLY"):
+        raise ValueError("FREQ must be DAILY or WEEKLY")
+
+    try:
+        interval = int(fields.pop("INTERVAL", "1"))
+    except ValueError:
+        raise ValueError("INTERVAL must be an integer")
+    if interval < 1:
+        raise ValueError("INTERVAL must be >= 1")
+
+    by_day: Tuple[int, ...] = ()
+    if "BYDAY" in fields:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+        codes = [c.strip().upper() for c in fields.pop("BYDAY").split(",") if c.strip()]
+        try:
+            by_day = tuple(sorted({WEEKDAY_CODES.index(c) for c in codes}))
+        except ValueError:
+            raise ValueError(f"BYDAY must be a list of {','.join(WEEKDAY_CODES)}")
+
+    until = None
+    count = None
+    if "UNTIL" in fields:
+        try:
+            until = _parse_until(fields.pop("UNTIL"))
+        except ValueError:
+            raise ValueError("UNTIL must be YYYYMMDD or YYYYMMDDTHHMMSSZ")
+    if "COUNT" in fields:
+        try:
+            count = int(fields.pop("COUNT"))
+        except ValueError:
+            raise ValueError("COUNT must be an integer")
+        if not 1 <= count <= MAX_COUNT:
+            raise ValueError(f"COUNT must be between 1 and {MAX_COUNT}")
+    if until is not None and count is not None:
+        raise ValueError("UNTIL and COUNT are mutually exclusive")
+
+    # WKST only matters for week numbering with INTERVAL>1; we use ISO (Monday) weeks.
+    fields.pop("WKST", None)
+    if fields:
+        raise ValueError(f"Unsupported RRULE parts: {sorted(fields)}")
+
+    return RecurrenceRule(freq=freq, interval=interval, by_day=by_day, until=until, count=count)
+
+
+def _iter_from(
+    dtstart: datetime, rule: RecurrenceRule, not_before: datetime
+) -> Iterator[Tuple[int, datetime]]:
+    """Yield (occurrence_index, start) from the first period that may reach `not_before`.
+
+    The index counts from the series start (needed for COUNT) even though
+    earlier occurrences are never materialized.
+    """
+    if rule.freq == "DAILY":
+        period = timedelta(days=rule.interval)
+        k = max(0, (not_before - dtstart) // period) if not_before > dtstart else 0
+        while True:
+            yield k, dtstart + k * period
+            k += 1
+
+    # WEEKLY: occurrences are the BYDAY weekdays (default: dtstart's weekday)
+    # of every `interval`-th ISO week, on or after dtstart.
+    days = rule.by_day or (dtstart.weekday(),)
+    week0 = dtstart - timedelta(days=dtstart.weekday())
+    period = timedelta(weeks=rule.interval)
+    skipped = sum(1 for d in days if week0 + timedelta(days=d) < dtstart)
+    w = max(0, (not_before - week0) // period) if not_before > week0 else 0
+    while True:
+        base = week0 + w * period
+        for j, d in enumerate(days):
+            start = base + timedelta(days=d)
+            if start < dtstart:
+                continue
+            yield w * len(days) + j - skipped, start
+        w += 1
+
+
+def iter_occurrences(
+    dtstart: datetime,
+    duration: timedelta,
+    rule: RecurrenceRule,
+    window_start: datetime,
+    window_end: datetime,
+    exdates: Iterable[datetime] = (),
+) -> Iterator[Tuple[datetime, datetime]]:
+    """Yield (start, end) of occurrences overlapping [window_start, window_end).
+
+    Occurrences listed in `exdates` are skipped but still count towards COUNT,
+    matching RFC 5545 EXDATE semantics.
+    """
+    excluded = {d.astimezone(timezone.utc) for d in exdates}
+    for idx, start in _iter_from(dtstart, rule, window_start - duration):
+        if start >= window_end:
+            return
+        if rule.count is not None and idx >= rule.count:
+            return
+        if rule.until is not None and start > rule.until:
+            return
+        end = start + duration
+        if end <= window_start or start in excluded:
+            continue
+        yield start, end
+
+
+def series_end(dtstart: datetime, duration: timedelta, rule: RecurrenceRule) -> Optional[datetime]:
+    """Return the end of the last occurrence, or None for open-ended series.
+
+    Stored alongside the rule so the database can skip finished series cheaply.
+    """
+    if rule.until is not None:
+        return max(rule.until, dtstart) + duration
+    if rule.count is not None:
+        last = dtstart
+        for idx, start in _iter_from(dtstart, rule, dtstart):
+            if idx >= rule.count:
+                break
+            last = start
+        return last + duration
+    return None
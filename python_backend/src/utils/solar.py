@@ -0,0 +1,139 @@
+"""Sunrise, sunset, solar noon and civil twilight from NOAA's solar equations.
+
+Implements the NOAA Solar Calculator formulas (Meeus-based): solar declination
+and the equation of time for a Julian century, and the hour angle at which the
+sun's centre crosses a zenith angle. Each event is evaluated twice, the second
+time at the event's own instant, which keeps results within about a minute of
+the NOAA reference for latitudes below the polar circles.
+
+Dates are UTC calendar days; event times are aware UTC datetimes. Events that do
+not happen (polar day or night) are None.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ZENITH_SUNRISE = 90.833  # geometric horizon + refraction + solar radius
+ZENITH_CIVIL = 96.0
+
+_J2000 = 2451545.0
+_UNIX_EPOCH_JD = 2440587.5
+
+
+def _julian_day(d: date) -> float:
+    """Julian day at 00:00 UTC of `d`."""
+    return _UNIX_EPOCH_JD + (d - date(1970, 1, 1)).days
+
+
+def _sun_params(jd: float) -> Tuple[float, float]:
+    """Return (declination in radians, equation of time in minutes) at Julian day `jd`."""
+    t = (jd - _J2000) / 36525.0
+    l0 = (280.46646 + t * (36000.76983 + t * 0.0003032)) % 360.0
+    m = 357.52911 + t * (35999.05029 - 0.0001537 * t)
+    e = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    m_rad = math.radians(m)
+    center = (
+        math.sin(m_rad) * (1.914602 - t * (0.004817 + 0.000014 * t))
+        + math.sin(2 * m_rad) * (0.019993 - 0.000101 * t)
+        + math.sin(3 * m_rad) * 0.000289
+    )
+    omega = math.radians(125.04 - 1934.136 * t)
+    apparent_long = math.radians(l0 + center - 0.00569 - 0.00478 * math.sin(omega))
+    mean_obliq = 23.0 + (26.0 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60.0) / 60.0
+    obliq = math.radians(mean_obliq + 0.00256 * math.cos(omega))
+    decl = math.asin(math.sin(obliq) * math.sin(apparent_long))
+
+    y = math.tan(obliq / 2.0) ** 2
+    l0_rad = math.radians(l0)
+    eq_time = 4.0 * math.degrees(
+        y * math.sin(2 * l0_rad)
+        - 2 * e * math.sin(m_rad)
+        + 4 * e * y * math.sin(m_rad) * math.cos(2 * l0_rad)
+        - 0.5 * y * y * math.sin(4 * l0_rad)
+        - 1.25 * e * e * math.sin(2 * m_rad)
+    )
+    return decl, eq_time
+
+
+def _hour_angle(lat_rad: float, decl: float, zenith: float) -> Optional[float]:
+    """Hour angle in degrees for the zenith crossing; None if the sun never reaches it.
+
+    Returns +inf when the sun stays above the zenith angle all day (polar day).
+    """
+    cos_ha = math.cos(math.radians(zenith)) / (math.cos(lat_rad) * math.cos(decl)) - math.tan(lat_rad) * math.tan(decl)
+    if cos_ha > 1.0:
+        return None
+    if cos_ha < -1.0:
+        return math.inf
+    return math.degrees(math.acos(cos_ha))
+
+
+def _solar_noon_minutes(jd0: float, lon: float) -> float:
+    noon = 720.0 - 4.0 * lon
+    for _ in range(2):
+        _, eq_time = _sun_params(jd0 + noon / 1440.0)
+        noon = 720.0 - 4.0 * lon - eq_time
+    return noon
+
+
+def _event_minutes(jd0: float, lat: float, lon: float, zenith: float, rising: bool) -> Optional[float]:
+    """Minutes after 00:00 UTC of the event; None for polar day/night."""
+    lat_rad = math.radians(lat)
+    sign = -1.0 if rising else 1.0
+    minutes = 720.0 - 4.0 * lon
+    for _ in range(2):
+        decl, eq_time = _sun_params(jd0 + minutes / 1440.0)
+        ha = _hour_angle(lat_rad, decl, zenith)
+        if ha is None or math.isinf(ha):
+            return None
+        minutes = 720.0 - 4.0 * (lon - sign * ha) - eq_time
+    return minutes
+
+
+def _polar_state(jd0: float, lat: float, lon: float, zenith: float) -> Optional[float]:
+    """At solar noon: +inf if the sun never sets below `zenith`, None if it never rises above it."""
+    decl, _ = _sun_params(jd0 + _solar_noon_minutes(jd0, lon) / 1440.0)
+    return _hour_angle(math.radians(lat), decl, zenith)
+
+
+def solar_day(lat: float, lon: float, d: date) -> Dict[str, Any]:
+    """Daylight facts for one UTC date.
+
+    Returns sunrise, sunset, solar_noon, civil_twilight_begin, civil_twilight_end
+    (aware UTC datetimes or None) and day_length in seconds (0 or 86400 during polar night or day).
+    """
+    if not -90.0 <= lat <= 90.0 or not -180.0 <= lon <= 180.0:
+        raise ValueError("lat must be within [-90, 90] and lon within [-180, 180]")
+    # Exactly at the poles cos(lat) is 0; nudge so the hour-angle formula stays defined
+    lat = max(-89.9999, min(89.9999, lat))
+    jd0 = _julian_day(d)
+    midnight = datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+
+    def at(minutes: Optional[float]) -> Optional[datetime]:
+        if minutes is None:
+            return None
+        return (midnight + timedelta(minutes=minutes)).replace(microsecond=0)
+
+    sunrise = _event_minutes(jd0, lat, lon, ZENITH_SUNRISE, rising=True)
+    sunset = _event_minutes(jd0, lat, lon, ZENITH_SUNRISE, rising=False)
+    if sunrise is not None and sunset is not None:
+        day_length = int(round((sunset - sunrise) * 60.0))
+    else:
+        day_length = 86400 if _polar_state(jd0, lat, lon, ZENITH_SUNRISE) == math.inf else 0
+
+    return {
+        "sunrise": at(sunrise),
+        "sunset": at(sunset),
+        "solar_noon": at(_solar_noon_minutes(jd0, lon)),
+        "day_length": day_length,
+        "civil_twilight_begin": at(_event_minutes(jd0, lat, lon, ZENITH_CIVIL, rising=True)),
+        "civil_twilight_end": at(_event_minutes(jd0, lat, lon, ZENITH_CIVIL, rising=False)),
+    }
+
+
+def solar_days(lat: float, lon: float, dates: Iterable[date]) -> List[Dict[str, Any]]:
+    """`solar_day` for each date, each result tagged with its `date`."""
+    return [{"date": d.isoformat(), **solar_day(lat, lon, d)} for d in dates]
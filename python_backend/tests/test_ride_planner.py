@@ -0,0 +1,53 @@
+"""Window ranking of the ride planner when the forecast has gaps."""
+
+from datetime import datetime, timedelta, timezone
+
+from src.services.ride_planner import best_windows, hour_penalty
+
+DAY = datetime(2025, 6, 21, tzinfo=timezone.utc)
+LAT, LON = 0.0, 0.0  # equator: daylight roughly 06:00-18:00 UTC
+
+
+class _FakeCache:
+    """Serves one day with mild, windy weather except where values are set to None."""
+
+    def __init__(self, overrides):
+        self.overrides = overrides
+
+    def prefetch(self, points, variables):
+        list(points)
+        return 0
+
+    def day_series(self, lat, lon, day, variables):
+        start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+        times = [(start + timedelta(hours=h)).strftime("%Y-%m-%dT%H:%M") for h in range(24)]
+        series = {"temperature_2m": [18.0] * 24, "windspeed_10m": [30.0] * 24, "precipitation": [0.0] * 24}
+        for (name, hour), value in self.overrides.items():
+            series[name][hour] = value
+        return times, series
+
+
+def test_hour_penalty_is_none_when_any_value_is_missing():
+    assert hour_penalty(None, 30.0, 0.0, 0.0) is None
+    assert hour_penalty(18.0, None, 0.0, 0.0) is None
+    assert hour_penalty(18.0, 30.0, None, 0.0) is None
+    assert hour_penalty(18.0, 30.0, 0.0, 0.0) == 3.0
+
+
+def test_windows_with_missing_hours_are_skipped():
+    gaps = {("windspeed_10m", 10): None, ("precipitation", 11): None}
+    result = best_windows(
+        _FakeCache(gaps), LAT, LON, DAY + timedelta(hours=8), horizon_hours=6, duration_hours=2, k=6
+    )
+    # starts 08..13; 09, 10 and 11 cover hour 10 or 11, and 12 and 13 overlap
+    assert [w["start"] for w in result["windows"]] == ["2025-06-21T08:00:00Z", "2025-06-21T12:00:00Z"]
+    assert result["considered"] == 3
+    assert all(w["max_windspeed_10m"] == 30.0 for w in result["windows"])
+
+
+def test_gap_does_not_outrank_real_data():
+    # Scored as ideal, the gap at 08-09 would win over the windy hours after it
+    cache = _FakeCache({("windspeed_10m", h): None for h in (8, 9)})
+    result = best_windows(cache, LAT, LON, DAY + timedelta(hours=8), horizon_hours=8, duration_hours=2, k=1)
+    assert result["windows"][0]["start"] == "2025-06-21T10:00:00Z"
+    assert result["windows"][0]["score"] == round(100.0 / (1.0 + 3.0), 1)
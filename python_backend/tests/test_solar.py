@@ -0,0 +1,46 @@
+"""NOAA solar calculator reference times for `src.utils.solar` (UTC, to the minute)."""
+
+from datetime import date, datetime, timezone
+
+import pytest
+
+from src.utils.solar import solar_day
+
+TOLERANCE_SECONDS = 60
+
+
+def _utc(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "lat, lon, day, sunrise, sunset, solar_noon",
+    [
+        # London, summer solstice (BST = UTC+1)
+        (51.5074, -0.1278, date(2025, 6, 21), "2025-06-21T03:43", "2025-06-21T20:21", "2025-06-21T12:02"),
+        # New York, New Year's Day (EST = UTC-5)
+        (40.7128, -74.0060, date(2025, 1, 1), "2025-01-01T12:20", "2025-01-01T21:39", "2025-01-01T17:00"),
+        # Sydney, summer solstice (AEDT = UTC+11); sunrise falls on the previous UTC date
+        (-33.8688, 151.2093, date(2025, 12, 21), "2025-12-20T18:41", "2025-12-21T09:05", "2025-12-21T01:53"),
+        # Equator on the prime meridian at the March equinox
+        (0.0, 0.0, date(2025, 3, 20), "2025-03-20T06:04", "2025-03-20T18:10", "2025-03-20T12:07"),
+    ],
+)
+def test_matches_noaa_reference(lat, lon, day, sunrise, sunset, solar_noon):
+    result = solar_day(lat, lon, day)
+    for key, expected in (("sunrise", sunrise), ("sunset", sunset), ("solar_noon", solar_noon)):
+        assert abs((result[key] - _utc(expected)).total_seconds()) <= TOLERANCE_SECONDS, key
+
+
+@pytest.mark.parametrize(
+    "day, day_length",
+    [
+        (date(2025, 6, 21), 86400),  # polar day
+        (date(2025, 12, 21), 0),  # polar night
+    ],
+)
+def test_tromso_polar_day_and_night(day, day_length):
+    result = solar_day(69.6492, 18.9553, day)
+    assert result["sunrise"] is None
+    assert result["sunset"] is None
+    assert result["day_length"] == day_length
@@ -0,0 +1,81 @@
+"""Response budget of the sessions-get-range tool endpoint."""
+
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.api.routers.tools import ACTIVITY_FIELDS, _collect
+from src.utils.cursor import decode_cursor
+from src.utils.intervals import parse_iso_utc
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+ROWS = sorted(
+    (
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": str(uuid.uuid4()),
+            "started_at": (START + timedelta(hours=i, microseconds=123456)).isoformat(),
+            "ended_at": (START + timedelta(hours=i, minutes=45)).isoformat(),
+            "duration_seconds": 2700,
+            "distance_km": 21.345,
+            "avg_speed_kmh": 28.46,
+            "active_energy_kcal": 612.4,
+            "elevation_gain_m": 233.0,
+            "avg_hr_bpm": 141,
+            "max_hr_bpm": 178,
+            "vo2max": 52.3,
+            "created_at": "2025-02-01T00:00:00.123456+00:00",
+            "updated_at": "2025-02-01T00:00:00.123456+00:00",
+        }
+        for i in range(300)
+    ),
+    key=lambda r: (r["started_at"], r["id"]),
+)
+
+
+class _Query:
+    def __init__(self, data):
+        self.data = data
+        self.error = None
+
+    def execute(self):
+        return self
+
+
+class _PageClient:
+    """Serves load_cycling_activities_page from ROWS."""
+
+    def rpc(self, name, params):
+        assert name == "load_cycling_activities_page"
+        rows = ROWS
+        if params["p_after_started_at"]:
+            after = (parse_iso_utc(params["p_after_started_at"]), params["p_after_id"])
+            rows = [r for r in rows if (parse_iso_utc(r["started_at"]), r["id"]) > after]
+        return _Query(rows[: params["p_limit"]])
+
+
+def _collect_all_years(fields, after, budget):
+    return _collect(_PageClient(), "2025-01-01T00:00:00Z", "2026-01-01T00:00:00Z", None, fields, after, budget)
+
+
+@pytest.mark.parametrize("budget", range(1024, 4097, 97))
+def test_response_stays_within_budget_with_all_fields(budget):
+    response = _collect_all_years(list(ACTIVITY_FIELDS), None, budget)
+    size = len(json.dumps(response, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    assert response["has_more"]
+    assert response["activities"]
+    assert size <= budget
+
+
+def test_cursor_pages_through_every_row_once():
+    seen, after = [], None
+    while True:
+        response = _collect_all_years(["id"], after, 2048)
+        seen.extend(a["id"] for a in response["activities"])
+        if not response["has_more"]:
+            break
+        ts, row_id = decode_cursor(response["cursor"])
+        after = {"started_at": ts.isoformat(), "id": row_id}
+    assert seen == [r["id"] for r in ROWS]